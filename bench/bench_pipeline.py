@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+週次レポートの処理段階ごとの時間・スループット・ピークメモリ（RSS）を測る。
+
+合成エクスポート（gen_notion_export）を 1k / 10k / 100k ページで作り、make_weekly と同じ流れを
+段階に分けて時間を測る:
+- walk : walk_md_files（.md の列挙）
+- read : read_source（1ファイルずつ。parse と交互に行い、時間だけ別に足す）
+- parse: parse_file（改行の正規化・digest・extract_ideas_and_meals / extract_entry）
+- sort : 日付順の並べ替え（ideas / meals / bundle）
+- write: write_dated_chunks / write_bundle（ideas.md / meals.md / bundle.md）
+ピーク RSS は大きさごとに別プロセスで測る（ru_maxrss。段階ごとにその時点までの最大値も残す）。
+キャッシュ・並列なしの直列で測る（--jobs 1 の make weekly 相当）。
+
+使い方:
+  python3 bench/bench_pipeline.py [--sizes 1000,10000,100000] [--json .cache/bench/pipeline.json]
+  python3 bench/bench_pipeline.py --sizes 1000,10000 --compare old.json [--tolerance 0.2]
+  （--compare: 前回の JSON より遅い／メモリが多い段階があれば一覧を出して終了コード 1）
+
+生成したエクスポートは --work/notion-<ページ数>/ に残し、引数が同じなら次回は作り直さない。
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from gen_notion_export import GEN_KEYS, add_gen_args, generate  # noqa: E402
+from weekly_report_kit.instrument import count_lines  # noqa: E402
+
+PHASES = ("walk", "read", "parse", "sort", "write")
+RESULT_VERSION = 1
+# これより短い差は比較しない（小さいコーパスの揺らぎ）
+MIN_DIFF_S = 0.01
+
+def peak_rss_kb() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # Linux は KiB
+
+class PhaseTimer:
+    """段階ごとの wall / CPU 時間を足していく。"""
+
+    def __init__(self):
+        self.wall: Dict[str, float] = dict.fromkeys(PHASES, 0.0)
+        self.cpu: Dict[str, float] = dict.fromkeys(PHASES, 0.0)
+        self.rss: Dict[str, int] = {}
+
+    def run(self, phase: str, fn: Callable[[], Any]) -> Any:
+        w, c = time.perf_counter(), time.process_time()
+        try:
+            return fn()
+        finally:
+            self.wall[phase] += time.perf_counter() - w
+            self.cpu[phase] += time.process_time() - c
+
+    def mark(self, phase: str) -> None:
+        self.rss[phase] = peak_rss_kb()
+
+def run_child(src: Path) -> Dict[str, Any]:
+    """1つのエクスポートを段階ごとに処理して測る（--child。測定用の別プロセスで呼ばれる）。"""
+    from weekly_report_kit.extract_notion_diary_multi import extract_ideas_and_meals, is_nashi, write_dated_chunks
+    from weekly_report_kit.make_notion_report import extract_entry, write_bundle
+    from weekly_report_kit.notion_corpus import parse_file, read_source
+    from weekly_report_kit.notion_sources import walk_md_files
+
+    rss_start = peak_rss_kb()
+    t = PhaseTimer()
+    parsers = {"ideas_meals": extract_ideas_and_meals, "entry": extract_entry}
+
+    files = t.run("walk", lambda: walk_md_files(src))
+    t.mark("walk")
+
+    rows_ideas, rows_meals, entries = [], [], []
+    bytes_read = lines = 0
+    for fp in files:
+        data = t.run("read", lambda: read_source(fp))
+        bytes_read += len(data)
+        lines += count_lines(data)
+        _, parsed = t.run("parse", lambda: parse_file(fp, parsers, data))
+        page, entry = parsed["ideas_meals"], parsed["entry"]
+        if page.date:
+            if page.ideas and not is_nashi(page.ideas):
+                rows_ideas.append((page.date, page.ideas))
+            if page.meals:
+                rows_meals.append((page.date, page.meals))
+        if entry.date:
+            entries.append(entry)
+        del data
+    t.mark("read")
+    t.mark("parse")
+
+    def sort() -> None:
+        rows_ideas.sort(key=lambda x: x[0])
+        rows_meals.sort(key=lambda x: x[0])
+        entries.sort(key=lambda x: x.date)
+    t.run("sort", sort)
+    t.mark("sort")
+
+    with tempfile.TemporaryDirectory(prefix="bench-out-") as out:
+        outs = [Path(out, name) for name in ("ideas.md", "meals.md", "bundle.md")]
+
+        def write() -> None:
+            write_dated_chunks(outs[0], rows_ideas)
+            write_dated_chunks(outs[1], rows_meals, with_head=True)
+            write_bundle(outs[2], entries)
+        t.run("write", write)
+        t.mark("write")
+        bytes_written = sum(p.stat().st_size for p in outs)
+
+    pages = len(files)
+    volume = {"walk": 0, "read": bytes_read, "parse": bytes_read, "sort": 0, "write": bytes_written}
+    phases = {}
+    for p in PHASES:
+        wall = t.wall[p]
+        phases[p] = {
+            "wall_s": round(wall, 6),
+            "cpu_s": round(t.cpu[p], 6),
+            "pages_per_s": round(pages / wall, 1) if wall else None,
+            "mb_per_s": round(volume[p] / wall / 1e6, 2) if wall and volume[p] else None,
+            "peak_rss_kb": t.rss[p],
+        }
+    return {
+        "files": pages, "bytes_read": bytes_read, "lines": lines, "bytes_written": bytes_written,
+        "ideas": len(rows_ideas), "meals": len(rows_meals), "entries": len(entries),
+        "total_wall_s": round(sum(t.wall.values()), 6),
+        "rss_start_kb": rss_start, "peak_rss_kb": peak_rss_kb(), "phases": phases,
+    }
+
+def measure(src: Path) -> Dict[str, Any]:
+    """別プロセスで run_child を実行する（ピーク RSS を大きさごとに分けるため）。"""
+    proc = subprocess.run([sys.executable, __file__, "--child", str(src)],
+                          check=True, stdout=subprocess.PIPE, text=True)
+    return json.loads(proc.stdout)
+
+def compare(base: Dict[str, Any], runs: List[Dict[str, Any]], tolerance: float) -> List[str]:
+    """前回の結果より tolerance 以上悪くなった段階の一覧。"""
+    old = {r["pages"]: r for r in base.get("runs", [])}
+    worse = []
+    for run in runs:
+        prev = old.get(run["pages"])
+        if prev is None:
+            continue
+        for p in PHASES:
+            a, b = prev["phases"][p]["wall_s"], run["phases"][p]["wall_s"]
+            if b > a * (1 + tolerance) and b - a > MIN_DIFF_S:
+                worse.append(f"{run['pages']:>7} pages  {p:<5}  {a:.3f}s → {b:.3f}s  (+{(b / a - 1) * 100:.0f}%)")
+        a, b = prev["peak_rss_kb"], run["peak_rss_kb"]
+        if b > a * (1 + tolerance):
+            worse.append(f"{run['pages']:>7} pages  rss    {a / 1024:.1f}MiB → {b / 1024:.1f}MiB")
+    return worse
+
+def main():
+    ap = argparse.ArgumentParser(description="walk / read / parse / sort / write の時間とピーク RSS を測る")
+    ap.add_argument("--sizes", default="1000,10000,100000", help="ページ数（カンマ区切り。既定: 1000,10000,100000）")
+    ap.add_argument("--work", default=".cache/bench", help="生成したエクスポートの置き場所（既定: .cache/bench）")
+    ap.add_argument("--json", default=".cache/bench/pipeline.json", help="結果の JSON（既定: .cache/bench/pipeline.json）")
+    ap.add_argument("--compare", help="前回の結果の JSON（遅くなった段階があれば終了コード 1）")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="--compare で許す悪化の割合（既定: 0.2）")
+    ap.add_argument("--child", help=argparse.SUPPRESS)
+    add_gen_args(ap)
+    args = ap.parse_args()
+
+    if args.child:
+        json.dump(run_child(Path(args.child)), sys.stdout)
+        return
+
+    work = Path(args.work).expanduser()
+    runs = []
+    for size in (int(s) for s in args.sizes.split(",") if s):
+        src = work / f"notion-{size}"
+        t = time.perf_counter()
+        try:
+            made = generate(src, size, args)
+        except ValueError as e:
+            ap.error(str(e))
+        if made:
+            print(f"[gen] {src}  ({size} pages, {time.perf_counter() - t:.1f}s)", file=sys.stderr)
+        run = {"pages": size, **measure(src)}
+        runs.append(run)
+        cols = "  ".join(f"{p} {run['phases'][p]['wall_s'] * 1000:8.1f}ms" for p in PHASES)
+        print(f"{size:>7} pages  {cols}  total {run['total_wall_s']:.2f}s  "
+              f"peak {run['peak_rss_kb'] / 1024:.1f}MiB")
+
+    result = {
+        "version": RESULT_VERSION,
+        "created": datetime.now().astimezone().isoformat(timespec="seconds"),
+        "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+        "generator": {k: getattr(args, k) for k in GEN_KEYS},
+        "runs": runs,
+    }
+    out = Path(args.json).expanduser()
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, ensure_ascii=False, indent=1), encoding="utf-8")
+    print(f"[OK] wrote: {out}")
+
+    if args.compare:
+        worse = compare(json.loads(Path(args.compare).expanduser().read_text(encoding="utf-8")), runs, args.tolerance)
+        for line in worse:
+            print(f"[slower] {line}")
+        if worse:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
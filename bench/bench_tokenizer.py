@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+行分類のマイクロベンチマーク（lines/sec）。
+
+- before: 従来の行ごとの判定（norm() を何度も呼び、startswith → match_target_h2 の
+          re.sub・「振り返り」置換・H2_KEYS のループ、RE_LINE_DATE）
+- after : weekly_report_kit.md_tokens.Tokenizer（find で見出し候補・「日付」へ飛び、
+          見出しと「日付」で始まる行だけデコード）
+
+合成した日記ページ（見出し・「日付:」行・本文・NBSP 入りの見出しを含む）で測る。
+
+使い方:
+  python3 bench/bench_tokenizer.py [--pages 2000] [--repeat 5] [--log-lines 0]
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from weekly_report_kit.make_notion_report import H2_KEYS, TOKENIZER  # noqa: E402
+from weekly_report_kit.md_tokens import BODY  # noqa: E402
+
+NBSP = "\u00A0"
+RE_LINE_DATE = re.compile(r"^\s*日付\s*[:：]\s*(\d{4})年(\d{1,2})月(\d{1,2})日")
+
+def norm(s: str) -> str:
+    return s.replace(NBSP, " ")
+
+def match_target_h2(h2_line: str) -> bool:
+    s = re.sub(r"\s+", " ", norm(h2_line.strip()))
+    if not s.startswith("##"):
+        return False
+    title = s[2:].strip()
+    title = title.replace("振り返り", "振返り")
+    for key in H2_KEYS:
+        k = key.replace("振り返り", "振返り")
+        if k in title:
+            return True
+    return False
+
+def classify_before(text: str) -> int:
+    """
+    従来の判定を1行ずつ（対象見出しの数 * 1000 + 見出し行の数 + 対象セクション内の
+    「日付:」行の数を返す）。
+    """
+    found = 0
+    in_target = False
+    for line in text.splitlines(keepends=True):
+        if norm(line).startswith("## ") and match_target_h2(line):
+            found += 1001
+            in_target = True
+        elif norm(line).startswith("## ") or norm(line).startswith("# "):
+            found += 1
+            in_target = False
+        elif in_target and RE_LINE_DATE.match(norm(line)):
+            found += 1
+    return found
+
+def classify_after(buf: bytes) -> int:
+    """Tokenizer で同じ値を出す（本文は範囲ごと読み飛ばされる）。"""
+    found = 0
+    for kind, sid, _, _ in TOKENIZER.tokens(buf):
+        if kind != BODY:
+            found += 1001 if sid is not None else 1
+    return found
+
+def make_page(rng: random.Random, day: int, log_lines: int = 0) -> str:
+    lines = [f"# 2024年1月{day % 28 + 1}日の日記", "", f"日付: 2024年1月{day % 28 + 1}日", ""]
+    heads = [f"## {k}" for k in H2_KEYS] + ["## メモ", f"##{NBSP}🧪 習慣ログ"]
+    for head in rng.sample(heads, 5):
+        lines.append(head)
+        if rng.random() < 0.3:
+            lines.append(f"日付: 2024年1月{day % 28 + 1}日")
+        for _ in range(rng.randint(5, 40)):
+            lines.append(rng.choice([
+                "- 今日は朝から散歩をして、そのあと読書をした。",
+                "【食事】朝: パン / 昼: そば / 夜: カレー",
+                "",
+                "  - ネストしたリスト項目 with some ascii text",
+                "- #タグ付きのメモ（日付は書かない）",
+            ]))
+        lines.append("")
+    if log_lines:
+        # 貼り付けた長いログ（見出しも「日付」も無い本文行ばかり）
+        lines.append("## メモ")
+        lines.extend(f"2024-01-01 12:00:{i % 60:02d} INFO request handled id={i}" for i in range(log_lines))
+    return "\n".join(lines) + "\n"
+
+def best_of(repeat: int, fn: Callable[[], int]) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best
+
+def main():
+    ap = argparse.ArgumentParser(description="行分類の lines/sec（従来版と Tokenizer）")
+    ap.add_argument("--pages", type=int, default=2000)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--log-lines", type=int, default=0, help="各ページに貼り付けログの行をこれだけ足す")
+    args = ap.parse_args()
+
+    rng = random.Random(0)
+    texts: List[str] = [make_page(rng, i, args.log_lines) for i in range(args.pages)]
+    bufs: List[bytes] = [t.encode("utf-8") for t in texts]
+    n_lines = sum(t.count("\n") for t in texts)
+
+    assert sum(map(classify_before, texts)) == sum(map(classify_after, bufs))
+    before = best_of(args.repeat, lambda: sum(map(classify_before, texts)))
+    after = best_of(args.repeat, lambda: sum(map(classify_after, bufs)))
+
+    print(f"lines: {n_lines}  pages: {args.pages}")
+    print(f"before: {n_lines / before:12,.0f} lines/sec  ({before * 1000:.1f} ms)")
+    print(f"after : {n_lines / after:12,.0f} lines/sec  ({after * 1000:.1f} ms)  x{before / after:.2f}")
+
+if __name__ == "__main__":
+    main()
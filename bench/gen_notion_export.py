@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+ベンチマーク用の Notion 風エクスポートを決定的に生成する（同じ引数なら同じバイト列）。
+
+- 1日1ページ。--start から --days 日分を Export-YYYY/日記/ に年ごとに置く
+  （ファイル名は Notion と同じ「タイトル ＋ 32桁の16進」。タイトルは「YYYY年M月D日」）
+- 各ページは H1（日付）・「日付:」行・対象H2（習慣ログ・今日の実践・ひらめき・学び・振返り）と
+  対象外の H2 を --mix の割合で並べる。本文は --lines の範囲の行数
+- 見出しの空白の一部を NBSP にする（--nbsp）・一部のページは CRLF（--crlf）
+- 添付フォルダ（ページ名のフォルダに画像とサブページ）を --attachments の割合で付ける
+- 長いログを貼り付けた大きいページを --big-pages の割合で混ぜる（--big-lines 行）
+
+使い方:
+  python3 bench/gen_notion_export.py --out /tmp/export --days 1000 [--seed 0]
+  （生成済みで引数が同じなら何もしない。.bench-gen.json に引数を残す。
+   .bench-gen.json の無い空でないフォルダはエラーにして消さない）
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import shutil
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, List
+
+NBSP = "\u00A0"
+STAMP = ".bench-gen.json"
+GEN_VERSION = 1
+# 生成結果を決める引数（add_gen_args。STAMP に残して同じなら作り直さない）
+GEN_KEYS = ("seed", "start", "mix", "lines", "nbsp", "crlf", "attachments", "big_pages", "big_lines")
+
+# --mix のキー → 見出し
+SECTIONS = {
+    "habit": "🧪 習慣ログ",
+    "practice": "☀️ 今日の実践",
+    "ideas": "✨ ひらめき",
+    "learn": "🧠 新たな学び・気づき・共感",
+    "review": "🚧 振返り・分析・改善点",
+    "other": "メモ",
+}
+DEFAULT_MIX = "habit=0.9,practice=0.6,ideas=0.8,learn=0.5,review=0.7,other=0.4"
+
+BODY_LINES = (
+    "- 今日は朝から散歩をして、そのあと読書をした。",
+    "- 仕事は午前に集中できた。午後は会議が続いた",
+    "  - ネストしたリスト項目 with some ascii text",
+    "- #タグ付きのメモ（日付は書かない）",
+    "",
+    "> 引用: 継続は力なり",
+    "- [ ] 明日やること",
+)
+HABIT_LINES = (
+    "【食事】",
+    "- 朝: パン / 昼: そば / 夜: カレー",
+    "【睡眠】7h",
+    "【運動】ラン 5km",
+)
+
+def parse_mix(s: str) -> Dict[str, float]:
+    mix = {}
+    for part in s.split(","):
+        key, _, p = part.partition("=")
+        if key.strip() not in SECTIONS:
+            raise ValueError(f"--mix のキーが不明です: {key}（{', '.join(SECTIONS)}）")
+        mix[key.strip()] = float(p)
+    return mix
+
+def page_name(d: date, i: int, seed: int) -> str:
+    """Notion 風のファイル名（タイトル＋32桁の16進）。"""
+    h = hashlib.blake2b(f"{seed}:{i}".encode(), digest_size=16).hexdigest()
+    return f"{d.year}年{d.month}月{d.day}日 {h}"
+
+def make_page(rng: random.Random, d: date, opts: argparse.Namespace, mix: Dict[str, float]) -> str:
+    jp = f"{d.year}年{d.month}月{d.day}日"
+    lines: List[str] = [f"# {jp}", "", f"日付: {jp}", ""]
+    lo, hi = opts.lines
+    for key, title in SECTIONS.items():
+        if rng.random() >= mix.get(key, 0.0):
+            continue
+        sp = NBSP if rng.random() < opts.nbsp else " "
+        lines.append(f"##{sp}{title}")
+        if key == "habit":
+            lines.extend(HABIT_LINES)
+        elif key == "ideas" and rng.random() < 0.2:
+            lines.append("- なし")
+        for _ in range(rng.randint(lo, hi)):
+            lines.append(rng.choice(BODY_LINES))
+        if key == "ideas" and rng.random() < 0.1:
+            lines.append(f"日付: {jp}")
+        lines.append("")
+    if rng.random() < opts.big_pages:
+        lines.append("## ログ")
+        lines.extend(f"{d.isoformat()} 12:{i // 60 % 60:02d}:{i % 60:02d} INFO request handled id={i}"
+                     for i in range(opts.big_lines))
+    sep = "\r\n" if rng.random() < opts.crlf else "\n"
+    return sep.join(lines) + sep
+
+def generate(out: Path, days: int, opts: argparse.Namespace, force: bool = False) -> bool:
+    """
+    out に days ページのエクスポートを作る。前回と同じ引数で生成済みなら何もせず False。
+    作り直すのは STAMP のあるフォルダだけで、それ以外の空でない out は ValueError。
+    """
+    params: Dict[str, Any] = {k: getattr(opts, k) for k in GEN_KEYS}
+    params.update(days=days, version=GEN_VERSION)
+    stamp = out / STAMP
+    try:
+        if not force and json.loads(stamp.read_text(encoding="utf-8")) == json.loads(json.dumps(params)):
+            return False
+    except (OSError, ValueError):
+        pass
+    # 消すのはこのスクリプトが作ったフォルダ（STAMP がある）だけ。--out の打ち間違いで手元のエクスポートを消さない
+    if stamp.is_file():
+        shutil.rmtree(out)
+    elif out.is_file() or (out.is_dir() and any(out.iterdir())):
+        raise ValueError(f"{out} は空でなく、{STAMP} もありません（生成したフォルダではないので消しません）")
+    mix = parse_mix(opts.mix)
+    rng = random.Random(opts.seed)
+    start = date.fromisoformat(opts.start)
+    for i in range(days):
+        d = start + timedelta(days=i)
+        folder = out / f"Export-{d.year}" / "日記"
+        folder.mkdir(parents=True, exist_ok=True)
+        name = page_name(d, i, opts.seed)
+        (folder / f"{name}.md").write_bytes(make_page(rng, d, opts, mix).encode("utf-8"))
+        if rng.random() < opts.attachments:
+            att = folder / name
+            att.mkdir()
+            (att / "image.png").write_bytes(b"\x89PNG\r\n\x1a\n" + bytes(rng.randrange(256) for _ in range(256)))
+            if rng.random() < 0.3:
+                (att / f"メモ {i}.md").write_text(f"# {name} のメモ\n\n- 添付のサブページ\n", encoding="utf-8")
+    stamp.write_text(json.dumps(params, ensure_ascii=False, indent=1), encoding="utf-8")
+    return True
+
+def add_gen_args(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--start", default="2000-01-01", help="最初のページの日付（既定: 2000-01-01）")
+    ap.add_argument("--mix", default=DEFAULT_MIX, help=f"各セクションが現れる割合（既定: {DEFAULT_MIX}）")
+    ap.add_argument("--lines", type=lambda s: tuple(map(int, s.split(":"))), default=(3, 20),
+                    help="1セクションの本文の行数 MIN:MAX（既定: 3:20）")
+    ap.add_argument("--nbsp", type=float, default=0.05, help="見出しの空白を NBSP にする割合（既定: 0.05）")
+    ap.add_argument("--crlf", type=float, default=0.02, help="CRLF のページの割合（既定: 0.02）")
+    ap.add_argument("--attachments", type=float, default=0.2, help="添付フォルダのあるページの割合（既定: 0.2）")
+    ap.add_argument("--big-pages", type=float, default=0.001, help="長いログを貼ったページの割合（既定: 0.001）")
+    ap.add_argument("--big-lines", type=int, default=50000, help="長いログの行数（既定: 50000）")
+
+def main():
+    ap = argparse.ArgumentParser(description="ベンチマーク用の Notion 風エクスポートを生成する")
+    ap.add_argument("--out", required=True, help="出力先フォルダ（空か、このスクリプトで生成したフォルダ。中身は置き換える）")
+    ap.add_argument("--days", type=int, default=1000, help="ページ数（1日1ページ。既定: 1000）")
+    add_gen_args(ap)
+    ap.add_argument("--force", action="store_true", help="生成済みでも作り直す")
+    args = ap.parse_args()
+    try:
+        made = generate(Path(args.out).expanduser(), args.days, args, args.force)
+    except ValueError as e:
+        ap.error(str(e))
+    print(f"{'generated' if made else 'up to date'}: {args.out}  ({args.days} pages)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""日記の SQLite 索引（index / report / search）（weekly_report_kit.diary_db を呼ぶだけの互換用スクリプト）。"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from weekly_report_kit.diary_db import main  # noqa: E402
+
+if __name__ == "__main__":
+    main()
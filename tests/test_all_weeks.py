@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+"""make_weekly --all-weeks（週ごとの並列書き出し・消えた週の後始末）。"""
+
+import errno
+import os
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict
+
+import pytest
+
+from weekly_report_kit import instrument, report_writer
+from weekly_report_kit.make_weekly import MANIFEST, OUTPUT_NAMES, main
+from weekly_report_kit.weeks import week_label
+
+FIRST_DAY = date(2024, 1, 6)  # 土曜
+WEEKS = 12
+
+def write_corpus(src: Path, weeks: int = WEEKS) -> Dict[str, list]:
+    """1週3ページの日記を作る。戻り値は 週ラベル → その週のページ。"""
+    pages: Dict[str, list] = {}
+    for i in range(weeks * 3):
+        d = FIRST_DAY + timedelta(days=i * 7 // 3)
+        fp = src / f"{d.year}年{d.month}月{d.day}日 {i}.md"
+        fp.write_text(
+            f"# {d.year}年{d.month}月{d.day}日\n\n"
+            f"## 🧪 習慣ログ\n【食事】朝: パン {i}\n【運動】散歩\n\n"
+            f"## ✨ ひらめき\nアイデア {i}\n" + "本文の行\n" * 50 +
+            f"\n## 🚧 振返り・分析・改善点\n振返り {i}\n",
+            encoding="utf-8")
+        pages.setdefault(week_label(d), []).append(fp)
+    return pages
+
+def read_outputs(out: Path) -> Dict[str, bytes]:
+    return {str(p.relative_to(out)): p.read_bytes() for p in sorted(out.rglob("*.md"))}
+
+def run_all_weeks(src: Path, out: Path, *extra: str) -> None:
+    try:
+        main(["--src", str(src), "--all-weeks", str(out), "--skip-nashi", *extra])
+    finally:
+        instrument.disable()
+
+def test_unsupported_kernel_copy_with_parallel_writers(tmp_path, monkeypatch, capsys):
+    src = tmp_path / "src"
+    src.mkdir()
+    pages = write_corpus(src)
+    run_all_weeks(src, tmp_path / "expect", "--jobs", "1")
+
+    # どちらの方式も「このファイルシステムでは使えない」で失敗させ、スレッドが同時に外しに来るようにする
+    def unsupported(code):
+        def fail(*args):
+            time.sleep(0.001)
+            raise OSError(code, os.strerror(code))
+        return fail
+    monkeypatch.setattr(os, "copy_file_range", unsupported(errno.EXDEV), raising=False)
+    monkeypatch.setattr(os, "sendfile", unsupported(errno.EINVAL), raising=False)
+    monkeypatch.setattr(report_writer, "_KERNEL_COPY", ["copy_file_range", "sendfile"])
+    capsys.readouterr()
+
+    run_all_weeks(src, tmp_path / "out", "--jobs", "4", "--stats-json", str(tmp_path / "stats.json"))
+
+    assert report_writer._KERNEL_COPY == []
+    assert read_outputs(tmp_path / "out") == read_outputs(tmp_path / "expect")
+    stats = (tmp_path / "stats.json").read_text(encoding="utf-8")
+    assert f'"reports_written": {len(pages) * len(OUTPUT_NAMES)}' in stats
+
+def test_removed_week_outputs_are_deleted(tmp_path, capsys):
+    src = tmp_path / "src"
+    src.mkdir()
+    pages = write_corpus(src)
+    out = tmp_path / "out"
+    run_all_weeks(src, out, "--jobs", "2")
+    gone, kept = sorted(pages)[3], sorted(pages)[4]
+    assert (out / gone / "bundle.md").exists()
+    (out / kept / "notes.txt").write_text("手で置いたファイル", encoding="utf-8")
+
+    for fp in pages[gone] + pages[kept]:
+        fp.unlink()
+    capsys.readouterr()
+    run_all_weeks(src, out, "--jobs", "2")
+
+    assert "2 removed" in capsys.readouterr().out
+    assert not (out / gone).exists()
+    # 出力だけ消し、自分で置いたファイルのあるフォルダは残す
+    assert sorted(p.name for p in (out / kept).iterdir()) == ["notes.txt"]
+    manifest = (out / MANIFEST).read_text(encoding="utf-8")
+    assert gone not in manifest and kept not in manifest
+    assert len([p for p in out.iterdir() if p.is_dir()]) == len(pages) - 1
+
+@pytest.mark.parametrize("extra", [("--from", "2024-02-01"), ("--to", "2024-02-01"), ("--week", "2024-02-01")])
+def test_range_options_are_rejected(tmp_path, capsys, extra):
+    src = tmp_path / "src"
+    src.mkdir()
+    write_corpus(src)
+    out = tmp_path / "out"
+    run_all_weeks(src, out, "--jobs", "1")
+    before = read_outputs(out)
+
+    with pytest.raises(SystemExit):
+        run_all_weeks(src, out, "--jobs", "1", *extra)
+
+    assert "--all-weeks と --week / --from / --to" in capsys.readouterr().err
+    # 期間の外の週が「消えた週」として消されていない
+    assert read_outputs(out) == before
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+"""weekly-report-kit のサブコマンド（選ばれたコマンドの分だけ import する）。"""
+
+import subprocess
+import sys
+
+import pytest
+
+from weekly_report_kit import cli
+
+TOGGL_MODULES = {"toggl_csv", "toggl_db", "toggl_store", "make_toggl_report", "make_dashboard"}
+
+def loaded_after(module: str) -> set:
+    """新しいインタプリタで module を import したあとに読み込まれているパッケージ内モジュール。"""
+    code = (f"import sys, weekly_report_kit.{module}; "
+            "print(' '.join(m.split('.')[-1] for m in sys.modules if m.startswith('weekly_report_kit.')))")
+    out = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+    return set(out.split())
+
+def test_weekly_does_not_load_toggl():
+    assert not loaded_after("make_weekly") & TOGGL_MODULES
+
+def test_toggl_does_not_load_notion():
+    notion = {"notion_corpus", "notion_sources", "md_spans", "md_tokens", "parse_cache"}
+    assert not loaded_after("make_toggl_report") & notion
+    assert not loaded_after("toggl_db") & notion
+
+def write_page(src):
+    src.mkdir()
+    (src / "2024年1月6日.md").write_text(
+        "# 2024年1月6日\n\n## 🧪 習慣ログ\n【食事】朝: パン\n\n## ✨ ひらめき\nアイデア\n", encoding="utf-8")
+
+@pytest.mark.parametrize("cmd, own, other", [("ideas", "--ideas-out", "--meals-out"),
+                                             ("meals", "--meals-out", "--ideas-out")])
+def test_ideas_and_meals_write_only_their_output(tmp_path, capsys, cmd, own, other):
+    src = tmp_path / "src"
+    write_page(src)
+    with pytest.raises(SystemExit):
+        cli.main([cmd, "--src", str(src)])  # 出力先なし
+    with pytest.raises(SystemExit):
+        cli.main([cmd, "--src", str(src), own, str(tmp_path / "a.md"), other, str(tmp_path / "b.md")])
+    assert not (tmp_path / "a.md").exists() and not (tmp_path / "b.md").exists()
+
+    cli.main([cmd, "--src", str(src), own, str(tmp_path / "out.md"), "--jobs", "1"])
+    text = (tmp_path / "out.md").read_text(encoding="utf-8")
+    assert ("アイデア" in text) == (cmd == "ideas")
+    assert ("【食事】" in text) == (cmd == "meals")
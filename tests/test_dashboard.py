@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+
+"""dashboard.md（日記と Toggl を日付で突き合わせる）と make_weekly --dashboard-out。"""
+
+from datetime import datetime
+
+from toggl_rows import random_rows, toggl_row, write_toggl_csv
+
+from weekly_report_kit import instrument, make_dashboard, make_weekly
+from weekly_report_kit.toggl_csv import NO_CLIENT
+
+EXPECTED = f"""\
+# 2024-W02（2024-01-06〜2024-01-12）
+
+合計: 3:30
+
+## 2024-01-06（土）
+
+計測: 3:00
+
+| クライアント | プロジェクト | 時間 |
+|---|---|---:|
+| A社 | 開発 | 2:00 |
+| {NO_CLIENT} | 運用\\|保守 | 1:00 |
+
+### 🧪 習慣ログ
+【運動】散歩
+
+
+### 🚧 振返り・分析・改善点
+早く寝る
+
+### 🧪 習慣ログ
+【食事】夜: カレー
+
+## 2024-01-08（月）
+
+計測: 0:30
+
+| クライアント | プロジェクト | 時間 |
+|---|---|---:|
+| A社 | 開発 | 0:30 |
+
+日記なし
+
+# 2024-W03（2024-01-13〜2024-01-19）
+
+合計: 0:00
+
+## 2024-01-14（日）
+
+計測なし
+
+### 🚧 振り返り・分析・改善点
+雪だった
+"""
+
+def write_inputs(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    pages = {
+        "a.md": "# 2024年1月6日\n\n## 🧪 習慣ログ\n【運動】散歩\n\n## ✨ ひらめき\nアイデア\n\n"
+                "## 🚧 振返り・分析・改善点\n早く寝る\n",
+        "b.md": "# 2024年1月6日\n\n## 🧪 習慣ログ\n【食事】夜: カレー\n",  # 同じ日のページがもう1つ
+        "c.md": "# 2024年1月14日\n\n## 🚧 振り返り・分析・改善点\n雪だった\n",  # 表記ゆれ
+        "d.md": "# 2024年2月1日\n\n## 🧪 習慣ログ\n期間外\n",
+        "e.md": "日付なし\n",
+    }
+    for name, text in pages.items():
+        (src / name).write_text(text, encoding="utf-8")
+    write_toggl_csv(tmp_path / "toggl" / "t.csv", [
+        toggl_row(datetime(2024, 1, 6, 9), 3600, "A社", "開発"),
+        toggl_row(datetime(2024, 1, 6, 13), 3600, "A社", "開発"),
+        toggl_row(datetime(2024, 1, 6, 20), 3600, "", "運用|保守"),
+        toggl_row(datetime(2024, 1, 8, 9), 1800, "A社", "開発"),  # 日記の無い日
+        toggl_row(datetime(2024, 2, 1, 9), 1800, "A社", "開発"),  # 期間外
+    ])
+    return src, tmp_path / "toggl"
+
+def run(module, argv):
+    try:
+        module.main(argv)
+    finally:
+        instrument.disable()
+
+def test_dashboard_joins_diary_and_toggl_by_date(tmp_path):
+    src, toggl = write_inputs(tmp_path)
+    out = tmp_path / "dashboard.md"
+    run(make_dashboard, ["--src", str(src), "--toggl-src", str(toggl), "--dashboard-out", str(out),
+                         "--from", "2024-01-06", "--to", "2024-01-19", "--jobs", "1"])
+    assert out.read_text(encoding="utf-8") == EXPECTED
+
+    # ストア経由・make_weekly からでも同じもの
+    run(make_dashboard, ["--src", str(src), "--toggl-src", str(toggl), "--toggl-store", str(tmp_path / "store"),
+                         "--dashboard-out", str(tmp_path / "store.md"),
+                         "--from", "2024-01-06", "--to", "2024-01-19", "--jobs", "1"])
+    run(make_weekly, ["--src", str(src), "--toggl-src", str(toggl), "--dashboard-out", str(tmp_path / "weekly.md"),
+                      "--from", "2024-01-06", "--to", "2024-01-19", "--jobs", "1"])
+    assert (tmp_path / "store.md").read_text(encoding="utf-8") == EXPECTED
+    assert (tmp_path / "weekly.md").read_text(encoding="utf-8") == EXPECTED
+
+def test_day_table_sums_each_day(tmp_path):
+    path = write_toggl_csv(tmp_path / "t.csv", random_rows(300, seed=5))
+    stats = make_dashboard.load_toggl(path, None, 1)
+    table = make_dashboard.day_table(stats)
+    assert {d: sum(sec for *_, sec in rows) for d, rows in table.items()} == dict(stats.days)
+    for rows in table.values():
+        assert [sec for *_, sec in rows] == sorted((sec for *_, sec in rows), reverse=True)
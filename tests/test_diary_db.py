@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+"""diary_db（SQLite への取り込みと期間クエリのレポート）。"""
+
+import os
+from datetime import date, timedelta
+
+import pytest
+
+from weekly_report_kit import diary_db, instrument
+from weekly_report_kit.make_weekly import main as make_weekly
+
+FIRST_DAY = date(2024, 1, 6)
+
+def write_page(src, i, extra=""):
+    d = FIRST_DAY + timedelta(days=i)
+    fp = src / f"{d.year}年{d.month}月{d.day}日.md"
+    fp.write_text(f"# {d.year}年{d.month}月{d.day}日\n\n## 🧪 習慣ログ\n【食事】\n朝: パン {i}\n【運動】散歩\n\n"
+                  f"## ✨ ひらめき\n{'なし' if i % 5 == 0 else f'アイデア {i}'}\n{extra}\n"
+                  f"## 🚧 振返り・分析・改善点\n振返り {i}\n", encoding="utf-8")
+    return fp
+
+@pytest.fixture
+def src(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    for i in range(20):
+        write_page(src, i)
+    return src
+
+def outputs(out):
+    return {name: (out / name).read_bytes() for name in ("ideas.md", "meals.md", "bundle.md")}
+
+def run_weekly(src, out, *extra):
+    try:
+        make_weekly(["--src", str(src), "--ideas-out", str(out / "ideas.md"), "--meals-out", str(out / "meals.md"),
+                     "--bundle-out", str(out / "bundle.md"), "--skip-nashi", "--jobs", "1", *extra])
+    finally:
+        instrument.disable()
+
+def run_report(db, out, *extra):
+    diary_db.main(["report", "--db", str(db), "--ideas-out", str(out / "ideas.md"), "--meals-out",
+                   str(out / "meals.md"), "--bundle-out", str(out / "bundle.md"), "--skip-nashi", *extra])
+
+@pytest.mark.parametrize("rng", [(), ("--week", "2024-01-10"), ("--from", "2024-01-12", "--to", "2024-01-20")])
+def test_report_matches_make_weekly(tmp_path, src, rng):
+    db = tmp_path / "diary.sqlite3"
+    diary_db.main(["index", "--src", str(src), "--db", str(db), "--jobs", "1"])
+    run_report(db, tmp_path / "report", *rng)
+    run_weekly(src, tmp_path / "weekly", *rng)
+    assert outputs(tmp_path / "report") == outputs(tmp_path / "weekly")
+
+def test_index_only_reparses_changed_files(tmp_path, src):
+    old_ns = 1_600_000_000 * 1_000_000_000
+    for fp in src.iterdir():
+        os.utime(fp, ns=(old_ns, old_ns))
+    conn = diary_db.connect(tmp_path / "diary.sqlite3")
+    assert diary_db.index(conn, src, 1) == (20, 0, 0)
+    assert diary_db.index(conn, src, 1) == (0, 20, 0)
+
+    write_page(src, 3, "追記")                        # 中身が変わった
+    touched = write_page(src, 4)                       # 同じ中身で mtime だけ変わった
+    os.utime(touched, ns=(old_ns + 10**9, old_ns + 10**9))
+    (src / "2024年1月11日.md").unlink()               # i = 5
+    assert diary_db.index(conn, src, 1) == (1, 18, 1)
+
+    entries = diary_db.query_entries(conn, (FIRST_DAY, FIRST_DAY + timedelta(days=6)))
+    assert [e.date.day for e in entries] == [6, 7, 8, 9, 10, 12]
+    ideas = dict(diary_db.query_ideas(conn, None, skip_nashi=False))
+    assert ideas[FIRST_DAY + timedelta(days=3)].lines() == ["アイデア 3", "追記"]
+    conn.close()
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+"""段階ごとの時間とカウンタ（instrument と --stats / --stats-json）。"""
+
+import json
+import os
+
+import pytest
+
+from weekly_report_kit import instrument, notion_corpus
+from weekly_report_kit.make_notion_report import main
+
+PAGES = {
+    "a.md": "# 2024年1月6日\n\n## 🧪 習慣ログ\n【食事】朝: パン\n\n## ✨ ひらめき\nアイデア\n",
+    "b.md": "# 2024年1月7日\n\n## 🚧 振返り・分析・改善点\n早く寝る\n\n## その他\nメモ\n",
+    "c.md": "# 2024年1月8日\n\n本文だけ\n",
+    "d.md": "日付なし\n\n## 🧪 習慣ログ\nx\n",
+}
+
+@pytest.fixture(autouse=True)
+def reset():
+    yield
+    instrument.disable()
+
+@pytest.fixture
+def src(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    for name, text in PAGES.items():
+        (src / name).write_text(text, encoding="utf-8")
+    return src
+
+def test_disabled_is_a_no_op():
+    with instrument.phase("parse"):
+        instrument.count("files_scanned")
+    assert instrument.active() is None and instrument.snapshot() is None
+
+def test_phases_and_counters_add_up():
+    stats = instrument.enable()
+    for _ in range(3):
+        with instrument.phase("parse"):
+            instrument.count("lines_scanned", 10)
+    with instrument.phase("walk"):
+        instrument.count("custom")
+    # ワーカーの結果を合流する
+    stats.merge({"phases": {"parse": [1.0, 0.5, 2]}, "counters": {"lines_scanned": 5, "files_scanned": 2}})
+
+    d = stats.to_dict()
+    assert list(d["phases"]) == ["walk", "parse"]  # PHASES の順
+    assert d["phases"]["parse"]["calls"] == 5 and d["phases"]["parse"]["wall_s"] >= 1.0
+    assert d["counters"] == {"files_scanned": 2, "lines_scanned": 35, "custom": 1}
+    text = stats.summary()
+    assert text.startswith("[stats] total ") and "[stats]   lines_scanned" in text
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_stats_json_counts_the_run(src, tmp_path, capsys, monkeypatch, jobs):
+    # ワーカーの計測結果も合流して同じ数になる
+    monkeypatch.setattr(notion_corpus, "PARALLEL_MIN_FILES", 1)
+    out = tmp_path / "bundle.md"
+    main(["--src", str(src), "--bundle-out", str(out), "--jobs", jobs,
+          "--stats", "--stats-json", str(tmp_path / "stats.json")])
+    d = json.loads((tmp_path / "stats.json").read_text(encoding="utf-8"))
+    data = [(src / name).read_bytes() for name in PAGES]
+    assert d["counters"] == {
+        "files_scanned": 4, "files_out_of_range": 0, "files_no_date": 1,
+        "bytes_read": sum(len(b) for b in data), "lines_scanned": sum(b.count(b"\n") for b in data),
+        "headings_classified": 8,  # # と ## の行
+        "sections_emitted": 3, "bytes_written": out.stat().st_size, "reports_written": 1,
+    }
+    assert {"walk", "read", "parse", "sort", "write"} <= d["phases"].keys()
+    assert all(p["calls"] >= 1 and p["wall_s"] >= 0 for p in d["phases"].values())
+    assert "[stats]   files_scanned" in capsys.readouterr().err
+
+def test_cached_run_reads_nothing(src, tmp_path):
+    args = ["--src", str(src), "--bundle-out", str(tmp_path / "bundle.md"), "--jobs", "1",
+            "--cache-dir", str(tmp_path / "cache"), "--stats-json", str(tmp_path / "stats.json")]
+    main(args)
+    expected = (tmp_path / "bundle.md").read_bytes()
+    # 書いた直前に更新されたファイルは中身で確かめるので、mtime を古くする
+    for fp in src.iterdir():
+        os.utime(fp, ns=(1_700_000_000_000_000_000, 1_700_000_000_000_000_000))
+    main(args)
+    main(args)
+    d = json.loads((tmp_path / "stats.json").read_text(encoding="utf-8"))
+    assert "bytes_read" not in d["counters"] and "parse" not in d["phases"]
+    assert d["counters"]["files_scanned"] == 4 and "cache" in d["phases"]
+    assert (tmp_path / "bundle.md").read_bytes() == expected
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+"""Section（ファイルのバイト列への範囲）と detach 後の持ち方。"""
+
+import pickle
+
+import pytest
+
+from weekly_report_kit.make_notion_report import extract_entry
+from weekly_report_kit.notion_corpus import parse_file
+
+PAGE = "# 2024年1月6日\n\n## 🧪 習慣ログ\n朝\n日付: 2024年1月6日\n夜\n\n## メモ\n対象外\n## ✨ ひらめき\nアイデア\n"
+
+def parse(fp):
+    _, results = parse_file(fp, {"entry": extract_entry})
+    return results["entry"]
+
+def bodies(entry):
+    return [(sec.head, sec.body_bytes()) for sec in entry.sections]
+
+EXPECT = [("## 🧪 習慣ログ", "朝\n夜\n\n".encode("utf-8")), ("## ✨ ひらめき", "アイデア\n".encode("utf-8"))]
+
+def test_plain_file_keeps_only_ranges(tmp_path):
+    fp = tmp_path / "a.md"
+    fp.write_text(PAGE, encoding="utf-8")
+    entry = parse(fp)
+    # 「日付:」行のところで範囲が分かれ、本文は元ファイルから読む
+    assert [len(sec.spans) for sec in entry.sections] == [2, 1]
+    assert all(sec.buf is None and sec.origin.path == str(fp) for sec in entry.sections)
+    assert bodies(entry) == EXPECT
+    # pickle しても範囲のまま（キャッシュ・ワーカーからの返却）
+    again = pickle.loads(pickle.dumps(entry))
+    assert again.sections[0].buf is None and bodies(again) == EXPECT
+
+@pytest.mark.parametrize("data", [
+    PAGE.replace("\n", "\r\n").encode("utf-8"),
+    PAGE.encode("utf-8").replace("アイ".encode("utf-8"), "アイ".encode("utf-8") + b"\xff"),  # 不正な UTF-8
+])
+def test_rewritten_buffers_are_compacted(tmp_path, data):
+    # CRLF の正規化や不正な UTF-8 の除去でファイルとずれるものは、参照する本文だけを詰めて持つ
+    fp = tmp_path / "a.md"
+    fp.write_bytes(data)
+    entry = parse(fp)
+    assert all(sec.buf is not None and sec.origin is None for sec in entry.sections)
+    assert bodies(entry) == EXPECT
+    assert bodies(pickle.loads(pickle.dumps(entry))) == EXPECT
+
+def test_changed_source_is_detected(tmp_path):
+    fp = tmp_path / "a.md"
+    fp.write_text(PAGE, encoding="utf-8")
+    entry = parse(fp)
+    fp.write_text(PAGE + "追記\n", encoding="utf-8")
+    with pytest.raises(RuntimeError, match="実行中に変更"):
+        entry.sections[0].body_bytes()
+
+def test_load_keeps_the_body_after_the_file_changes(tmp_path):
+    fp = tmp_path / "a.md"
+    fp.write_text(PAGE, encoding="utf-8")
+    entry = parse(fp)
+    for sec in entry.sections:
+        sec.load()
+    fp.write_text("別の中身\n", encoding="utf-8")
+    assert bodies(entry) == EXPECT
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+
+"""見出しトークナイザで解析した結果が、従来の行ごとの解析（read_text().splitlines()）と一致するか。"""
+
+import random
+import re
+from datetime import date
+from typing import List, Optional, Tuple
+
+import pytest
+
+from weekly_report_kit.extract_notion_diary_multi import extract_ideas_and_meals
+from weekly_report_kit.make_notion_report import H2_KEYS, extract_entry
+from weekly_report_kit.md_spans import normalize_newlines
+
+# ---- 従来の解析（baseline の scripts/ から判定部分だけ） ----
+
+NBSP = "\u00A0"
+RE_H1_DATE = re.compile(r"^\s*#\s*(\d{4})年(\d{1,2})月(\d{1,2})日")
+RE_LINE_DATE = re.compile(r"^\s*日付\s*[:：]\s*(\d{4})年(\d{1,2})月(\d{1,2})日")
+
+def norm(s: str) -> str:
+    return s.replace(NBSP, " ")
+
+def old_date(line: str) -> Optional[date]:
+    m = RE_H1_DATE.match(norm(line).strip()) or RE_LINE_DATE.match(norm(line).strip())
+    return date(*map(int, m.groups())) if m else None
+
+def old_target(h2_line: str) -> bool:
+    s = re.sub(r"\s+", " ", norm(h2_line.strip()))
+    if not s.startswith("##"):
+        return False
+    title = s[2:].strip().replace("振り返り", "振返り")
+    return any(key.replace("振り返り", "振返り") in title for key in H2_KEYS)
+
+def old_entry(lines: List[str]) -> Tuple[Optional[str], Optional[date], List[Tuple[str, List[str]]]]:
+    title_h1, d = None, None
+    for ln in lines:
+        if title_h1 is None and norm(ln).strip().startswith("# "):
+            title_h1 = ln.rstrip("\n")
+            d = d or old_date(ln)
+        if d is None:
+            d = old_date(ln)
+    sections, i = [], 0
+    while i < len(lines):
+        if norm(lines[i]).startswith("## ") and old_target(lines[i]):
+            head, j, chunk = lines[i].rstrip("\n"), i + 1, []
+            while j < len(lines) and not (norm(lines[j]).startswith("## ") or norm(lines[j]).startswith("# ")):
+                if not RE_LINE_DATE.match(norm(lines[j])):
+                    chunk.append(lines[j].rstrip("\n"))
+                j += 1
+            sections.append((head, chunk))
+            i = j
+        else:
+            i += 1
+    return title_h1, d, sections
+
+def old_ideas_meals(lines: List[str]) -> Tuple[Optional[date], List[str], List[str]]:
+    d = None
+    for ln in lines[:20]:
+        if d:
+            break
+        d = old_date(ln)
+    ideas: List[str] = []
+    meals: List[str] = []
+    i = 0
+    while i < len(lines):
+        line = norm(lines[i])
+        is_ideas = line.startswith("## ") and "✨" in line and "ひらめき" in line
+        is_habit = line.startswith("## ") and "🧪" in line and "習慣ログ" in line
+        if not (is_ideas or is_habit):
+            i += 1
+            continue
+        j, block = i + 1, []
+        while j < len(lines) and not (norm(lines[j]).startswith("## ") or norm(lines[j]).startswith("# ")):
+            if not (is_ideas and RE_LINE_DATE.match(norm(lines[j]))):
+                block.append(lines[j].rstrip("\n"))
+            j += 1
+        if is_ideas:
+            ideas = block
+        else:
+            meals = []
+            for k, row in enumerate(block):
+                if "【食事】" in row:
+                    meals = ["【食事】"]
+                    for row in block[k + 1:]:
+                        if row.startswith("【") and not row.startswith("【食事】"):
+                            break
+                        meals.append(row)
+                    break
+        i = j
+    return d, ideas, meals
+
+# ---- 比較 ----
+
+def assert_same(text: str) -> None:
+    data = text.encode("utf-8")
+    lines = data.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n").splitlines(keepends=True)
+    buf = normalize_newlines(data)
+
+    entry = extract_entry(buf)
+    assert (entry.title_h1, entry.date, [(s.head, s.lines()) for s in entry.sections]) == old_entry(lines)
+
+    page = extract_ideas_and_meals(buf)
+    ideas = page.ideas.lines() if page.ideas else []
+    meals = [page.meals.head] + page.meals.lines() if page.meals else []
+    assert (page.date, ideas, meals) == old_ideas_meals(lines)
+
+PAGE = ("# 2024年1月6日 土曜\n\n日付: 2024年1月6日\n\n"
+        "## 🧪 習慣ログ\n【睡眠】7h\n【食事】\n朝: パン\n昼: そば\n【運動】散歩\n\n"
+        "## ✨ ひらめき\n日付: 2024年1月6日\nアイデア # 見出しではない\n\n"
+        "## メモ\n対象外\n"
+        "## 🚧 振り返り・分析・改善点\n振返り\n")
+
+@pytest.mark.parametrize("sep", ["\x0b", "\x0c", "\x1c", "\x1d", "\x1e", "\x85", "\u2028", "\u2029"])
+def test_splitlines_separators_end_lines(sep):
+    # 従来は str.splitlines() で行に分けていたので、これらの文字も行末になる
+    assert_same(PAGE.replace("昼: そば\n", f"昼: そば{sep}【間食】なし\n")
+                .replace("アイデア", f"アイデア{sep}## ✨ ひらめき（続き）{sep}{sep}\n次"))
+    assert_same(PAGE.replace("\n## メモ", f"{sep}## メモ") + sep)
+
+@pytest.mark.parametrize("text", [
+    # ファイル先頭がいきなり見出し・最後の行に改行なし
+    "## ✨ ひらめき\nアイデア\n# 2024年1月6日",
+    # 「#」で始まるが見出しではない行（#タグ・###・#だけ）と行の途中の「#」
+    PAGE.replace("朝: パン", "#タグ\n### 小見出し\n#\n朝: パン #1"),
+    # 「日付」が行の途中・行頭の空白（全角空白・タブ・NBSP）付きの「日付:」行
+    PAGE.replace("アイデア", "今日の日付: 2024年1月6日 のメモ\n　日付：2024年1月6日\n\t日付 : 2024年1月6日\n"
+                 " 日付: 2024年1月6日\n日付: 未定"),
+    # NBSP 区切りの見出しと、空白の多い見出し
+    PAGE.replace("## ✨ ひらめき", "##\u00A0✨\u00A0ひらめき").replace("## 🚧", "##   🚧  "),
+    # H1 が無く日付は「日付:」行だけ・本文が長い
+    "日付: 2024年2月1日\n## 🧠 新たな学び・気づき・共感\n" + "本文の行\n" * 5000 + "## ☀️ 今日の実践\n実践",
+    # CRLF / CR の混在
+    PAGE.replace("\n", "\r\n", 5).replace("\n", "\r", 3),
+])
+def test_fast_path_matches_line_by_line(text):
+    assert_same(text)
+
+# 見出しの表記ゆれ・対象外の見出し・「日付:」行・【…】行・見出しに似た本文行を混ぜる
+LINE_POOL = (
+    [f"## {key}" for key in H2_KEYS] +
+    ["## 🚧 振り返り・分析・改善点", "##\u00A0✨\u00A0ひらめき", "##  🧪  習慣ログ  ", "## ☀️ 今日の実践（朝）",
+     "## ✨ひらめき", "## メモ", "##メモ", "### ✨ ひらめき", "# 2024年3月1日", "# タイトル", "#タグ",
+     "日付: 2024年3月1日", "　日付：2024年3月2日", "日付: なし", "【食事】", "【食事】朝: パン", "【運動】散歩",
+     "【 睡眠】", "- なし", "なし", "", " ", "本文 ## の途中", "本文の行", "日付の話"]
+)
+
+def random_page(rng: random.Random) -> str:
+    lines = [rng.choice(LINE_POOL) for _ in range(rng.randrange(0, 40))]
+    text = "\n".join(lines)
+    return text + "\n" if rng.random() < 0.8 else text
+
+def test_tokenizer_matches_line_by_line_parsers():
+    rng = random.Random(0)
+    for _ in range(2000):
+        assert_same(random_page(rng))
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+
+"""ParseCache（サイズ・mtime・中身の digest で検証する解析キャッシュ）。"""
+
+import os
+import time
+
+from weekly_report_kit import instrument
+from weekly_report_kit.make_weekly import main
+from weekly_report_kit.parse_cache import CACHE_FILE, ParseCache, file_digest
+
+OLD_NS = 1_600_000_000 * 1_000_000_000  # racy にならない過去の mtime
+
+def write(path, text, mtime_ns=OLD_NS):
+    path.write_text(text, encoding="utf-8")
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+    return os.stat(path)
+
+class Reader:
+    """lookup に渡す read()。呼ばれた回数を数える。"""
+
+    def __init__(self, path):
+        self.path = path
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.path.read_bytes()
+
+def store(cache, path, st, results):
+    cache.store(str(path), st, file_digest(path.read_bytes()), results)
+
+def reopen(tmp_path, cache, **kw):
+    cache.save()
+    return ParseCache.open(tmp_path / "cache", **kw)
+
+def test_unchanged_file_is_reused_without_reading(tmp_path):
+    fp = tmp_path / "a.md"
+    st = write(fp, "本文")
+    cache = ParseCache.open(tmp_path / "cache")
+    assert cache.lookup(str(fp), st, ["entry"], Reader(fp)) == ({}, None)
+    store(cache, fp, st, {"entry": ["解析結果"]})
+
+    cache = reopen(tmp_path, cache)
+    read = Reader(fp)
+    assert cache.lookup(str(fp), os.stat(fp), ["entry"], read) == ({"entry": ["解析結果"]}, None)
+    assert read.calls == 0 and (cache.hits, cache.misses) == (1, 0)
+
+def test_size_change_is_a_miss(tmp_path):
+    fp = tmp_path / "a.md"
+    cache = ParseCache.open(tmp_path / "cache")
+    store(cache, fp, write(fp, "本文"), {"entry": 1})
+    cache = reopen(tmp_path, cache)
+    results, _ = cache.lookup(str(fp), write(fp, "本文が増えた"), ["entry"], Reader(fp))
+    assert results == {} and str(fp) not in cache.entries
+
+def test_mtime_change_checks_the_digest(tmp_path):
+    fp = tmp_path / "a.md"
+    cache = ParseCache.open(tmp_path / "cache")
+    store(cache, fp, write(fp, "本文"), {"entry": 1})
+    cache = reopen(tmp_path, cache)
+
+    # 中身が同じ（解凍し直し等）→ 読んで確かめて再利用。mtime は更新される
+    read = Reader(fp)
+    results, data = cache.lookup(str(fp), write(fp, "本文", OLD_NS + 10**9), ["entry"], read)
+    assert results == {"entry": 1} and data == "本文".encode("utf-8") and read.calls == 1
+    # 同じサイズで中身が違う → 解析し直し（読んだ中身は返して使い回す）
+    results, data = cache.lookup(str(fp), write(fp, "本義", OLD_NS + 2 * 10**9), ["entry"], Reader(fp))
+    assert results == {} and data == "本義".encode("utf-8")
+
+def test_racy_entry_is_verified_even_if_size_and_mtime_match(tmp_path):
+    fp = tmp_path / "a.md"
+    now = time.time_ns()
+    cache = ParseCache.open(tmp_path / "cache")
+    store(cache, fp, write(fp, "本文", now), {"entry": 1})
+    cache = reopen(tmp_path, cache)
+
+    # 保存直前に書かれたファイルが、同じ mtime の粒度の中で同じサイズに書き換わった
+    st = write(fp, "本義", now)
+    results, _ = cache.lookup(str(fp), st, ["entry"], Reader(fp))
+    assert results == {}
+
+def test_missing_kind_is_parsed_and_added(tmp_path):
+    fp = tmp_path / "a.md"
+    st = write(fp, "本文")
+    cache = ParseCache.open(tmp_path / "cache")
+    store(cache, fp, st, {"entry": 1})
+    results, _ = cache.lookup(str(fp), st, ["entry", "ideas_meals"], Reader(fp))
+    assert results == {"entry": 1} and cache.misses == 1
+    store(cache, fp, st, {"ideas_meals": 2})
+    cache = reopen(tmp_path, cache)
+    assert cache.lookup(str(fp), st, ["entry", "ideas_meals"], Reader(fp))[0] == {"entry": 1, "ideas_meals": 2}
+
+def test_least_recently_used_runs_are_evicted(tmp_path):
+    files = [tmp_path / f"{i}.md" for i in range(4)]
+    stats = [write(fp, f"本文 {i}") for i, fp in enumerate(files)]
+    blob = "x" * 1000
+    cache = ParseCache.open(tmp_path / "cache", max_bytes=3500)
+    for fp, st in zip(files, stats):
+        store(cache, fp, st, {"entry": blob})
+    cache = reopen(tmp_path, cache, max_bytes=3500)  # 4000 バイト超 → 1つ捨てる（同じ run なので順不同）
+    assert len(cache.entries) == 3
+
+    # 次の run で使った2つは残り、使わなかったものから捨てる
+    kept = [fp for fp in files if str(fp) in cache.entries]
+    for fp in kept[:2]:
+        cache.lookup(str(fp), os.stat(fp), ["entry"], Reader(fp))
+    extra = tmp_path / "new.md"
+    store(cache, extra, write(extra, "新しい"), {"entry": blob})
+    cache = reopen(tmp_path, cache, max_bytes=3500)
+    assert set(cache.entries) == {str(kept[0]), str(kept[1]), str(extra)}
+
+def test_corrupt_cache_file_starts_empty(tmp_path):
+    (tmp_path / "cache").mkdir()
+    (tmp_path / "cache" / CACHE_FILE).write_bytes(b"not a pickle")
+    cache = ParseCache.open(tmp_path / "cache")
+    assert cache.entries == {}
+
+def test_second_run_reuses_every_page(tmp_path, capsys):
+    src = tmp_path / "src"
+    src.mkdir()
+    for i in range(5):
+        write(src / f"{i}.md", f"# 2024年1月{i + 6}日\n\n## ✨ ひらめき\nアイデア {i}\n")
+    argv = ["--src", str(src), "--cache-dir", str(tmp_path / "cache"), "--ideas-out", str(tmp_path / "ideas.md"),
+            "--jobs", "1"]
+    try:
+        main(argv)
+        first = (tmp_path / "ideas.md").read_bytes()
+        assert "reused: 0  parsed: 5" in capsys.readouterr().out
+        main(argv)
+    finally:
+        instrument.disable()
+    assert "reused: 5  parsed: 0" in capsys.readouterr().out
+    assert (tmp_path / "ideas.md").read_bytes() == first
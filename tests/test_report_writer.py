@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+
+"""ReportWriter（元ファイルの範囲をカーネル内でコピーする書き出し）。"""
+
+import os
+
+from weekly_report_kit import report_writer
+from weekly_report_kit.md_spans import Origin, Section
+from weekly_report_kit.parse_cache import file_digest
+from weekly_report_kit.report_writer import ReportWriter
+
+BODY = "".join(f"本文の行 {i}\n" for i in range(2000)).encode("utf-8")
+
+def file_section(tmp_path):
+    src = tmp_path / "page.md"
+    src.write_bytes(b"# head\n" + BODY)
+    origin = Origin(os.path.abspath(src), len(BODY) + 7, file_digest(src.read_bytes()))
+    return Section("## 本文", None, [(7, 7 + len(BODY) // 2), (7 + len(BODY) // 2, 7 + len(BODY))], origin)
+
+def write(path, sec):
+    with ReportWriter(path) as w:
+        w.line("# レポート")
+        w.line(sec.head)
+        w.body(sec)
+        w.line("")
+
+def test_body_is_copied_from_the_source_file(tmp_path):
+    write(tmp_path / "out.md", file_section(tmp_path))
+    assert (tmp_path / "out.md").read_bytes() == "# レポート\n## 本文\n".encode("utf-8") + BODY
+
+def test_kernel_copy_returning_zero_falls_back(tmp_path, monkeypatch):
+    sec = file_section(tmp_path)
+    write(tmp_path / "expect.md", sec)
+
+    # 元ファイルは変わっていないのに 0 を返す（別ファイルシステム間で未対応のカーネル等）
+    calls = []
+    def zero(*args):
+        calls.append(args)
+        return 0
+    monkeypatch.setattr(os, "copy_file_range", zero, raising=False)
+    monkeypatch.setattr(report_writer, "_KERNEL_COPY", ["copy_file_range"])
+    write(tmp_path / "out.md", sec)
+
+    assert calls
+    assert (tmp_path / "out.md").read_bytes() == (tmp_path / "expect.md").read_bytes()
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+"""Toggl Detailed CSV の集計（TogglStats）・レコードの境界での範囲分割と並列集計・toggl.md。"""
+
+import csv
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+
+import pytest
+from toggl_rows import HEADER, random_rows, toggl_row, write_toggl_csv
+
+from weekly_report_kit import instrument, toggl_csv
+from weekly_report_kit.make_toggl_report import main
+from weekly_report_kit.toggl_csv import NO_CLIENT, NO_PROJECT, NO_TAG, TogglStats, load_stats
+
+SAT = date(2024, 1, 6)
+
+def rows():
+    return [
+        toggl_row(datetime(2024, 1, 6, 9), 3600, "A社", "開発", tags="集中, 会議"),
+        toggl_row(datetime(2024, 1, 12, 23, 30), 3600, "", "", tags=""),  # 金曜（日をまたいでも開始日）
+        toggl_row(datetime(2024, 1, 13, 10), 1800, "A社", "開発", tags="集中"),  # 次の週
+        {**toggl_row(datetime(2024, 1, 7, 10), 60), "Duration": ""},  # 計測中のまま
+        {**toggl_row(datetime(2024, 1, 7, 10), 60), "Start date": "2024-13-01"},  # 壊れた日付
+    ]
+
+def test_weekly_buckets(tmp_path):
+    # 列の並びが違っても見出しで引く
+    path = write_toggl_csv(tmp_path / "t.csv", rows(), header=list(reversed(HEADER)))
+    stats = load_stats([path])
+    assert (stats.entries, stats.skipped) == (3, 2)
+    assert stats.weeks() == [SAT, date(2024, 1, 13)]
+    assert stats.days == {SAT: 3600, date(2024, 1, 12): 3600, date(2024, 1, 13): 1800}
+    assert stats.projects[SAT, "A社", "開発"] == 3600
+    assert stats.projects[SAT, NO_CLIENT, NO_PROJECT] == 3600
+    # 複数タグはそれぞれに全時間
+    assert (stats.tags[SAT, "集中"], stats.tags[SAT, "会議"], stats.tags[SAT, NO_TAG]) == (3600, 3600, 3600)
+
+    week = load_stats([path], (SAT, date(2024, 1, 12)))
+    assert week.entries == 2 and week.weeks() == [SAT]
+
+def test_missing_column_is_an_error(tmp_path, capsys):
+    path = write_toggl_csv(tmp_path / "t.csv", rows(), header=[h for h in HEADER if h != "Duration"])
+    try:
+        with pytest.raises(SystemExit):
+            main(["--src", str(path), "--out", str(tmp_path / "toggl.md"), "--jobs", "1"])
+    finally:
+        instrument.disable()
+    assert "duration" in capsys.readouterr().err
+
+def test_report(tmp_path):
+    write_toggl_csv(tmp_path / "csv" / "t.csv", rows())
+    try:
+        main(["--src", str(tmp_path / "csv"), "--out", str(tmp_path / "toggl.md"), "--week", "2024-01-10",
+              "--jobs", "1"])
+    finally:
+        instrument.disable()
+    text = (tmp_path / "toggl.md").read_text(encoding="utf-8")
+    assert text.startswith("## 2024-W02（2024-01-06〜2024-01-12）\n\n合計: 2:00\n")
+    assert "| 2024-01-06（土） | 1:00 | 50.0% |" in text
+    assert "| A社 | 開発 | 1:00 | 50.0% |" in text
+    assert "2024-01-13" not in text
+
+def test_ranges_start_at_record_boundaries(tmp_path, monkeypatch):
+    # 引用符の中の改行（複数行の説明）や「""」を含む CSV を小さい範囲に分ける
+    monkeypatch.setattr(toggl_csv, "MIN_RANGE_BYTES", 97)
+    path = write_toggl_csv(tmp_path / "t.csv", random_rows(300))
+    _, start = toggl_csv.read_header(path)
+    size = path.stat().st_size
+    data = path.read_bytes()
+    with ThreadPoolExecutor(2) as ex:
+        ranges = toggl_csv.split_ranges(ex, path, start, size, 4)
+
+    assert len(ranges) > 10
+    assert ranges[0][0] == start and ranges[-1][1] == size
+    assert all(e == s for (_, e), (s, _) in zip(ranges, ranges[1:]))
+    # 各範囲を読んだレコードをつなぐと、ファイル全体を読んだのと同じ
+    records = []
+    for s, e in ranges:
+        assert data[s - 1:s] == b"\n"
+        with toggl_csv.open_range(path, s, e) as f:
+            records.extend(csv.reader(f))
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        assert records == list(csv.reader(f))[1:]
+
+def test_parallel_stats_match_serial(tmp_path, monkeypatch):
+    monkeypatch.setattr(toggl_csv, "PARALLEL_MIN_BYTES", 1)
+    monkeypatch.setattr(toggl_csv, "MIN_RANGE_BYTES", 1000)
+    files = [write_toggl_csv(tmp_path / f"{i}.csv", random_rows(500, seed=i)) for i in range(2)]
+    serial = load_stats(files, jobs=1)
+    parallel = load_stats(files, jobs=4)
+    for name in TogglStats.__slots__:
+        assert getattr(parallel, name) == getattr(serial, name), name
+    assert serial.entries == 1000
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+"""Toggl の永続ストア（toggl_db）: 重なる CSV の重複除去・差分の取り込み・manifest と索引の作り直し・まとめ。"""
+
+import csv
+import json
+
+import pytest
+from toggl_rows import HEADER, random_rows, write_toggl_csv
+
+from weekly_report_kit import toggl_db
+from weekly_report_kit.toggl_csv import TogglStats, load_stats
+from weekly_report_kit.toggl_db import KEYS_FILE, MANIFEST, db_stats, ingest, load_manifest, main
+
+ROWS = random_rows(500, seed=3)
+
+def assert_same_stats(a, b):
+    for name in TogglStats.__slots__:
+        assert getattr(a, name) == getattr(b, name), name
+
+def segment_files(root):
+    return sorted(p.name for p in root.glob("seg-*.store"))
+
+@pytest.fixture
+def root(tmp_path):
+    return tmp_path / "store"
+
+def test_overlapping_exports_are_counted_once(tmp_path, root):
+    a = write_toggl_csv(tmp_path / "csv" / "a.csv", ROWS[:300])
+    b = write_toggl_csv(tmp_path / "csv" / "b.csv", ROWS[200:])
+    r = ingest(root, [a, b])
+    assert (r.new_files, r.added, r.duplicates, r.entries) == (2, 500, 100, 500)
+    whole = write_toggl_csv(tmp_path / "all.csv", ROWS)
+    assert_same_stats(db_stats(root), load_stats([whole]))
+
+    m = load_manifest(root)
+    assert m["entries"] == 500 and [n for n, _ in m["segments"]] == segment_files(root)
+    assert (root / KEYS_FILE).exists()
+
+    # 変わっていない CSV・名前だけ違うコピーは読まない
+    (tmp_path / "csv" / "copy.csv").write_bytes(a.read_bytes())
+    r = ingest(root, [a, b, tmp_path / "csv" / "copy.csv"])
+    assert (r.new_files, r.unchanged, r.same_content, r.added, r.entries) == (0, 2, 1, 0, 500)
+    assert len(segment_files(root)) == 1
+
+def test_appended_rows_are_read_from_the_tail(tmp_path, root, monkeypatch):
+    a = write_toggl_csv(tmp_path / "a.csv", ROWS[:300])
+    ingest(root, [a])
+    old_size = a.stat().st_size
+    with open(a, "a", encoding="utf-8", newline="") as f:
+        csv.DictWriter(f, fieldnames=HEADER).writerows(ROWS[300:])
+    read = []
+    parse_range = toggl_db.parse_range
+
+    def spy(fp, start, end, col):
+        read.append((start, end))
+        return parse_range(fp, start, end, col)
+    monkeypatch.setattr(toggl_db, "parse_range", spy)
+
+    r = ingest(root, [a])
+    assert (r.new_files, r.appended, r.added, r.duplicates, r.entries) == (1, 1, 200, 0, 500)
+    assert read == [(old_size, a.stat().st_size)]  # 足された範囲だけ
+    assert_same_stats(db_stats(root), load_stats([a]))
+
+def test_rewritten_file_is_read_whole(tmp_path, root):
+    a = write_toggl_csv(tmp_path / "a.csv", ROWS[:300])
+    ingest(root, [a])
+    write_toggl_csv(a, ROWS[100:400])  # 先頭が変わった（後ろに足しただけではない）
+    r = ingest(root, [a])
+    assert (r.appended, r.added, r.duplicates, r.entries) == (0, 100, 200, 400)
+
+def test_broken_index_and_orphans_are_rebuilt(tmp_path, root, capsys):
+    a = write_toggl_csv(tmp_path / "a.csv", ROWS[:300])
+    b = write_toggl_csv(tmp_path / "b.csv", ROWS[250:])
+    ingest(root, [a])
+
+    # 索引が無い（世代が合わない）→ セグメントのキーから作り直して重複を判定する
+    (root / KEYS_FILE).unlink()
+    # manifest に無いセグメント（取り込みの途中で落ちたもの）は消す
+    (root / "seg-000099.store").write_bytes(b"partial")
+    r = ingest(root, [b])
+    assert (r.added, r.duplicates, r.entries) == (200, 50, 500)
+    assert "seg-000099.store" not in segment_files(root)
+
+    # セグメントが壊れていたら空から作り直す（CSV はすべて読み直す）
+    first = root / segment_files(root)[0]
+    first.write_bytes(first.read_bytes()[:100])
+    r = ingest(root, [a, b])
+    assert "作り直します" in capsys.readouterr().err
+    assert (r.new_files, r.added, r.entries) == (2, 500, 500)
+    assert_same_stats(db_stats(root), load_stats([write_toggl_csv(tmp_path / "all.csv", ROWS)]))
+
+def test_segments_are_compacted(tmp_path, root, monkeypatch):
+    monkeypatch.setattr(toggl_db, "MAX_SEGMENTS", 2)
+    files = [write_toggl_csv(tmp_path / f"{i}.csv", ROWS[i * 100:(i + 1) * 100]) for i in range(5)]
+    for i in range(3):
+        ingest(root, files[:i + 1])
+    # 3つ目のセグメントでまとめる
+    m = load_manifest(root)
+    assert len(m["segments"]) == 1 and segment_files(root) == [m["segments"][0][0]]
+    assert m["segments"][0][1] == m["entries"] == 300
+    r = ingest(root, files)
+    assert (r.added, r.entries) == (200, 500)
+    assert_same_stats(db_stats(root), load_stats(files))
+
+def test_main_summary(tmp_path, root, capsys):
+    write_toggl_csv(tmp_path / "csv" / "a.csv", ROWS)
+    main(["ingest", "--src", str(tmp_path / "csv"), "--store", str(root), "--jobs", "1"])
+    assert "added: 500" in capsys.readouterr().out
+    main(["summary", "--store", str(root), "--top", "3"])
+    out = capsys.readouterr().out
+    assert out.startswith("[store] 500 entries  (1 segments:")
+    assert "## プロジェクト（上位3）" in out and "## エントリの長さ" in out
+    assert json.loads((root / MANIFEST).read_text(encoding="utf-8"))["entries"] == 500
+
+    with pytest.raises(SystemExit):
+        main(["summary", "--store", str(tmp_path / "none")])
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+"""Toggl の列ストア（TogglStore）: CSV の集計との一致・保存と mmap での読み込み・壊れたファイル。"""
+
+from datetime import date, datetime
+
+import pytest
+from toggl_rows import random_rows, toggl_row, write_toggl_csv
+
+from weekly_report_kit import toggl_store
+from weekly_report_kit.toggl_csv import EntryColumns, TogglStats, load_stats, map_ranges
+from weekly_report_kit.toggl_store import TogglStore, histogram, parse_range, pivot, to_stats, top_n
+
+def build(files):
+    store = TogglStore()
+    for part in map_ranges(files, parse_range, EntryColumns):
+        store.extend(part)
+    return store
+
+def assert_same_stats(a, b):
+    for name in TogglStats.__slots__:
+        assert getattr(a, name) == getattr(b, name), name
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "numpy":
+        if toggl_store.np is None:
+            pytest.skip("NumPy が無い")
+    else:
+        monkeypatch.setattr(toggl_store, "np", None)
+    return request.param
+
+@pytest.fixture
+def files(tmp_path):
+    rows = random_rows(400, seed=1)
+    rows.append({**toggl_row(datetime(2024, 1, 7, 10), 60), "Duration": ""})  # 読めない行
+    return [write_toggl_csv(tmp_path / "a.csv", rows), write_toggl_csv(tmp_path / "b.csv", random_rows(300, seed=2))]
+
+def test_stats_match_csv(files, backend):
+    store = build(files)
+    assert len(store) == 700 and store.skipped == 1
+    assert_same_stats(to_stats(store), load_stats(files))
+    rng = (date(2024, 1, 13), date(2024, 1, 26))
+    assert_same_stats(to_stats(store, rng), load_stats(files, rng))
+
+def test_extend_remaps_dictionary_ids(tmp_path):
+    a = build([write_toggl_csv(tmp_path / "a.csv", [toggl_row(datetime(2024, 1, 6, 9), 60, "A社", "開発",
+                                                              tags="集中")])])
+    b = build([write_toggl_csv(tmp_path / "b.csv", [toggl_row(datetime(2024, 1, 6, 10), 120, "", "調査",
+                                                              tags="会議, 集中")])])
+    merged = TogglStore().extend(a).extend(b)
+    assert [merged.projects[p] for p in merged.project] == ["開発", "調査"]
+    assert [merged.clients[c] for c in merged.client] == ["A社", ""]
+    assert [merged.tags[t] for t in merged.tag_ids] == ["集中", "会議", "集中"]
+    assert list(merged.tag_ends) == [1, 3]
+    assert len(merged.tags) == 2
+    # rows 指定は選んだエントリだけ
+    only = TogglStore().extend(merged, [1])
+    assert list(only.duration) == [120] and [only.tags[t] for t in only.tag_ids] == ["会議", "集中"]
+
+def test_save_and_open(files, tmp_path, backend):
+    store = build(files)
+    store.sources = [str(fp) for fp in files]
+    path = tmp_path / "db" / "seg.store"
+    store.save(path)
+    opened = TogglStore.open(path)
+    try:
+        assert isinstance(opened.start, memoryview)  # コピーせずに mmap の上を見る
+        assert len(opened) == len(store) and opened.skipped == store.skipped
+        assert opened.sources == store.sources
+        for name, _ in toggl_store.COLUMNS:
+            assert list(getattr(opened, name)) == list(getattr(store, name)), name
+        for name in toggl_store.DICTS:
+            assert list(getattr(opened, name)) == list(getattr(store, name)), name
+        assert_same_stats(to_stats(opened), to_stats(store))
+
+        # 開いたストアにも足せる（列を array に写してから）
+        opened.extend(store, [0])
+        assert len(opened) == len(store) + 1 and isinstance(opened.start, toggl_store.array)
+    finally:
+        opened.close()
+    reopened = TogglStore.open(path)  # ファイルは変わらない
+    assert list(reopened.key) == list(store.key)
+    reopened.close()
+
+def test_open_rejects_broken_files(files, tmp_path):
+    path = tmp_path / "seg.store"
+    build(files).save(path)
+    data = path.read_bytes()
+    assert TogglStore.open(tmp_path / "missing.store") is None
+
+    path.write_bytes(data[:len(data) // 2])  # 途中で切れている
+    assert TogglStore.open(path) is None
+    path.write_bytes(b"XXXXXXXX" + data[8:])  # MAGIC が違う
+    assert TogglStore.open(path) is None
+    path.write_bytes(data.replace(b'"version": 2', b'"version": 1', 1))  # 形式が古い
+    assert TogglStore.open(path) is None
+    path.write_bytes(b"")
+    assert TogglStore.open(path) is None
+
+def test_pivot_histogram_top_n(files, backend):
+    store = build(files)
+    expected = {}
+    for p, sec in zip(store.project, store.duration):
+        expected[(p,)] = expected.get((p,), 0) + sec
+    assert pivot([store.project], store.duration) == expected
+
+    edges = (600, 3600)
+    assert histogram(store.duration, edges) == [
+        sum(v < 600 for v in store.duration),
+        sum(600 <= v < 3600 for v in store.duration),
+        sum(v >= 3600 for v in store.duration),
+    ]
+    assert top_n({"a": 1, "b": 3, "c": 3, "d": 2}, 3) == [("b", 3), ("c", 3), ("d", 2)]
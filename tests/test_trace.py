@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+"""--trace（Chrome trace_event 形式の追記）。"""
+
+import json
+import os
+
+import pytest
+
+from weekly_report_kit import instrument, notion_corpus
+from weekly_report_kit.make_notion_report import main
+
+@pytest.fixture(autouse=True)
+def reset():
+    yield
+    instrument.disable()
+
+def load_trace(path):
+    """末尾の "]" を省いた配列（追記の途中）を読む。"""
+    text = path.read_text(encoding="utf-8")
+    assert text.startswith("[\n") and text.endswith(",\n")
+    return json.loads(text[:-2] + "]")
+
+def test_trace_spans_per_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(notion_corpus, "PARALLEL_MIN_FILES", 1)
+    src = tmp_path / "src"
+    src.mkdir()
+    pages = [src / f"{i}.md" for i in range(4)]
+    for i, fp in enumerate(pages):
+        fp.write_text(f"# 2024年1月{i + 6}日\n\n## 🧪 習慣ログ\n{i}\n", encoding="utf-8")
+    out = tmp_path / "bundle.md"
+    trace = tmp_path / "trace.json"
+    args = ["--src", str(src), "--bundle-out", str(out), "--cache-dir", str(tmp_path / "cache"),
+            "--trace", str(trace)]
+
+    main(args + ["--jobs", "2"], prog="make_notion_report")
+    events = load_trace(trace)
+    files = {str(fp) for fp in pages}
+    by_name = {}
+    for e in events:
+        by_name.setdefault(e["name"], []).append(e)
+
+    # 解析はワーカーのプロセスで（pid ごとにプロセス名が付く）
+    names = {e["pid"]: e["args"]["name"] for e in by_name["process_name"]}
+    assert names[os.getpid()].startswith("make_notion_report")
+    assert {e["pid"] for e in by_name["parse"]} - {os.getpid()}
+    assert all(names[e["pid"]].startswith("worker") for e in by_name["parse"])
+    for name in ("read", "parse"):
+        assert {e["args"]["file"] for e in by_name[name]} == files
+        assert all(e["ph"] == "X" and e["cat"] == "file" and e["dur"] >= 1 for e in by_name[name])
+    assert {e["args"]["file"] for e in by_name["cache_miss"]} == files
+    assert all(e["ph"] == "i" for e in by_name["cache_miss"])
+    assert [e["args"]["file"] for e in by_name["write"] if "args" in e] == [str(out)]
+    # 段階（ファイルなし）も出る
+    assert any(e["cat"] == "phase" for e in by_name["walk"])
+
+    # 続けて実行すると同じファイルに追記する（mtime を古くした後の3回目はキャッシュの hit だけ）
+    for fp in pages:
+        os.utime(fp, ns=(1_700_000_000_000_000_000, 1_700_000_000_000_000_000))
+    main(args + ["--jobs", "1"])
+    second = load_trace(trace)
+    main(args + ["--jobs", "1"])
+    last = load_trace(trace)[len(second):]
+    assert second[:len(events)] == events
+    assert [e["name"] for e in last if e["ph"] == "M"] == ["process_name"]
+    assert {e["args"]["file"] for e in last if e["name"] == "cache_hit"} == files
+    assert not [e for e in last if e["name"] in ("parse", "cache_miss")]
+
+def test_no_trace_without_the_option(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "a.md").write_text("# 2024年1月6日\n", encoding="utf-8")
+    main(["--src", str(src), "--bundle-out", str(tmp_path / "bundle.md"), "--jobs", "1"])
+    assert instrument.TRACE is None
+    with instrument.span("write", "x"):
+        pass
+    instrument.mark("cache_hit", "x")
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+
+"""trigram 索引の候補（件数の少ない trigram から、候補に絞って引く）。"""
+
+import sqlite3
+
+from weekly_report_kit import trigram_index as ti
+
+def make_index(texts):
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(ti.SCHEMA)
+    for doc, text in enumerate(texts):
+        ti.add_doc(conn, doc, ti.normalize_text(text))
+    return conn
+
+def test_candidates_intersect_all_grams():
+    # よくある trigram（「今日は」）は全件、珍しい trigram は一部だけ
+    texts = [f"今日は晴れ {i}" for i in range(ti.SQL_VARS * 2)] + ["今日は雨で散歩", "今日は雨", "散歩した"]
+    conn = make_index(texts)
+    n = len(texts)
+    assert ti.candidates(conn, ti.query_terms("今日は 雨で散歩")) == {n - 3}
+    assert ti.candidates(conn, ti.query_terms("今日は")) == set(range(n - 1))
+    assert ti.candidates(conn, ti.query_terms("今日は 雪だった")) == set()
+    assert ti.candidates(conn, ti.query_terms("雨")) is None
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+
+"""make_weekly --watch（fs_watch の変更検出・WatchState の差分更新・実行中のプロセスでの書き直し）。"""
+
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from functools import partial
+from pathlib import Path
+
+import pytest
+
+from weekly_report_kit import instrument
+from weekly_report_kit.extract_notion_diary_multi import extract_ideas_and_meals
+from weekly_report_kit.fs_watch import InotifyWatcher, PollWatcher, open_watcher
+from weekly_report_kit.make_notion_report import extract_entry
+from weekly_report_kit.make_weekly import main, page_rows
+from weekly_report_kit.watch_weekly import WatchState
+
+ROOT = Path(__file__).resolve().parent.parent
+
+def page(day: int, idea: str = "アイデア", meal: str = "朝: パン", other: str = "メモ") -> str:
+    return (f"# 2024年1月{day}日\n\n## 🧪 習慣ログ\n【食事】\n{meal}\n\n## ✨ ひらめき\n{idea}\n\n"
+            f"## その他\n{other}\n")
+
+def write_pages(src: Path) -> None:
+    src.mkdir()
+    for day in (6, 7, 8):
+        (src / f"{day}.md").write_text(page(day, idea=f"アイデア {day}"), encoding="utf-8")
+
+@pytest.fixture(params=["inotify", "poll"])
+def watcher_of(request):
+    def make(root):
+        w = open_watcher(os.fspath(root), poll=request.param == "poll", interval=0.02)
+        if request.param == "inotify" and not isinstance(w, InotifyWatcher):
+            pytest.skip("inotify が使えない")
+        return w
+    return make
+
+def wait_for(w, expected, timeout=5.0):
+    """expected のパスがすべて出てくるまで集める。"""
+    seen = set()
+    deadline = time.monotonic() + timeout
+    while not expected <= seen and time.monotonic() < deadline:
+        paths, _ = w.wait(0.02, timeout=0.5)
+        seen |= paths
+    return seen
+
+def test_watcher_reports_changed_paths(tmp_path, watcher_of):
+    (tmp_path / "old.md").write_text("old", encoding="utf-8")
+    with watcher_of(tmp_path) as w:
+        assert w.wait(0.01, timeout=0.05) == (set(), False)
+        (tmp_path / "new.md").write_text("new", encoding="utf-8")
+        (tmp_path / "old.md").unlink()
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "sub" / "deep.md").write_text("deep", encoding="utf-8")
+        expected = {str(tmp_path / "new.md"), str(tmp_path / "old.md")}
+        seen = wait_for(w, expected)
+        assert expected <= seen
+        # 新しいフォルダはフォルダ（inotify。中身は呼び出し側が読む）か中のファイル（ポーリング）で返る
+        assert seen & {str(tmp_path / "sub"), str(tmp_path / "sub" / "deep.md")}
+        # フォルダの中のその後の変更も見る
+        (tmp_path / "sub" / "later.md").write_text("later", encoding="utf-8")
+        assert str(tmp_path / "sub" / "later.md") in wait_for(w, {str(tmp_path / "sub" / "later.md")})
+        if isinstance(w, PollWatcher):
+            # ポーリングは .md だけを見る
+            (tmp_path / "x.txt").write_text("x", encoding="utf-8")
+            assert w.wait(0.01, timeout=0.1) == (set(), False)
+
+def make_state(src: Path) -> WatchState:
+    parsers = {"ideas_meals": extract_ideas_and_meals, "entry": extract_entry}
+    rows_of = partial(page_rows, rng=None, want_ideas=True, want_meals=True, skip_nashi=False)
+    state = WatchState(src, None, parsers, rows_of, None, set())
+    state.load(None, 1)
+    return state
+
+def test_state_rewrites_only_affected_outputs(tmp_path):
+    src = tmp_path / "src"
+    write_pages(src)
+    state = make_state(src)
+    ideas, meals, entries = state.rows()
+    assert [d.day for d, _ in ideas] == [6, 7, 8] and len(entries) == 3
+
+    # 対象外の見出しだけ変わった → どの出力も書き直さない
+    fp = src / "7.md"
+    fp.write_text(page(7, idea="アイデア 7", other="別のメモ"), encoding="utf-8")
+    assert state.update({str(fp)}, False) == (1, set())
+    # 食事だけ変わった → meals と（習慣ログを含む）bundle・dashboard
+    fp.write_text(page(7, idea="アイデア 7", meal="夜: カレー"), encoding="utf-8")
+    assert state.update({str(fp)}, False) == (1, {"meals", "bundle", "dashboard"})
+    assert state.rows()[1][1][1].body_bytes() == "夜: カレー\n\n".encode("utf-8")
+
+    # 新しいフォルダ（中身ごと）・消えたファイル
+    (src / "sub").mkdir()
+    (src / "sub" / "9.md").write_text(page(9), encoding="utf-8")
+    (src / "6.md").unlink()
+    parsed, affected = state.update({str(src / "sub"), str(src / "6.md")}, False)
+    assert parsed == 1 and affected == {"ideas", "meals", "bundle", "dashboard"}
+    ideas, meals, entries = state.rows()
+    assert [d.day for d, _ in ideas] == [7, 8, 9] and [e.date.day for e in entries] == [7, 8, 9]
+
+    # 取りこぼし（rescan）は stat の変わったものだけ読み直す
+    assert state.update(set(), True) == (0, set())
+    (src / "8.md").write_text(page(8, idea="書き換え"), encoding="utf-8")
+    os.utime(src / "8.md", ns=(1, 1))
+    assert state.update(set(), True) == (1, {"ideas", "bundle", "dashboard"})
+
+def read_outputs(out: Path):
+    return {name: (out / name).read_bytes() for name in ("ideas.md", "meals.md", "bundle.md")}
+
+def test_watch_process_regenerates_outputs(tmp_path):
+    src = tmp_path / "src"
+    write_pages(src)
+    out = tmp_path / "out"
+    outs = ["--ideas-out", str(out / "ideas.md"), "--meals-out", str(out / "meals.md"),
+            "--bundle-out", str(out / "bundle.md")]
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "weekly_report_kit.make_weekly", "--src", str(src), *outs, "--jobs", "1",
+         "--watch", "--poll", "0.02", "--debounce", "0.02"],
+        cwd=ROOT, stdout=subprocess.PIPE, text=True, encoding="utf-8")
+    timer = threading.Timer(30, proc.kill)  # 出力が来なくても止まらないように
+    timer.start()
+
+    def next_watch_line() -> str:
+        return next(line for line in proc.stdout if line.startswith("[watch]"))
+    try:
+        next_watch_line()  # 最初の書き出しが終わった
+        ideas_mtime = (out / "ideas.md").stat().st_mtime_ns
+        (src / "7.md").write_text(page(7, idea="アイデア 7", meal="夜: カレー"), encoding="utf-8")
+        assert next_watch_line().startswith("[watch] 1 files parsed → bundle, meals  (")
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.communicate(timeout=10)
+        timer.cancel()
+    assert proc.returncode == 0
+    assert (out / "ideas.md").stat().st_mtime_ns == ideas_mtime  # 変わっていない出力は書き直さない
+
+    # 1回だけ実行したものと同じ
+    try:
+        main(["--src", str(src), *[a.replace(str(out), str(tmp_path / "once")) for a in outs], "--jobs", "1"])
+    finally:
+        instrument.disable()
+    assert read_outputs(out) == read_outputs(tmp_path / "once")
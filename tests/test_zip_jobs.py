@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+"""エクスポート .zip を --jobs > 1 で読む（ワーカーが親の zip ハンドルを共有しない）。"""
+
+import io
+import zipfile
+from datetime import date, timedelta
+from pathlib import Path
+
+import pytest
+
+from weekly_report_kit import instrument, notion_sources
+from weekly_report_kit.make_weekly import main
+from weekly_report_kit.notion_corpus import PARALLEL_MIN_FILES
+
+FIRST_DAY = date(2024, 1, 6)
+PAGES = PARALLEL_MIN_FILES * 4
+
+def page(i: int) -> str:
+    d = FIRST_DAY + timedelta(days=i)
+    return (f"# {d.year}年{d.month}月{d.day}日\n\n"
+            f"## 🧪 習慣ログ\n【食事】朝: パン {i}\n\n"
+            f"## ✨ ひらめき\nアイデア {i}\n" + f"本文の行 {i}\n" * 200)
+
+def write_export(path: Path, nested: bool) -> None:
+    inner = io.BytesIO()
+    with zipfile.ZipFile(inner, "w", zipfile.ZIP_DEFLATED) as zf:
+        for i in range(PAGES):
+            zf.writestr(f"Export/日記 {i}.md", page(i))
+    if not nested:
+        path.write_bytes(inner.getvalue())
+        return
+    # 大きいワークスペースの形（無圧縮の外側 zip の中に Export-*.zip）
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED) as zf:
+        zf.writestr("Export-part-1.zip", inner.getvalue())
+
+def run(src: Path, out: Path, jobs: int) -> bytes:
+    try:
+        main(["--src", str(src), "--bundle-out", str(out / "bundle.md"), "--ideas-out", str(out / "ideas.md"),
+              "--meals-out", str(out / "meals.md"), "--jobs", str(jobs)])
+    finally:
+        instrument.disable()
+        notion_sources.close_archives()
+    return b"".join((out / name).read_bytes() for name in ("bundle.md", "ideas.md", "meals.md"))
+
+@pytest.mark.parametrize("nested", [False, True])
+def test_parallel_zip_matches_serial(tmp_path, nested):
+    src = tmp_path / "export.zip"
+    write_export(src, nested)
+    expect = run(src, tmp_path / "serial", 1)
+    assert "アイデア 0".encode() in expect
+    for n in range(3):
+        assert run(src, tmp_path / f"parallel{n}", 8) == expect
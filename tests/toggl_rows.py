@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+
+"""テスト用の Toggl Detailed CSV を作る。"""
+
+import csv
+import random
+from datetime import date, datetime, timedelta
+
+HEADER = ["User", "Email", "Client", "Project", "Task", "Description", "Billable", "Start date", "Start time",
+          "End date", "End time", "Duration", "Tags", "Amount ()"]
+
+def toggl_row(start: datetime, sec: int, client: str = "", project: str = "", description: str = "",
+              tags: str = "", user: str = "me") -> dict:
+    end = start + timedelta(seconds=sec)
+    return {"User": user, "Email": f"{user}@example.com", "Client": client, "Project": project, "Task": "",
+            "Description": description, "Billable": "No", "Start date": start.date().isoformat(),
+            "Start time": start.strftime("%H:%M:%S"), "End date": end.date().isoformat(),
+            "End time": end.strftime("%H:%M:%S"), "Duration": f"{sec // 3600}:{sec // 60 % 60:02d}:{sec % 60:02d}",
+            "Tags": tags, "Amount ()": ""}
+
+def random_rows(n: int, seed: int = 0, first: date = date(2024, 1, 1), days: int = 60) -> list:
+    """改行・引用符・カンマ入りの説明を含むランダムなエントリ。"""
+    rng = random.Random(seed)
+    texts = ["作業", "打ち合わせ, 週次", '資料「"案"」', "複数行の\nメモ", "", "ログ\r\n確認"]
+    rows = []
+    for i in range(n):
+        start = datetime(first.year, first.month, first.day) + timedelta(
+            days=rng.randrange(days), minutes=rng.randrange(24 * 60))
+        rows.append(toggl_row(start, rng.randrange(60, 4 * 3600), rng.choice(["", "社内", "A社"]),
+                              rng.choice(["", "開発", "調査", "運用|保守"]), f"{rng.choice(texts)} {i}",
+                              rng.choice(["", "集中", "集中, 会議", "会議"])))
+    return rows
+
+def write_toggl_csv(path, rows, header=HEADER):
+    """Toggl Detailed CSV（BOM 付き）を書く。"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=header, extrasaction="ignore")
+        w.writeheader()
+        w.writerows(rows)
+    return path
@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+
+"""
+Notion 日記エクスポートと Toggl Detailed CSV から週次レポート（土→金, Asia/Tokyo）を作る。
+
+コマンドは `weekly-report-kit <command>`（`python3 -m weekly_report_kit` も同じ）。command は cli.COMMANDS の
+weekly / ideas / meals / bundle / toggl / dashboard / index / report / search / toggl-db。
+各サブコマンドのモジュールは実行時に読み込むので、ここでは何も import しない。
+"""
@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+
+"""`python3 -m weekly_report_kit <command> ...`"""
+
+from .cli import main
+
+main()
@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+
+"""
+Notion 側と Toggl 側のどちらも使う小さな共通部品（どちらの解析モジュールも import しない）。
+"""
+
+import os
+
+# mtime の粒度（FAT/zip 由来のファイルは2秒）。走査開始からこの範囲の更新は racy 扱い（信用せず読み直す）
+RACY_WINDOW_NS = 2_000_000_000
+
+def default_jobs() -> int:
+    """--jobs の既定値（CPU数）。"""
+    return os.cpu_count() or 1
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+"""
+weekly-report-kit コマンド（サブコマンドごとに担当モジュールの main へ渡すだけ）。
+
+  weekly-report-kit weekly    --src data --ideas-out reports/ideas.md ... [--toggl-out reports/toggl.md]
+  weekly-report-kit ideas     --src data --ideas-out reports/ideas.md
+  weekly-report-kit meals     --src data --meals-out reports/meals.md
+  weekly-report-kit bundle    --src data --bundle-out reports/bundle.md
+  weekly-report-kit toggl     --src data/toggl --out reports/toggl.md
+  weekly-report-kit dashboard --src data --toggl-src data/toggl --dashboard-out reports/dashboard.md
+  weekly-report-kit index     --src data [--db .cache/diary.sqlite3]
+  weekly-report-kit report    --week 2024-01-10 --bundle-out reports/bundle.md
+  weekly-report-kit search    "散歩 読書" [--limit 20]
+  weekly-report-kit toggl-db  ingest --src data/toggl [--store .cache/toggl]
+  weekly-report-kit toggl-db  summary [--top 10]
+
+モジュールは選ばれたサブコマンドの分だけ import する（toggl / toggl-db は Notion 側の走査・解析
+（notion_corpus / notion_sources / md_spans / parse_cache）を読み込まない。共通の部品は _util）。
+index / report / search は diary_db のサブコマンドをそのまま呼ぶ。
+ideas / meals は extract_notion_diary_multi の main を only= 付きで呼ぶ（それぞれ自分の出力だけを書く）。
+"""
+
+import importlib
+import sys
+from typing import List, Optional
+
+PROG = "weekly-report-kit"
+
+# サブコマンド → (モジュール, モジュール側のサブコマンド, 説明)
+COMMANDS = {
+    "weekly": ("make_weekly", None, "ideas / meals / bundle / toggl / dashboard を1回の走査でまとめて作る"),
+    "ideas": ("extract_notion_diary_multi", "ideas", "✨ひらめき を抽出する（--ideas-out）"),
+    "meals": ("extract_notion_diary_multi", "meals", "🧪習慣ログの【食事】を抽出する（--meals-out）"),
+    "bundle": ("make_notion_report", None, "日記を週ごとにそのまま束ねる"),
+    "toggl": ("make_toggl_report", None, "Toggl Detailed CSV を週ごとに集計する"),
+    "dashboard": ("make_dashboard", None, "日記と Toggl を日付で突き合わせた dashboard.md を作る"),
+    "index": ("diary_db", "index", "日記を SQLite に取り込む（変更されたファイルだけ）"),
+    "report": ("diary_db", "report", "SQLite から期間を指定して ideas / meals / bundle を書き出す"),
+    "search": ("diary_db", "search", "取り込んだセクション本文を全文検索する"),
+    "toggl-db": ("toggl_db", None, "Toggl のストアへの取り込み（ingest）と概要（summary）"),
+}
+
+def usage() -> str:
+    lines = [f"usage: {PROG} <command> [options]", "", "commands:"]
+    lines += [f"  {cmd:<10}{desc}" for cmd, (_, _, desc) in COMMANDS.items()]
+    lines += ["", f"各コマンドのオプションは `{PROG} <command> -h` で表示します。"]
+    return "\n".join(lines)
+
+def main(argv: Optional[List[str]] = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ("-h", "--help", "help"):
+        print(usage())
+        return
+    cmd, rest = argv[0], argv[1:]
+    if cmd not in COMMANDS:
+        print(usage(), file=sys.stderr)
+        sys.exit(f"{PROG}: 不明なコマンドです: {cmd}")
+    name, sub, _ = COMMANDS[cmd]
+    module = importlib.import_module(f".{name}", __package__)
+    if sub is None:
+        module.main(rest, prog=f"{PROG} {cmd}")
+    elif name == "extract_notion_diary_multi":
+        module.main(rest, prog=f"{PROG} {cmd}", only=sub)
+    else:
+        # argparse のサブコマンドの prog は「親の prog + サブコマンド名」になる
+        module.main([sub] + rest, prog=PROG)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+# -*- coding: utf-8 -*-
+
+"""
+日記の解析結果を SQLite（標準ライブラリ sqlite3・WAL）に保存し、
+期間クエリで ideas / meals / bundle を作る。
+
+  weekly-report-kit index  --src data [--db .cache/diary.sqlite3] [--jobs N]
+  weekly-report-kit report --week 2024-01-10 --ideas-out reports/ideas.md \\
+      --meals-out reports/meals.md --bundle-out reports/bundle.md --skip-nashi
+  weekly-report-kit search "散歩 読書" [--from 2023-01-01] [--limit 20]
+
+index:
+- エクスポートを走査し、(サイズ, mtime) が前回と同じファイルは読まない
+  （取り込み直前に更新されていたものは次回もう一度読んで digest で確かめる）
+- 変わったファイルだけ extract_entry / extract_ideas_and_meals で解析して upsert
+- 消えたファイルの行は削除（1つの DB は1つの --src 用）
+report:
+- pages(date) / pages(note_date) の B-tree 索引で期間を引き、
+  make_weekly と同じ形式・同じ並び（日付順・同日内は走査順）で書き出す
+search:
+- bundle の対象セクション（習慣ログ・ひらめき・学び・振返り等）の本文を、文字 trigram の
+  転置インデックス（trigram_index）で検索する。索引は index のときにファイル単位で更新
+- 空白区切りの語はすべてを含むものだけ。出現回数の多い順（同じなら新しい日付順）
+"""
+
+import argparse
+import sqlite3
+import time
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from .md_spans import Entry, IdeasMeals, Section, section_from_bytes
+from ._util import RACY_WINDOW_NS, default_jobs
+from .notion_corpus import load_pages
+from .notion_sources import DirIndex, source_key, walk_md_files
+from .parse_cache import file_digest
+from . import trigram_index
+from .weeks import DateRange, add_range_args, resolve_range
+from .extract_notion_diary_multi import extract_ideas_and_meals, is_nashi, write_dated_chunks
+from .make_notion_report import extract_entry, h2_to_h3, write_bundle
+
+DEFAULT_DB = Path(".cache") / "diary.sqlite3"
+SCHEMA_VERSION = 3
+SNIPPET_CHARS = 30
+SCAN_MIN_DOCS = 2000  # 候補がこれより多ければ IN で引かず全件を走査する
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    path       TEXT PRIMARY KEY,  -- source_key（zip 内は archive!member#crc）
+    ord        INTEGER NOT NULL,  -- 走査順（同じ日付内の並び）
+    size       INTEGER NOT NULL,
+    mtime_ns   INTEGER NOT NULL,
+    racy       INTEGER NOT NULL,  -- mtime だけでは変更を見分けられない（次回は中身で確認）
+    digest     BLOB NOT NULL,
+    date       TEXT,              -- extract_entry の日付（ISO 形式）
+    title_h1   TEXT,
+    note_date  TEXT,              -- extract_ideas_and_meals の日付（冒頭20行から）
+    ideas_head TEXT,
+    ideas_body BLOB,              -- ✨ひらめき本文（無ければ NULL）
+    meals_body BLOB               -- 【食事】本文（無ければ NULL）
+);
+CREATE INDEX IF NOT EXISTS pages_date ON pages(date, ord);
+CREATE INDEX IF NOT EXISTS pages_note_date ON pages(note_date, ord);
+CREATE TABLE IF NOT EXISTS sections (
+    id   INTEGER PRIMARY KEY,     -- trigram 索引の文書 id
+    path TEXT NOT NULL,
+    seq  INTEGER NOT NULL,
+    head TEXT NOT NULL,
+    body BLOB NOT NULL,
+    norm TEXT NOT NULL            -- 検索用に正規化した本文（trigram_index.normalize_text）
+);
+CREATE UNIQUE INDEX IF NOT EXISTS sections_path ON sections(path, seq);
+""" + trigram_index.SCHEMA
+
+PARSERS = {
+    "entry": extract_entry,
+    "ideas_meals": extract_ideas_and_meals,
+    "digest": file_digest,  # \n 正規化後の中身の digest
+}
+
+def connect(db_path: Path) -> sqlite3.Connection:
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+        conn.executescript("DROP TABLE IF EXISTS pages; DROP TABLE IF EXISTS sections; DROP TABLE IF EXISTS postings;")
+        conn.executescript(SCHEMA)
+        conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+    return conn
+
+def _iso(d: Optional[date]) -> Optional[str]:
+    return d.isoformat() if d else None
+
+def _body(sec: Optional[Section]) -> Optional[bytes]:
+    return sec.body_bytes() if sec is not None else None
+
+def _drop_sections(conn: sqlite3.Connection, key: str) -> None:
+    """ファイルのセクションを、trigram 索引から外してから消す。"""
+    for doc, norm in conn.execute("SELECT id, norm FROM sections WHERE path = ?", (key,)).fetchall():
+        trigram_index.remove_doc(conn, doc, norm)
+    conn.execute("DELETE FROM sections WHERE path = ?", (key,))
+
+def _upsert(conn: sqlite3.Connection, key: str, ord_: int, st: Any, racy: bool, parsed: Dict[str, Any]) -> None:
+    entry: Entry = parsed["entry"]
+    page: IdeasMeals = parsed["ideas_meals"]
+    conn.execute(
+        """INSERT INTO pages (path, ord, size, mtime_ns, racy, digest, date, title_h1,
+                              note_date, ideas_head, ideas_body, meals_body)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+           ON CONFLICT(path) DO UPDATE SET
+               ord=excluded.ord, size=excluded.size, mtime_ns=excluded.mtime_ns, racy=excluded.racy,
+               digest=excluded.digest, date=excluded.date, title_h1=excluded.title_h1,
+               note_date=excluded.note_date, ideas_head=excluded.ideas_head,
+               ideas_body=excluded.ideas_body, meals_body=excluded.meals_body""",
+        (key, ord_, st.st_size, st.st_mtime_ns, racy, parsed["digest"], _iso(entry.date), entry.title_h1,
+         _iso(page.date), page.ideas.head if page.ideas else None, _body(page.ideas), _body(page.meals)),
+    )
+    _drop_sections(conn, key)
+    for i, sec in enumerate(entry.sections):
+        body = sec.body_bytes()
+        norm = trigram_index.normalize_text(body.decode("utf-8", errors="ignore"))
+        cur = conn.execute("INSERT INTO sections (path, seq, head, body, norm) VALUES (?, ?, ?, ?, ?)",
+                           (key, i, sec.head, body, norm))
+        trigram_index.add_doc(conn, cur.lastrowid, norm)
+
+def index(conn: sqlite3.Connection, src: Path, jobs: int, dir_index: Optional[DirIndex] = None) -> Tuple[int, int, int]:
+    """src を DB に取り込む。戻り値は (解析したファイル, 変更なし, 削除)。"""
+    started_ns = time.time_ns()
+    known = {path: (size, mtime, racy, ord_, digest)
+             for path, size, mtime, racy, ord_, digest
+             in conn.execute("SELECT path, size, mtime_ns, racy, ord, digest FROM pages")}
+    files = walk_md_files(src, dir_index)
+
+    changed = []
+    unchanged = 0
+    seen = set()
+    with conn:
+        for ord_, fp in enumerate(files):
+            key = source_key(fp)
+            seen.add(key)
+            st = fp.stat()
+            k = known.get(key)
+            if k is not None and k[0] == st.st_size and k[1] == st.st_mtime_ns and not k[2]:
+                unchanged += 1
+                if k[3] != ord_:
+                    conn.execute("UPDATE pages SET ord = ? WHERE path = ?", (ord_, key))
+                continue
+            changed.append((ord_, fp, key, st))
+
+        parsed_n = 0
+        pages = load_pages([fp for _, fp, _, _ in changed], PARSERS, None, jobs)
+        for (ord_, _, key, st), (_, parsed) in zip(changed, pages):
+            racy = st.st_mtime_ns >= started_ns - RACY_WINDOW_NS
+            k = known.get(key)
+            if k is not None and k[4] == parsed["digest"]:
+                # 中身は同じ（touch されただけ等）→ stat だけ更新
+                unchanged += 1
+                conn.execute("UPDATE pages SET ord = ?, size = ?, mtime_ns = ?, racy = ? WHERE path = ?",
+                             (ord_, st.st_size, st.st_mtime_ns, racy, key))
+                continue
+            parsed_n += 1
+            _upsert(conn, key, ord_, st, racy, parsed)
+
+        removed = [key for key in known if key not in seen]
+        for key in removed:
+            _drop_sections(conn, key)
+            conn.execute("DELETE FROM pages WHERE path = ?", (key,))
+    return parsed_n, unchanged, len(removed)
+
+def _range_sql(column: str, rng: Optional[DateRange]) -> Tuple[str, List[str]]:
+    """期間の WHERE 句（索引が効くように列そのものを比較する）。"""
+    sql = f"{column} IS NOT NULL"
+    params: List[str] = []
+    lo, hi = rng if rng is not None else (None, None)
+    if lo is not None:
+        sql += f" AND {column} >= ?"
+        params.append(lo.isoformat())
+    if hi is not None:
+        sql += f" AND {column} <= ?"
+        params.append(hi.isoformat())
+    return sql, params
+
+def query_ideas(conn: sqlite3.Connection, rng: Optional[DateRange], skip_nashi: bool) -> List[Tuple[date, Section]]:
+    where, params = _range_sql("note_date", rng)
+    rows = []
+    for d, head, body in conn.execute(
+            f"SELECT note_date, ideas_head, ideas_body FROM pages "
+            f"WHERE {where} AND ideas_body IS NOT NULL ORDER BY note_date, ord", params):
+        sec = section_from_bytes(head, body)
+        if not (skip_nashi and is_nashi(sec)):
+            rows.append((date.fromisoformat(d), sec))
+    return rows
+
+def query_meals(conn: sqlite3.Connection, rng: Optional[DateRange]) -> List[Tuple[date, Section]]:
+    where, params = _range_sql("note_date", rng)
+    return [(date.fromisoformat(d), section_from_bytes("【食事】", body))
+            for d, body in conn.execute(
+                f"SELECT note_date, meals_body FROM pages "
+                f"WHERE {where} AND meals_body IS NOT NULL ORDER BY note_date, ord", params)]
+
+def query_entries(conn: sqlite3.Connection, rng: Optional[DateRange]) -> List[Entry]:
+    where, params = _range_sql("p.date", rng)
+    entries: List[Entry] = []
+    last = None
+    for path, d, title_h1, head, body in conn.execute(
+            f"SELECT p.path, p.date, p.title_h1, s.head, s.body FROM pages p "
+            f"LEFT JOIN sections s ON s.path = p.path "
+            f"WHERE {where} ORDER BY p.date, p.ord, s.seq", params):
+        if path != last:
+            entries.append(Entry(title_h1, date.fromisoformat(d), []))
+            last = path
+        if head is not None:
+            entries[-1].sections.append(section_from_bytes(head, body))
+    return entries
+
+class Hit(NamedTuple):
+    score: int
+    date: Optional[str]
+    head: str
+    snippet: str
+
+def _snippet(norm: str, term: str) -> str:
+    i = norm.find(term)
+    s = max(0, i - SNIPPET_CHARS)
+    e = i + len(term) + SNIPPET_CHARS
+    return ("…" if s > 0 else "") + norm[s:e].strip() + ("…" if e < len(norm) else "")
+
+def search(conn: sqlite3.Connection, query: str, rng: Optional[DateRange] = None, limit: int = 20) -> List[Hit]:
+    """セクション本文の全文検索（trigram で候補を絞り、本文で出現回数を数える）。"""
+    terms = trigram_index.query_terms(query)
+    if not terms:
+        return []
+    docs = trigram_index.candidates(conn, terms)
+    if docs is not None and not docs:
+        return []
+    where, params = _range_sql("p.date", rng) if rng is not None else ("1", [])
+    sql = f"SELECT s.id, p.date, s.head, s.norm FROM sections s JOIN pages p ON p.path = s.path WHERE {where}"
+    if docs is None or len(docs) > SCAN_MIN_DOCS:
+        # 2文字以下の語だけ（trigram が無い）か候補が多いときは、1回の全件走査で確かめる
+        batches = [conn.execute(sql, params)]
+    else:
+        ids = sorted(docs)
+        batches = [conn.execute(f"{sql} AND s.id IN ({','.join('?' * len(chunk))})", params + chunk)
+                   for chunk in (ids[n:n + 500] for n in range(0, len(ids), 500))]
+    found: List[Tuple[int, str, str, str]] = []
+    for rows in batches:
+        for doc, d, head, norm in rows:
+            if docs is not None and doc not in docs:
+                continue
+            counts = [norm.count(t) for t in terms]
+            if all(counts):
+                found.append((sum(counts), d or "", head, norm))
+    found.sort(key=lambda f: f[1], reverse=True)
+    found.sort(key=lambda f: f[0], reverse=True)
+    # 抜粋は表示する分だけ作る
+    return [Hit(score, d or None, h2_to_h3(head)[4:], _snippet(norm, max(terms, key=len)))
+            for score, d, head, norm in found[:limit]]
+
+def main(argv: Optional[List[str]] = None, prog: Optional[str] = None):
+    ap = argparse.ArgumentParser(prog=prog, description="日記を SQLite に取り込み、期間クエリでレポートを作る")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    ap_index = sub.add_parser("index", help="エクスポートを DB に取り込む（変更されたファイルだけ解析）")
+    ap_index.add_argument("--src", default="data", help="Notionエクスポートを展開したルート or .zip")
+    ap_index.add_argument("--db", default=str(DEFAULT_DB), help=f"DB ファイル（既定: {DEFAULT_DB}）")
+    ap_index.add_argument("--jobs", type=int, default=default_jobs(), help="並列解析のプロセス数（既定: CPU数、1で直列）")
+
+    ap_report = sub.add_parser("report", help="DB から ideas / meals / bundle を書き出す")
+    ap_report.add_argument("--db", default=str(DEFAULT_DB), help=f"DB ファイル（既定: {DEFAULT_DB}）")
+    ap_report.add_argument("--ideas-out", help="ひらめきMarkdownの出力先（指定時のみ出力）")
+    ap_report.add_argument("--meals-out", help="食事Markdownの出力先（指定時のみ出力）")
+    ap_report.add_argument("--bundle-out", help="まとめMarkdownの出力先（指定時のみ出力）")
+    ap_report.add_argument("--skip-nashi", action="store_true", help="『なし』だけのひらめきは出力しない")
+    add_range_args(ap_report)
+
+    ap_search = sub.add_parser("search", help="セクション本文を全文検索（空白区切りは AND）")
+    ap_search.add_argument("query", help="検索語")
+    ap_search.add_argument("--db", default=str(DEFAULT_DB), help=f"DB ファイル（既定: {DEFAULT_DB}）")
+    ap_search.add_argument("--limit", type=int, default=20, help="表示する件数（既定: 20）")
+    add_range_args(ap_search)
+    args = ap.parse_args(argv)
+
+    db_path = Path(args.db).expanduser()
+
+    if args.command == "index":
+        src = Path(args.src).expanduser()
+        conn = connect(db_path)
+        dir_index = DirIndex.open(db_path.parent)
+        parsed, unchanged, removed = index(conn, src, args.jobs, dir_index)
+        dir_index.save()
+        conn.close()
+        print(f"[index] parsed: {parsed}  unchanged: {unchanged}  removed: {removed}  ({db_path})")
+        return
+
+    if args.command == "search":
+        if not db_path.exists():
+            ap_search.error(f"DB が見つかりません: {db_path}（先に index を実行してください）")
+        conn = connect(db_path)
+        t0 = time.perf_counter()
+        hits = search(conn, args.query, resolve_range(ap_search, args), args.limit)
+        ms = (time.perf_counter() - t0) * 1000
+        for h in hits:
+            print(f"{h.date or '(日付なし)'}  {h.head}  x{h.score}  {h.snippet}")
+        print(f"[search] {len(hits)} hits  ({ms:.1f} ms)")
+        conn.close()
+        return
+
+    if not (args.ideas_out or args.meals_out or args.bundle_out):
+        ap_report.error("--ideas-out / --meals-out / --bundle-out のいずれかを指定してください")
+    if not db_path.exists():
+        ap_report.error(f"DB が見つかりません: {db_path}（先に index を実行してください）")
+    rng = resolve_range(ap_report, args)
+    conn = connect(db_path)
+    if args.ideas_out:
+        out = Path(args.ideas_out).expanduser()
+        write_dated_chunks(out, query_ideas(conn, rng, args.skip_nashi))
+        print(f"[OK] wrote: {out}")
+    if args.meals_out:
+        out = Path(args.meals_out).expanduser()
+        write_dated_chunks(out, query_meals(conn, rng), with_head=True)
+        print(f"[OK] wrote: {out}")
+    if args.bundle_out:
+        out_path = Path(args.bundle_out).expanduser()
+        entries = query_entries(conn, rng)
+        write_bundle(out_path, entries)
+        print(f"✅ Wrote: {out_path}  ({len(entries)} entries)")
+    conn.close()
+
+if __name__ == "__main__":
+    main()
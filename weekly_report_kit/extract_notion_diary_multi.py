@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+
+"""
+Notionエクスポート(.md群)から
+- 「## ✨ ひらめき」だけを集約して ideas.md へ
+- 「## 🧪 習慣ログ」内の「【食事】」だけを集約して meals.md へ
+
+※既定では期間フィルタなし（--week / --from / --to 指定時だけ日付で絞り込む）
+※片方だけ指定された場合は、その片方だけ書き出す（どちらも無ければエラー）
+※only="ideas" / "meals"（weekly-report-kit ideas / meals）ならその出力だけを受け付け、出力先は必須
+※--stats / --stats-json で段階ごとの時間と件数、--trace でファイルごとのトレースを出す（instrument）
+"""
+
+import argparse
+from pathlib import Path
+from datetime import date
+from typing import List, Optional, Tuple, Dict
+
+from . import instrument
+from .md_spans import IdeasMeals, Section, Span, decode_line, line_end, parse_date
+from .md_tokens import BODY, H2, Tokenizer, add_span
+from ._util import default_jobs
+from .notion_corpus import load_pages
+from .notion_sources import DirIndex, walk_md_files
+from .parse_cache import ParseCache
+from .report_writer import ReportWriter
+from .weeks import add_range_args, in_range, resolve_range, select_in_range
+
+# 「## 」行のうち、✨とひらめき／🧪と習慣ログを両方含むもの（この順で判定）。
+# 「日付:」行を除くのは✨ひらめきだけ（習慣ログは【食事】を切り出すだけなのでそのまま）
+TOKENIZER = Tokenizer([
+    ("ideas", "^(?=.*✨)(?=.*ひらめき)"),
+    ("habit", "^(?=.*🧪)(?=.*習慣ログ)"),
+], date_ids=("ideas",))
+MEALS_MARK = "【食事】".encode()
+NEXT_BRACKET = "\n【".encode()
+
+def _meals_in_block(buf: bytes, mv: memoryview, start: int, end: int) -> Optional[Section]:
+    """習慣ログ本文 [start, end) から【食事】の節だけを範囲で切り出す（無ければ None）。"""
+    q = buf.find(MEALS_MARK, start, end)
+    if q < 0:
+        return None
+    # 【食事】行そのものは見出し「【食事】」に置き換え、次の【…】行の手前までが本文
+    body = line_end(buf, q, end)
+    p = buf.find(NEXT_BRACKET, body - 1, end)
+    while p >= 0 and buf[p + 1:p + 1 + len(MEALS_MARK)] == MEALS_MARK:
+        p = buf.find(NEXT_BRACKET, p + 1, end)
+    stop = end if p < 0 else p + 1  # 次の見出し(睡眠/運動等)の行頭
+    return Section("【食事】", mv, [(body, stop)] if body < stop else [])
+
+def extract_ideas_and_meals(buf: bytes) -> IdeasMeals:
+    """
+    1ファイル（\n 正規化済みのバイト列）から IdeasMeals(日付, ideas, meals) を返す。
+    - ideas: 「## ✨ ひらめき」セクション本文（「日付:」行を除いた範囲。本文が無ければ None）
+    - meals: 「## 🧪 習慣ログ」内の「【食事】」ブロック（見出し「【食事】」付き。無ければ None）
+    本文は buf への (start, end) 範囲で持ち、行をコピーしない。
+    """
+    mv = memoryview(buf)
+    n = len(buf)
+
+    d: Optional[date] = None
+    pos = 0
+    for _ in range(20):  # 冒頭にある想定
+        if d or pos >= n:
+            break
+        e = line_end(buf, pos, n)
+        d = parse_date(decode_line(buf, pos, e))
+        pos = e
+
+    ideas: Optional[Section] = None
+    meals: Optional[Section] = None
+
+    # 開いているセクション（"ideas" / "habit"）と、その本文の開始位置・範囲
+    cur: Optional[str] = None
+    head = ""
+    start = 0
+    spans: List[Span] = []
+
+    def close(stop: int) -> None:
+        nonlocal ideas, meals
+        if cur == "ideas":
+            # 「なし」だけのノートは skip したい場合がある（is_nashi で判定）
+            ideas = Section(head, mv, spans) if spans else None
+        elif cur == "habit":
+            # 習慣ログ全体ブロック（「日付:」行も含む）の中から【食事】部分だけ抜く
+            meals = _meals_in_block(buf, mv, start, stop)
+
+    for kind, sid, s, e in TOKENIZER.tokens(buf):
+        if kind <= H2:  # 「## 」「# 」行でセクションが終わる
+            close(s)
+            cur, start, spans = sid, e, []
+            if sid == "ideas":
+                head = decode_line(buf, s, e).rstrip("\n")
+        elif kind == BODY and cur == "ideas":
+            add_span(spans, s, e)
+        # DATE: ✨ひらめきの「日付:」行は本文としては不要
+    close(n)
+
+    return IdeasMeals(d, ideas, meals)
+
+def is_nashi(ideas: Section) -> bool:
+    """「- なし」や「なし」だけのひらめきか。"""
+    if ideas.line_count() > 2:
+        return False
+    return "".join(ideas.lines()).strip().replace("-", "").replace("なし", "").strip() == ""
+
+def write_dated_chunks(out: Path, rows: List[Tuple[date, Section]], with_head: bool = False) -> None:
+    """
+    [(日付, Section)] を「## YYYY-MM-DD」見出し付きでストリーミング書き出しする。
+    本文は元ファイルの範囲をそのまま書く（with_head なら Section の見出し行も先に出す）。
+    """
+    with ReportWriter(out) as w:
+        for d, sec in rows:
+            w.line(f"## {d.isoformat()}")
+            if with_head:
+                w.line(sec.head)
+            w.body(sec)
+            w.line("")
+
+def main(argv: Optional[List[str]] = None, prog: Optional[str] = None, only: Optional[str] = None):
+    descriptions = {None: "✨ひらめき / 🧪習慣ログの【食事】", "ideas": "✨ひらめき", "meals": "🧪習慣ログの【食事】"}
+    ap = argparse.ArgumentParser(prog=prog, description=f"Notion日記(.md)から {descriptions[only]} を抽出する")
+    ap.add_argument("--src", required=True, help="Notionエクスポートのルート / .md / エクスポート.zip")
+    if only != "meals":
+        ap.add_argument("--ideas-out", required=only == "ideas",
+                        help="✨ひらめきを書き出すパス" + ("" if only else "（指定時のみ出力）"))
+        ap.add_argument("--skip-nashi", action="store_true", help="『なし』だけのひらめきは出力しない")
+    if only != "ideas":
+        ap.add_argument("--meals-out", required=only == "meals",
+                        help="🧪習慣ログ/【食事】を書き出すパス" + ("" if only else "（指定時のみ出力）"))
+    add_range_args(ap)
+    ap.add_argument("--cache-dir", help="解析キャッシュの保存先（指定時のみ。未変更ファイルは再解析しない）")
+    ap.add_argument("--jobs", type=int, default=default_jobs(), help="並列解析のプロセス数（既定: CPU数、1で直列）")
+    instrument.add_stats_args(ap)
+    ap.set_defaults(ideas_out=None, meals_out=None, skip_nashi=False)
+    args = ap.parse_args(argv)
+    if not (args.ideas_out or args.meals_out):
+        ap.error("--ideas-out / --meals-out のいずれかを指定してください")
+    instrument.start(args, ap.prog)
+
+    src = Path(args.src).expanduser()
+    index = DirIndex.open(Path(args.cache_dir)) if args.cache_dir else None
+    rng = resolve_range(ap, args)
+    with instrument.phase("walk"):
+        found = walk_md_files(src, index)
+        files = select_in_range(found, rng)
+    instrument.count("files_scanned", len(found))
+    instrument.count("files_out_of_range", len(found) - len(files))
+    with instrument.phase("cache"):
+        cache = ParseCache.open(Path(args.cache_dir)) if args.cache_dir else None
+
+    rows_ideas: List[Tuple[date, Section]] = []
+    rows_meals: List[Tuple[date, Section]] = []
+
+    for fp, parsed in load_pages(files, {"ideas_meals": extract_ideas_and_meals}, cache, args.jobs):
+        page: IdeasMeals = parsed["ideas_meals"]
+        d, ideas, meals = page.date, page.ideas, page.meals
+        if not d:
+            instrument.count("files_no_date")
+            continue
+        if not in_range(d, rng):
+            continue
+        if args.ideas_out and ideas:
+            # 「- なし」や「なし」だけはスキップするオプション
+            if not (args.skip_nashi and is_nashi(ideas)):
+                rows_ideas.append((d, ideas))
+        if args.meals_out and meals:
+            rows_meals.append((d, meals))
+
+    if cache:
+        with instrument.phase("cache"):
+            index.save()
+            cache.save()
+        print(cache.summary())
+
+    # 日付昇順
+    with instrument.phase("sort"):
+        rows_ideas.sort(key=lambda x: x[0])
+        rows_meals.sort(key=lambda x: x[0])
+
+    # 書き出し（指定された方だけ）
+    if args.ideas_out:
+        out = Path(args.ideas_out).expanduser()
+        with instrument.phase("write"):
+            write_dated_chunks(out, rows_ideas)
+        print(f"[OK] wrote: {out}")
+
+    if args.meals_out:
+        out = Path(args.meals_out).expanduser()
+        with instrument.phase("write"):
+            write_dated_chunks(out, rows_meals, with_head=True)
+        print(f"[OK] wrote: {out}")
+    instrument.finish(args)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
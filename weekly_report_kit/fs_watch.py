@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+
+"""
+フォルダ以下のファイルの変更を待つ（make_weekly --watch 用）。
+
+  with open_watcher(root) as w:
+      while True:
+          paths, rescan = w.wait(0.2)
+
+- Linux では inotify（ctypes で libc を直接呼ぶ）。フォルダごとに watch を付け、
+  あとから作られた・移ってきたフォルダにも付け足す
+- inotify が使えなければ（Linux 以外・watch 数の上限など）一定間隔で stat して比べる（PollWatcher）
+- wait(debounce) は最初の変更から debounce 秒なにも起きなくなるまで待ち、変わったパスをまとめて返す
+  （一時ファイルに書いて rename する保存や、同期ツールの連続した書き込みを1回にまとめる）
+- 返すパスは「作られた・書き換えられた・消えた・移った」ファイルとフォルダ。消えたかどうかは
+  呼び出し側が存在を確かめて判断する。rescan が True ならイベントを取りこぼしたので全体を見直す
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import time
+from typing import Collection, Dict, Optional, Set, Tuple, Union
+
+# <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+# 書き終わり（IN_CLOSE_WRITE）と rename・削除だけを見る（書き込み途中の IN_MODIFY は見ない）
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_ONLYDIR
+EVENT = struct.Struct("iIII")  # wd, mask, cookie, len（この後に len バイトの名前）
+READ_SIZE = 1 << 16
+# 変更が続いても、最初の変更からこれだけ経ったら一度返す
+MAX_BATCH_S = 2.0
+
+Changes = Tuple[Set[str], bool]  # (変わったパス, 取りこぼしたので全体を見直すか)
+
+class InotifyWatcher:
+    """inotify で root 以下（recursive=False なら root 直下だけ）を見る。"""
+
+    def __init__(self, root: str, recursive: bool = True, prune: Collection[str] = ()):
+        self.root = root
+        self.recursive = recursive
+        self.prune = set(prune)
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self._libc.inotify_add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self._libc.inotify_rm_watch.argtypes = (ctypes.c_int, ctypes.c_int)
+        fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_init1: {os.strerror(err)}")
+        self.fd = fd
+        self.paths: Dict[int, str] = {}  # wd → フォルダ
+        try:
+            self._add_tree(root)
+        except OSError:
+            self.close()
+            raise
+
+    def _add(self, d: str) -> None:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(d), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err in (errno.ENOENT, errno.ENOTDIR):  # 付ける前に消えた
+                return
+            raise OSError(err, f"inotify_add_watch: {os.strerror(err)}", d)
+        self.paths[wd] = d
+
+    def _add_tree(self, top: str) -> None:
+        stack = [top]
+        while stack:
+            d = stack.pop()
+            self._add(d)
+            if not self.recursive:
+                return
+            try:
+                with os.scandir(d) as it:
+                    stack.extend(e.path for e in it
+                                 if e.name not in self.prune and e.is_dir(follow_symlinks=False))
+            except OSError:
+                continue
+
+    def _forget(self, top: str) -> None:
+        """移っていったフォルダの watch を外す（古いパスのままイベントが来ないように）。"""
+        prefix = top + os.sep
+        for wd, d in list(self.paths.items()):
+            if d == top or d.startswith(prefix):
+                self._libc.inotify_rm_watch(self.fd, wd)
+                del self.paths[wd]
+
+    def _read(self, paths: Set[str]) -> bool:
+        """溜まっているイベントを読んで paths に足す。取りこぼしがあれば True。"""
+        overflow = False
+        while True:
+            try:
+                buf = os.read(self.fd, READ_SIZE)
+            except BlockingIOError:
+                return overflow
+            pos = 0
+            while pos < len(buf):
+                wd, mask, _, n = EVENT.unpack_from(buf, pos)
+                name = os.fsdecode(buf[pos + EVENT.size:pos + EVENT.size + n].rstrip(b"\0"))
+                pos += EVENT.size + n
+                if mask & IN_Q_OVERFLOW:
+                    overflow = True
+                    continue
+                if mask & IN_IGNORED:
+                    self.paths.pop(wd, None)
+                    continue
+                d = self.paths.get(wd)
+                if d is None or mask & IN_DELETE_SELF:
+                    continue
+                path = os.path.join(d, name)
+                if mask & IN_ISDIR:
+                    if name in self.prune or not self.recursive:
+                        continue
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        self._add_tree(path)  # 付ける前に作られた中身は呼び出し側がフォルダごと読む
+                    elif mask & IN_MOVED_FROM:
+                        self._forget(path)
+                elif mask & IN_CREATE:
+                    continue  # ファイルは書き終わり（IN_CLOSE_WRITE）を待つ
+                paths.add(path)
+
+    def wait(self, debounce: float, timeout: Optional[float] = None) -> Changes:
+        """変更をまとめて返す（timeout 秒なにも無ければ空）。"""
+        paths: Set[str] = set()
+        poller = select.poll()
+        poller.register(self.fd, select.POLLIN)
+        if not poller.poll(None if timeout is None else int(timeout * 1000)):
+            return paths, False
+        first = time.monotonic()
+        overflow = self._read(paths)
+        while time.monotonic() - first < MAX_BATCH_S and poller.poll(int(debounce * 1000)):
+            overflow |= self._read(paths)
+        return paths, overflow
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def __enter__(self) -> "InotifyWatcher":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+class PollWatcher:
+    """interval 秒ごとに root 以下の suffixes のファイルを stat して比べる（inotify の代わり）。"""
+
+    def __init__(self, root: str, recursive: bool = True, prune: Collection[str] = (),
+                 interval: float = 1.0, suffixes: Tuple[str, ...] = (".md",)):
+        self.root = root
+        self.recursive = recursive
+        self.prune = set(prune)
+        self.interval = interval
+        self.suffixes = suffixes
+        self.snap = self._scan()
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        snap: Dict[str, Tuple[int, int]] = {}
+        stack = [self.root]
+        while stack:
+            d = stack.pop()
+            try:
+                with os.scandir(d) as it:
+                    for e in it:
+                        if e.name.endswith(self.suffixes) and e.is_file():
+                            st = e.stat()
+                            snap[e.path] = (st.st_size, st.st_mtime_ns)
+                        elif self.recursive and e.name not in self.prune and e.is_dir(follow_symlinks=False):
+                            stack.append(e.path)
+            except OSError:
+                continue
+        return snap
+
+    def _diff(self, paths: Set[str]) -> bool:
+        """前回から変わったパスを paths に足す。変わったものがあれば True。"""
+        old, self.snap = self.snap, self._scan()
+        changed = {p for p, st in self.snap.items() if old.get(p) != st}
+        changed.update(p for p in old if p not in self.snap)
+        paths |= changed
+        return bool(changed)
+
+    def wait(self, debounce: float, timeout: Optional[float] = None) -> Changes:
+        paths: Set[str] = set()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._diff(paths):
+            if deadline is not None and time.monotonic() >= deadline:
+                return paths, False
+            time.sleep(self.interval)
+        first = time.monotonic()
+        while time.monotonic() - first < MAX_BATCH_S:
+            time.sleep(debounce)
+            if not self._diff(paths):
+                break
+        return paths, False
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "PollWatcher":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+Watcher = Union[InotifyWatcher, PollWatcher]
+
+def open_watcher(root: str, recursive: bool = True, prune: Collection[str] = (),
+                 poll: bool = False, interval: float = 1.0, suffixes: Tuple[str, ...] = (".md",)) -> Watcher:
+    """inotify を試し、使えなければ（または poll なら）PollWatcher を返す。"""
+    if not poll:
+        try:
+            return InotifyWatcher(root, recursive, prune)
+        except (OSError, AttributeError):
+            pass  # Linux 以外（inotify_init1 が無い）・上限超過など
+    return PollWatcher(root, recursive, prune, interval, suffixes)
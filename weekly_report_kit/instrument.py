@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+
+"""
+処理段階ごとの時間（wall / CPU）と件数のカウンタ（--stats / --stats-json）。
+
+  from weekly_report_kit import instrument
+  instrument.enable()
+  with instrument.phase("walk"):
+      files = walk_md_files(src)
+  instrument.count("files_scanned", len(files))
+  print(instrument.active().summary())
+
+- 有効にしていなければ phase() は何もしない文脈、count() は何もしない（既定は無効）
+- 同じ名前の段階・カウンタは足していく（1ファイルずつ read → parse を繰り返してもよい）
+- 並列解析のワーカーは自分のプロセスで集計して返し、呼び出し側が merge する
+  （ワーカーの read / parse はワーカー全体の合計時間になる）
+- 段階・カウンタの足し込みはロックの中で行う（--all-weeks はスレッドで並列に書き出す）
+- --trace PATH: 段階とファイルごとの read / parse / cache hit・miss / write を
+  Chrome の trace_event 形式（JSON 配列）で PATH に追記する（Perfetto / chrome://tracing で開く）
+  - phase(name, detail) の detail（ファイル）は args.file に入れる。span() はトレースだけに出す
+  - 時刻は CLOCK_MONOTONIC（プロセスをまたいで揃う）。ワーカーは自分の pid のまま返す
+  - 配列は閉じずに追記していく（末尾の "]" は省略できる形式）。make weekly の各スクリプトが
+    同じファイルに足すので、1回の実行全体が1つのトレースになる（新しく取るときは消してから）
+
+段階（この順に表示）:
+  walk / read / parse / cache / sort / write
+カウンタ:
+  files_scanned       : 列挙した .md
+  files_out_of_range  : 先頭・ファイル名の日付で期間外と分かり読まなかったもの
+  files_no_date       : 解析しても日付が取れず出力しなかったもの
+  bytes_read / lines_scanned : 読んで解析したファイルのバイト数・行数（キャッシュから復元したものは除く）
+  headings_classified : 見出し（# / ##）として判定した行（解析関数ごとに数える）
+  sections_emitted    : レポートに書いた本文のセクション
+  bytes_written / reports_written : 書き出したレポート
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from argparse import ArgumentParser, Namespace
+from collections import Counter
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, ContextManager, Dict, List, Optional, Tuple
+
+PHASES = ("walk", "read", "parse", "cache", "sort", "write")
+COUNTERS = ("files_scanned", "files_out_of_range", "files_no_date", "bytes_read", "lines_scanned",
+            "headings_classified", "sections_emitted", "bytes_written", "reports_written")
+
+_NULL = nullcontext()
+_LOCK = threading.Lock()  # 段階・カウンタの足し込み（書き出しのスレッドから呼ばれる）
+
+class _Phase:
+    __slots__ = ("_slot", "_trace", "_name", "_detail", "_wall", "_cpu", "_ts")
+
+    def __init__(self, slot: Optional[List[float]], trace: Optional["Tracer"] = None,
+                 name: str = "", detail: Any = None):
+        self._slot = slot
+        self._trace = trace
+        self._name = name
+        self._detail = detail
+
+    def __enter__(self) -> None:
+        if self._trace is not None:
+            self._ts = time.monotonic_ns()
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+
+    def __exit__(self, *exc) -> None:
+        slot = self._slot
+        if slot is not None:
+            wall = time.perf_counter() - self._wall
+            cpu = time.process_time() - self._cpu
+            with _LOCK:
+                slot[0] += wall
+                slot[1] += cpu
+                slot[2] += 1
+        if self._trace is not None:
+            self._trace.complete(self._name, self._ts, time.monotonic_ns(), self._detail)
+
+class Stats:
+    """段階ごとの [wall秒, CPU秒, 回数] とカウンタ。"""
+
+    def __init__(self):
+        self.phases: Dict[str, List[float]] = {}
+        self.counters: Counter = Counter()
+        self.started = time.perf_counter()
+        self.started_cpu = time.process_time()
+
+    def slot(self, name: str) -> List[float]:
+        with _LOCK:
+            return self.phases.setdefault(name, [0.0, 0.0, 0])
+
+    def phase(self, name: str) -> _Phase:
+        return _Phase(self.slot(name))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """ワーカーから返す形（pickle できる dict）。"""
+        return {"phases": self.phases, "counters": dict(self.counters)}
+
+    def merge(self, snap: Dict[str, Any]) -> None:
+        with _LOCK:
+            for name, (wall, cpu, calls) in snap["phases"].items():
+                slot = self.phases.setdefault(name, [0.0, 0.0, 0])
+                slot[0] += wall
+                slot[1] += cpu
+                slot[2] += calls
+            self.counters.update(snap["counters"])
+
+    def _ordered(self) -> List[str]:
+        return [p for p in PHASES if p in self.phases] + sorted(p for p in self.phases if p not in PHASES)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "wall_s": round(time.perf_counter() - self.started, 6),
+            "cpu_s": round(time.process_time() - self.started_cpu, 6),
+            "pid": os.getpid(),
+            "phases": {p: {"wall_s": round(w, 6), "cpu_s": round(c, 6), "calls": n}
+                       for p in self._ordered() for w, c, n in [self.phases[p]]},
+            "counters": {k: self.counters[k] for k in COUNTERS if k in self.counters}
+                        | {k: v for k, v in sorted(self.counters.items()) if k not in COUNTERS},
+        }
+
+    def summary(self) -> str:
+        """人が読む形（stderr 向け）。"""
+        d = self.to_dict()
+        lines = [f"[stats] total {d['wall_s'] * 1000:.1f} ms (cpu {d['cpu_s'] * 1000:.1f} ms)"]
+        for p, v in d["phases"].items():
+            lines.append(f"[stats]   {p:<6} {v['wall_s'] * 1000:10.1f} ms  cpu {v['cpu_s'] * 1000:10.1f} ms"
+                         f"  x{v['calls']}")
+        for k, v in d["counters"].items():
+            lines.append(f"[stats]   {k:<20} {v:>12,}")
+        return "\n".join(lines)
+
+    def write_json(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_dict(), ensure_ascii=False, indent=1) + "\n", encoding="utf-8")
+
+class Tracer:
+    """trace_event のイベント（ts / dur はマイクロ秒）。"""
+
+    def __init__(self, name: str):
+        self.pid = os.getpid()
+        self.names: Dict[int, str] = {self.pid: name}  # pid → プロセス名（M イベントにする）
+        self.events: List[Dict[str, Any]] = []
+
+    def complete(self, name: str, start_ns: int, end_ns: int, detail: Any = None) -> None:
+        e = {"name": name, "cat": "phase" if detail is None else "file", "ph": "X",
+             "ts": start_ns // 1000, "dur": max(1, (end_ns - start_ns) // 1000),
+             "pid": self.pid, "tid": threading.get_native_id()}
+        if detail is not None:
+            e["args"] = {"file": str(detail)}
+        self.events.append(e)
+
+    def instant(self, name: str, detail: Any = None) -> None:
+        e = {"name": name, "cat": "file", "ph": "i", "s": "t", "ts": time.monotonic_ns() // 1000,
+             "pid": self.pid, "tid": threading.get_native_id()}
+        if detail is not None:
+            e["args"] = {"file": str(detail)}
+        self.events.append(e)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"names": self.names, "events": self.events}
+
+    def merge(self, snap: Dict[str, Any]) -> None:
+        self.names.update(snap["names"])
+        self.events.extend(snap["events"])
+
+    def save(self, path: Path) -> None:
+        """path に追記する（無い・空なら配列の "[" から始める）。書き込みは1回の write。"""
+        meta = [{"name": "process_name", "ph": "M", "pid": pid, "args": {"name": f"{name} ({pid})"}}
+                for pid, name in self.names.items()]
+        blob = "".join(json.dumps(e, ensure_ascii=False) + ",\n" for e in meta + self.events).encode("utf-8")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            if os.fstat(fd).st_size == 0:
+                blob = b"[\n" + blob
+            os.write(fd, blob)
+        finally:
+            os.close(fd)
+
+STATS: Optional[Stats] = None
+TRACE: Optional[Tracer] = None
+
+def enable() -> Stats:
+    """計測を（新しく）始める。"""
+    global STATS
+    STATS = Stats()
+    return STATS
+
+def enable_trace(name: str) -> Tracer:
+    """トレースを（新しく）始める。name はトレースに出すプロセス名。"""
+    global TRACE
+    TRACE = Tracer(name)
+    return TRACE
+
+def disable() -> None:
+    global STATS, TRACE
+    STATS = None
+    TRACE = None
+
+def active() -> Optional[Stats]:
+    return STATS
+
+def phase(name: str, detail: Any = None) -> ContextManager:
+    """
+    `with phase("parse"):` の間の時間を name に足す（無効なら何もしない）。
+    トレース中ならその区間も出す（detail はファイルなど。args.file に入れる）。
+    """
+    if TRACE is None:
+        return STATS.phase(name) if STATS is not None else _NULL
+    return _Phase(STATS.slot(name) if STATS is not None else None, TRACE, name, detail)
+
+def span(name: str, detail: Any = None) -> ContextManager:
+    """トレースだけに出す区間（段階の時間には足さない。1ファイルの書き出しなど）。"""
+    return _Phase(None, TRACE, name, detail) if TRACE is not None else _NULL
+
+def mark(name: str, detail: Any = None) -> None:
+    """トレースに瞬間のイベントを出す（キャッシュの hit / miss など）。"""
+    if TRACE is not None:
+        TRACE.instant(name, detail)
+
+def count(name: str, n: int = 1) -> None:
+    stats = STATS
+    if stats is not None:
+        with _LOCK:
+            stats.counters[name] += n
+
+# --- 並列処理のワーカー ---
+
+def worker_flags() -> Optional[Tuple[bool, bool]]:
+    """ワーカーに渡す (計測するか, トレースするか)。どちらも無効なら None。"""
+    if STATS is None and TRACE is None:
+        return None
+    return STATS is not None, TRACE is not None
+
+def enable_worker(flags: Optional[Tuple[bool, bool]]) -> None:
+    """ワーカー側: worker_flags() の指定どおりに始める（終わったら snapshot() して disable()）。"""
+    disable()
+    if flags is None:
+        return
+    if flags[0]:
+        enable()
+    if flags[1]:
+        enable_trace("worker")
+
+def snapshot() -> Optional[Dict[str, Any]]:
+    """ワーカーから返す形（pickle できる dict。どちらも無効なら None）。"""
+    if STATS is None and TRACE is None:
+        return None
+    return {"stats": STATS.snapshot() if STATS is not None else None,
+            "trace": TRACE.snapshot() if TRACE is not None else None}
+
+def merge(snap: Optional[Dict[str, Any]]) -> None:
+    """ワーカーの snapshot() を合流する。"""
+    if snap is None:
+        return
+    if STATS is not None and snap["stats"] is not None:
+        STATS.merge(snap["stats"])
+    if TRACE is not None and snap["trace"] is not None:
+        TRACE.merge(snap["trace"])
+
+def count_lines(data: Any) -> int:
+    """改行の数（mmap は count が無いのでブロックごとに数える）。"""
+    if isinstance(data, bytes):
+        return data.count(b"\n")
+    return sum(data[i:i + (1 << 20)].count(b"\n") for i in range(0, len(data), 1 << 20))
+
+# --- CLI 共通 ---
+
+def add_stats_args(ap: ArgumentParser) -> None:
+    ap.add_argument("--stats", action="store_true", help="段階ごとの時間と件数を stderr に表示する")
+    ap.add_argument("--stats-json", metavar="PATH", help="段階ごとの時間と件数を JSON で書き出す")
+    ap.add_argument("--trace", metavar="PATH",
+                    help="ファイルごとの read / parse / cache / write を Chrome trace_event 形式で追記する（Perfetto で開く）")
+
+def start(args: Namespace, name: Optional[str] = None) -> None:
+    """
+    --stats / --stats-json / --trace が指定されていれば計測を始める（引数の解析直後に呼ぶ）。
+    name はトレースに出すプロセス名（ArgumentParser.prog。省略時はスクリプト名）。
+    """
+    if args.stats or args.stats_json:
+        enable()
+    if args.trace:
+        enable_trace(Path(name or sys.argv[0]).stem)
+
+def finish(args: Namespace) -> None:
+    """計測結果を --stats（stderr）/ --stats-json / --trace に出す。"""
+    if TRACE is not None and args.trace:
+        TRACE.save(Path(args.trace).expanduser())
+    if STATS is None:
+        return
+    if args.stats:
+        print(STATS.summary(), file=sys.stderr)
+    if args.stats_json:
+        STATS.write_json(Path(args.stats_json).expanduser())
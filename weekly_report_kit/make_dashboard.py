@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+
+"""
+Notion日記と Toggl の記録を日付で突き合わせたダッシュボード（dashboard.md）を作る。
+
+  weekly-report-kit dashboard --src data --toggl-src data/toggl --dashboard-out reports/dashboard.md
+
+フォーマット（1週）:
+# 2024-W02（2024-01-06〜2024-01-12）   ← 土→金(Asia/Tokyo)。ラベルは金曜日の ISO 週
+合計: 12:34                             ← Toggl の週の合計
+## 2024-01-06（土）
+計測: 3:20
+| クライアント | プロジェクト | 時間 |   ← その日の Toggl のプロジェクト別（時間の多い順）
+### 🧪 習慣ログ                         ← その日の日記の対象H2を H3 にして本文を“そのまま”
+### 🚧 振返り・分析・改善点
+
+仕様:
+- 日記側は extract_entry、Toggl 側は TogglStats.day_projects（日, クライアント, プロジェクト）→ 秒
+- Toggl を先に1回だけ読み、日付 → その日の行 のハッシュ表を作る。日記は1ファイル1回だけ読み、
+  各日付で表を引く（どちらのソースも読み直さない）
+- 日記・Toggl のどちらかにしかない日も出す（「日記なし」「計測なし」）
+- 同じ日付のページが複数あれば、走査順にセクションを続けて出す
+- make_weekly --dashboard-out からも同じ形式で書き出せる（.md の解析を ideas / meals / bundle と共有）
+- --stats / --stats-json で段階ごとの時間と件数、--trace でファイルごとのトレースを出す（instrument）
+"""
+
+import argparse
+import re
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from . import instrument
+from .md_spans import Entry, norm
+from ._util import default_jobs
+from .notion_corpus import load_pages
+from .notion_sources import DirIndex, walk_md_files
+from .parse_cache import ParseCache
+from .report_writer import ReportWriter
+from .toggl_csv import TogglStats, find_csv_files, fmt_hm, load_stats
+from .toggl_db import db_stats, ingest
+from .weeks import DateRange, add_range_args, in_range, resolve_range, select_in_range, week_label, week_start
+from .make_notion_report import extract_entry, h2_to_h3
+from .make_toggl_report import cell, fmt_day
+
+# ダッシュボードに出す日記のセクション（習慣ログ・振返り。表記ゆれは make_notion_report と同じ）
+RE_DASHBOARD_HEAD = re.compile(r"習慣ログ|振り?返り")
+
+DayRows = List[Tuple[str, str, int]]  # (クライアント, プロジェクト, 秒)（時間の多い順）
+
+def load_toggl(src: Path, rng: Optional[DateRange], jobs: int, store: Optional[Path] = None) -> TogglStats:
+    """Toggl の集計（store を指定すれば新しい行だけ取り込んでからストアの全エントリを集計）。"""
+    files = find_csv_files(src)
+    if store is None:
+        return load_stats(files, rng, jobs)
+    ingest(store, files, jobs)
+    return db_stats(store, rng)
+
+def day_table(stats: TogglStats) -> Dict[date, DayRows]:
+    """日付 → その日のプロジェクト別の時間（突き合わせのハッシュ表）。"""
+    table: Dict[date, DayRows] = {}
+    for (d, client, project), sec in stats.day_projects.items():
+        table.setdefault(d, []).append((client, project, sec))
+    for rows in table.values():
+        rows.sort(key=lambda r: (-r[2], r[0], r[1]))
+    return table
+
+def write_dashboard(out_path: Path, entries: List[Entry], toggl: Dict[date, DayRows]) -> None:
+    """
+    日記（日付昇順の Entry）と Toggl の表を日付で突き合わせて書き出す。
+    日記の日付ごとに表を引き、表にしかない日も日付順に挟む。
+    """
+    by_date: Dict[date, List[Entry]] = {}
+    for entry in entries:
+        by_date.setdefault(entry.date, []).append(entry)
+    days = sorted(by_date.keys() | toggl.keys())
+    with ReportWriter(out_path) as w:
+        week: Optional[date] = None
+        for d in days:
+            sat = week_start(d)
+            if sat != week:
+                week = sat
+                fri = sat + timedelta(days=6)
+                total = sum(sec for i in range(7) for *_, sec in toggl.get(sat + timedelta(days=i), ()))
+                w.line(f"# {week_label(sat)}（{sat.isoformat()}〜{fri.isoformat()}）")
+                w.line("")
+                w.line(f"合計: {fmt_hm(total)}")
+                w.line("")
+
+            w.line(f"## {fmt_day(d)}")
+            w.line("")
+            rows = toggl.get(d)
+            if rows:
+                w.line(f"計測: {fmt_hm(sum(sec for *_, sec in rows))}")
+                w.line("")
+                w.line("| クライアント | プロジェクト | 時間 |")
+                w.line("|---|---|---:|")
+                for client, project, sec in rows:
+                    w.line(f"| {cell(client)} | {cell(project)} | {fmt_hm(sec)} |")
+            else:
+                w.line("計測なし")
+            w.line("")
+
+            day_entries = by_date.get(d)
+            if not day_entries:
+                w.line("日記なし")
+                w.line("")
+                continue
+            for entry in day_entries:
+                for sec in entry.sections:
+                    if RE_DASHBOARD_HEAD.search(norm(sec.head)):
+                        w.line(h2_to_h3(sec.head))
+                        w.body(sec)
+                        w.line("")
+
+def main(argv: Optional[List[str]] = None, prog: Optional[str] = None):
+    ap = argparse.ArgumentParser(prog=prog, description="Notion日記と Toggl の記録を日付で突き合わせた dashboard.md を作る")
+    ap.add_argument("--src", required=True, help="Notionエクスポートのフォルダ / .mdファイル / エクスポート.zip")
+    ap.add_argument("--toggl-src", default="data/toggl", help="Toggl Detailed CSV のフォルダ / .csv ファイル（既定: data/toggl）")
+    ap.add_argument("--toggl-store", help="Toggl のストアのフォルダ（指定時のみ。toggl_db で新しい行だけ取り込む）")
+    ap.add_argument("--dashboard-out", required=True, help="ダッシュボードMarkdownの出力先")
+    add_range_args(ap)
+    ap.add_argument("--cache-dir", help="解析キャッシュの保存先（指定時のみ。未変更ファイルは再解析しない）")
+    ap.add_argument("--jobs", type=int, default=default_jobs(), help="並列解析のプロセス数（既定: CPU数、1で直列）")
+    instrument.add_stats_args(ap)
+    args = ap.parse_args(argv)
+    instrument.start(args, ap.prog)
+
+    src = Path(args.src).expanduser()
+    toggl_src = Path(args.toggl_src).expanduser()
+    if not toggl_src.exists():
+        ap.error(f"--toggl-src が見つかりません: {toggl_src}")
+    rng = resolve_range(ap, args)
+
+    # 1) Toggl を1回読んで日付のハッシュ表に
+    try:
+        with instrument.phase("toggl"):
+            stats = load_toggl(toggl_src, rng, args.jobs, Path(args.toggl_store).expanduser() if args.toggl_store else None)
+    except ValueError as e:
+        ap.error(str(e))
+    toggl = day_table(stats)
+
+    # 2) 日記を1回読む
+    index = DirIndex.open(Path(args.cache_dir)) if args.cache_dir else None
+    with instrument.phase("walk"):
+        found = walk_md_files(src, index)
+        files = select_in_range(found, rng)
+    instrument.count("files_scanned", len(found))
+    instrument.count("files_out_of_range", len(found) - len(files))
+    with instrument.phase("cache"):
+        cache = ParseCache.open(Path(args.cache_dir)) if args.cache_dir else None
+    entries: List[Entry] = []
+    for fp, parsed in load_pages(files, {"entry": extract_entry}, cache, args.jobs):
+        entry: Entry = parsed["entry"]
+        if not entry.date:
+            instrument.count("files_no_date")
+        elif in_range(entry.date, rng):
+            entries.append(entry)
+    if cache:
+        with instrument.phase("cache"):
+            index.save()
+            cache.save()
+        print(cache.summary())
+    with instrument.phase("sort"):
+        entries.sort(key=lambda x: x.date)
+
+    out_path = Path(args.dashboard_out).expanduser()
+    with instrument.phase("write"):
+        write_dashboard(out_path, entries, toggl)
+    print(f"✅ Wrote: {out_path}  ({len(entries)} entries, {len(toggl)} tracked days)")
+    instrument.finish(args)
+
+if __name__ == "__main__":
+    main()
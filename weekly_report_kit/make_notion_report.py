@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+
+"""
+Notionエクスポート(.md群)から「日記本文をそのまま束ねた」レポートを作成。
+
+フォーマット（1エントリ）:
+# YYYY年M月D日                         ← 解析した日付を必ずH1で出す
+## <元のH1タイトルそのまま>            ← 元のH1はH2へ変換して出す（“そのまま”）
+### 🧪 習慣ログ                         ← 対象H2はH3にして本文を“そのまま”連結
+…（本文そのまま／「日付: …」行は除去）
+
+仕様:
+- 既定では期間フィルタなし（--week で土→金の週、--from/--to で任意期間に絞り込み）
+- 対象セクションは以下のH2のみを抽出（出現順を保持して出力）
+    - 🧪 習慣ログ
+    - ☀️ 今日の実践（括弧の有無に寛容）
+    - ✨ ひらめき
+    - 🧠 新たな学び・気づき・共感
+    - 🚧 振返り・分析・改善点（「振り返り」「振返り」表記ゆれ対応）
+- 本文中の「日付: YYYY年M月D日」行はノイズとして出力しない
+- --stats / --stats-json で段階ごとの時間と件数、--trace でファイルごとのトレースを出す（instrument）
+"""
+
+import argparse
+import re
+from pathlib import Path
+from datetime import date
+from typing import List, Optional, Tuple
+
+from . import instrument
+from .md_spans import Entry, Section, decode_line, line_end, norm, parse_date
+from .md_tokens import BODY, H2, Tokenizer, add_span
+from ._util import default_jobs
+from .notion_corpus import load_pages
+from .notion_sources import DirIndex, walk_md_files
+from .parse_cache import ParseCache
+from .report_writer import ReportWriter
+from .weeks import add_range_args, in_range, resolve_range, select_in_range
+
+# 対象H2の見出し判定用キー（含まれていればOK／表記ゆれケア）
+H2_KEYS = [
+    "🧪 習慣ログ",
+    "☀️ 今日の実践",
+    "✨ ひらめき",
+    "🧠 新たな学び・気づき・共感",
+    "🚧 振返り・分析・改善点",
+]
+
+# 対象H2の判定を1つの正規表現にまとめたもの（空白は1つに正規化済みの見出し行に当てる）
+TOKENIZER = Tokenizer([
+    (key, re.escape(key.replace("振り返り", "振返り")).replace("振返り", "振り?返り"))  # ゆれ吸収
+    for key in H2_KEYS
+])
+
+def h1_to_title_text(h1_line: str) -> str:
+    """H1行から '# ' を外して素のタイトル文字列に。"""
+    return re.sub(r"^\s*#\s*", "", h1_line.strip())
+
+def h2_to_h3(head_line: str) -> str:
+    """H2見出しをH3へ変換（本文テキストはそのまま）。"""
+    text = re.sub(r"^\s*##\s*", "", head_line.strip())
+    return f"### {text}"
+
+YEAR_MARK = "年".encode()
+
+def extract_entry(buf: bytes) -> Entry:
+    """
+    1ファイル分（\n 正規化済みのバイト列）を解析して Entry を返す:
+      - title_h1: 元のH1行（文字列／先頭の`#`付き）。無ければ None
+      - date: 解析した日付（H1/「日付:」から）
+      - sections: 対象H2のみ、出現順の Section（見出し行＋本文の範囲）
+                  本文中の「日付: …」行は範囲から除外
+    本文は buf への (start, end) 範囲で持ち、行をコピーしない。
+    """
+    mv = memoryview(buf)
+    n = len(buf)
+    title_h1: Optional[str] = None
+    d: Optional[date] = None
+
+    # タイトルと日付を拾う（上から順に。両方そろえばそれ以降は見ない）
+    pos = 0
+    while pos < n and (title_h1 is None or d is None):
+        e = line_end(buf, pos, n)
+        if title_h1 is None and buf.find(b"#", pos, e) >= 0:
+            ln = decode_line(buf, pos, e)
+            if norm(ln).strip().startswith("# "):
+                title_h1 = ln.rstrip("\n")
+                d = d or parse_date(ln)
+        if d is None and buf.find(YEAR_MARK, pos, e) >= 0:
+            d = parse_date(decode_line(buf, pos, e))
+        pos = e
+
+    # 対象H2セクションを、見つけた順に抽出（「## 」「# 」行で終わる）
+    sections: List[Section] = []
+    cur: Optional[Section] = None
+    for kind, sid, s, e in TOKENIZER.tokens(buf):
+        if kind == BODY:
+            if cur is not None:
+                add_span(cur.spans, s, e)
+        elif kind <= H2:
+            cur = None
+            if sid is not None:
+                cur = Section(decode_line(buf, s, e).rstrip("\n"), mv, [])
+                sections.append(cur)
+        # DATE: 「日付:」行は本文としては除外
+
+    return Entry(title_h1, d, sections)
+
+def write_bundle(out_path: Path, entries: List[Entry]) -> None:
+    """
+    日付昇順の Entry を bundle.md 形式で書き出す。
+    1エントリずつ一時ファイルへストリーミングし、最後にアトミックに差し替える。
+    本文は元ファイルの範囲をそのまま書く（行ごとの文字列は作らない）。
+    """
+    with ReportWriter(out_path) as w:
+        for entry in entries:
+            d = entry.date
+            # 1) 常に 日付H1 を先頭に出力
+            w.line(f"# {d.year}年{d.month}月{d.day}日")
+            w.line("")
+
+            # 2) 元のH1タイトルは H2 として“そのまま”出力（# を ## に変換）
+            if entry.title_h1:
+                title_text = h1_to_title_text(entry.title_h1)
+                w.line(f"## {title_text}")
+                w.line("")
+
+            # 3) 対象H2は H3 に降格し、本文は“そのまま”出力（出現順）
+            for sec in entry.sections:
+                w.line(h2_to_h3(sec.head))
+                w.body(sec)
+                w.line("")  # セクション間の空行
+
+            # エントリ間の空行
+            w.line("")
+
+def main(argv: Optional[List[str]] = None, prog: Optional[str] = None):
+    ap = argparse.ArgumentParser(prog=prog, description="Notion日記(.md)を日付順で束ねる（--week/--from/--to で期間指定可）")
+    ap.add_argument("--src", required=True, help="Notionエクスポートのフォルダ / .mdファイル / エクスポート.zip")
+    ap.add_argument("--bundle-out", required=True, help="まとめMarkdownの出力先")
+    add_range_args(ap)
+    ap.add_argument("--cache-dir", help="解析キャッシュの保存先（指定時のみ。未変更ファイルは再解析しない）")
+    ap.add_argument("--jobs", type=int, default=default_jobs(), help="並列解析のプロセス数（既定: CPU数、1で直列）")
+    instrument.add_stats_args(ap)
+    args = ap.parse_args(argv)
+    instrument.start(args, ap.prog)
+
+    src = Path(args.src).expanduser()
+    index = DirIndex.open(Path(args.cache_dir)) if args.cache_dir else None
+    rng = resolve_range(ap, args)
+    with instrument.phase("walk"):
+        found = walk_md_files(src, index)
+        files = select_in_range(found, rng)
+    instrument.count("files_scanned", len(found))
+    instrument.count("files_out_of_range", len(found) - len(files))
+    with instrument.phase("cache"):
+        cache = ParseCache.open(Path(args.cache_dir)) if args.cache_dir else None
+
+    # Entry(title_h1, date, sections[]) を集める
+    entries: List[Entry] = []
+    for fp, parsed in load_pages(files, {"entry": extract_entry}, cache, args.jobs):
+        entry: Entry = parsed["entry"]
+        if not entry.date:
+            instrument.count("files_no_date")
+            continue  # 日付が取れないノートはスキップ
+        if not in_range(entry.date, rng):
+            continue  # 期間外
+        entries.append(entry)
+
+    if cache:
+        with instrument.phase("cache"):
+            index.save()
+            cache.save()
+        print(cache.summary())
+
+    # 日付昇順に整列
+    with instrument.phase("sort"):
+        entries.sort(key=lambda x: x.date)
+
+    out_path = Path(args.bundle_out).expanduser()
+    with instrument.phase("write"):
+        write_bundle(out_path, entries)
+    print(f"✅ Wrote: {out_path}  ({len(entries)} entries)")
+    instrument.finish(args)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
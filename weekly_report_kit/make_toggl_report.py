@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+"""
+Toggl Detailed CSV から週次の作業時間レポート（toggl.md）を作る。
+
+  weekly-report-kit toggl --src data/toggl --out reports/toggl.md [--week 2024-01-10]
+
+フォーマット（1週）:
+## 2024-W02（2024-01-06〜2024-01-12）   ← 土→金(Asia/Tokyo)。ラベルは金曜日の ISO 週
+合計: 12:34
+### 日別 / ### プロジェクト / ### クライアント / ### タグ   ← 表（時間の多い順・割合つき）
+
+仕様:
+- --src のフォルダ以下の *.csv をすべて読む（複数年・複数ファイルのエクスポートをそのまま置いてよい）
+- CSV は1行ずつ読み、集計値だけを持つ（toggl_csv.TogglStats）
+- 大きい CSV はレコードの境界で範囲に分け、--jobs のプロセスで並列に集計して合流する
+- --store を指定するとストア（toggl_db）に新しい行だけ取り込んでから、ストアの全エントリを集計する。
+  取り込み済みの CSV は読まず、期間の重なるエクスポートのエントリも二重に数えない
+- 既定では期間フィルタなし（--week / --from / --to で開始日を絞り込み）
+- 時間は H:MM（分は四捨五入）
+- --stats / --stats-json / --trace で取り込み・集計（toggl）と書き出し（write）の時間を出す（instrument）
+"""
+
+import argparse
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from . import instrument
+from ._util import default_jobs
+from .report_writer import ReportWriter
+from .toggl_csv import TogglStats, find_csv_files, fmt_hm, load_stats
+from .toggl_db import db_stats, ingest
+from .weeks import add_range_args, resolve_range, week_label
+
+WEEKDAYS = "月火水木金土日"
+
+def fmt_day(d: date) -> str:
+    return f"{d.isoformat()}（{WEEKDAYS[d.weekday()]}）"
+
+def cell(s: str) -> str:
+    """表のセル（| を含む名前でも崩れないように）。"""
+    return s.replace("|", "\\|")
+
+def by_week(counter) -> Dict[date, List[Tuple[Tuple[str, ...], int]]]:
+    """(週の土曜, 名前...) → 秒 を、週ごとの [(名前..., 秒)]（時間の多い順）に分ける。"""
+    weeks: Dict[date, List[Tuple[Tuple[str, ...], int]]] = {}
+    for (sat, *names), sec in counter.items():
+        weeks.setdefault(sat, []).append((tuple(names), sec))
+    for rows in weeks.values():
+        rows.sort(key=lambda r: (-r[1], r[0]))
+    return weeks
+
+def write_table(w: ReportWriter, title: str, columns: List[str], rows: List[Tuple[Tuple[str, ...], int]], total: int) -> None:
+    w.line(f"### {title}")
+    w.line("")
+    w.line("| " + " | ".join(columns + ["時間", "割合"]) + " |")
+    w.line("|" + "---|" * len(columns) + "---:|---:|")
+    for names, sec in rows:
+        share = f"{sec * 100 / total:.1f}%" if total else "-"
+        w.line("| " + " | ".join(cell(n) for n in names) + f" | {fmt_hm(sec)} | {share} |")
+    w.line("")
+
+def write_report(out_path: Path, stats: TogglStats) -> None:
+    """週ごと（昇順）に日別・プロジェクト・クライアント・タグの表を書く。"""
+    projects = by_week(stats.projects)
+    clients = by_week(stats.clients)
+    tags = by_week(stats.tags)
+    with ReportWriter(out_path) as w:
+        for sat in stats.weeks():
+            days = [sat + timedelta(days=i) for i in range(7)]
+            total = sum(stats.days[d] for d in days)
+            w.line(f"## {week_label(sat)}（{days[0].isoformat()}〜{days[-1].isoformat()}）")
+            w.line("")
+            w.line(f"合計: {fmt_hm(total)}")
+            w.line("")
+            write_table(w, "日別", ["日付"], [((fmt_day(d),), stats.days[d]) for d in days], total)
+            write_table(w, "プロジェクト", ["クライアント", "プロジェクト"], projects.get(sat, []), total)
+            write_table(w, "クライアント", ["クライアント"], clients.get(sat, []), total)
+            write_table(w, "タグ", ["タグ"], tags.get(sat, []), total)
+
+def main(argv: Optional[List[str]] = None, prog: Optional[str] = None):
+    ap = argparse.ArgumentParser(prog=prog, description="Toggl Detailed CSV を土→金(Asia/Tokyo)の週ごとに集計する")
+    ap.add_argument("--src", default="data/toggl", help="Toggl Detailed CSV のフォルダ / .csv ファイル（既定: data/toggl）")
+    ap.add_argument("--out", default="reports/toggl.md", help="出力先（既定: reports/toggl.md）")
+    add_range_args(ap)
+    ap.add_argument("--jobs", type=int, default=default_jobs(), help="並列集計のプロセス数（既定: CPU数、1で直列）")
+    ap.add_argument("--store", help="ストアのフォルダ（指定時のみ。新しい行だけ取り込み、重複は数えない）")
+    instrument.add_stats_args(ap)
+    args = ap.parse_args(argv)
+    instrument.start(args, ap.prog)
+
+    src = Path(args.src).expanduser()
+    if not src.exists():
+        ap.error(f"--src が見つかりません: {src}")
+    rng = resolve_range(ap, args)
+
+    files = find_csv_files(src)
+    try:
+        with instrument.phase("toggl"):
+            if args.store:
+                root = Path(args.store).expanduser()
+                r = ingest(root, files, args.jobs)
+                print(f"[store] {r.entries} entries  (added: {r.added}  duplicates: {r.duplicates}  "
+                      f"read: {r.new_files} files: {args.store})")
+                stats = db_stats(root, rng)
+            else:
+                stats = load_stats(files, rng, args.jobs)
+    except ValueError as e:
+        ap.error(str(e))
+
+    out_path = Path(args.out).expanduser()
+    with instrument.phase("write"):
+        write_report(out_path, stats)
+    instrument.finish(args)
+    skipped = f"  skipped: {stats.skipped} rows" if stats.skipped else ""
+    print(f"✅ Wrote: {out_path}  ({len(files)} files, {stats.entries} entries, {len(stats.weeks())} weeks){skipped}")
+
+if __name__ == "__main__":
+    main()
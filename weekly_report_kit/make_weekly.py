@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+
+"""
+Notionエクスポート(.md群)を1回だけ走査して
+- ideas.md  （✨ひらめき）
+- meals.md  （🧪習慣ログ/【食事】）
+- bundle.md （日記“そのまま”束ね）
+- dashboard.md（日記と Toggl の記録を日付で突き合わせたもの。--dashboard-out 指定時）
+- toggl.md  （Toggl の週次集計。--toggl-out 指定時。dashboard と同じ集計を1回だけ読む）
+をまとめて生成する単一パス版エンジン。
+
+各 .md は1回だけ読み込み、同じバイト列を
+extract_ideas_and_meals / extract_entry の両方に渡す。
+出力フォーマットは個別スクリプトと完全に同一。
+
+※既定では期間フィルタなし（--week / --from / --to 指定時だけ日付で絞り込む）
+※指定された出力だけを書き出す
+※--stats / --stats-json で段階ごとの時間と件数、--trace でファイルごとのトレースを出す（instrument）
+
+--all-weeks:
+  コーパスを1回だけ解析し、土→金(Asia/Tokyo)の週ごとに
+  <out-dir>/YYYY-Www/{ideas,meals,bundle}.md を書き出す（週番号は金曜日の ISO 週）。
+  週ごとの入力の指紋を <out-dir>/.all-weeks.json に残し、前回から変わっていない週は書き直さない。
+  前回はあって今回は無い週（ページを消した等）は、その週の出力を消す（フォルダは空になれば消す）。
+  常に全期間が対象なので --week / --from / --to とは併用できない。
+
+--watch:
+  解析結果をメモリに持ったまま src の変更を待ち、変わった .md だけ解析し直して
+  内容の変わった出力だけを書き直す（watch_weekly。Ctrl-C で終了）。
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from datetime import date
+from typing import TYPE_CHECKING, Any, Collection, Dict, List, Optional, Tuple
+
+from . import instrument
+from .md_spans import Entry, IdeasMeals, Section
+from ._util import default_jobs
+from .notion_corpus import load_pages
+from .notion_sources import DirIndex, walk_md_files
+from .parse_cache import ParseCache
+from .weeks import DateRange, add_range_args, in_range, resolve_range, select_in_range, week_label
+from .extract_notion_diary_multi import extract_ideas_and_meals, is_nashi, write_dated_chunks
+from .make_notion_report import extract_entry, write_bundle
+
+if TYPE_CHECKING:
+    from .make_dashboard import DayRows
+
+IdeaRow = Tuple[date, Section]
+IdeaRows = List[IdeaRow]
+Entries = List[Entry]
+PageRows = Tuple[Optional[IdeaRow], Optional[IdeaRow], Optional[Entry]]  # 1ファイルが各出力に入れる行
+
+MANIFEST = ".all-weeks.json"
+OUTPUT_NAMES = ("ideas.md", "meals.md", "bundle.md")
+
+def page_rows(parsed: Dict[str, Any], rng: Optional[DateRange], want_ideas: bool, want_meals: bool,
+              skip_nashi: bool) -> PageRows:
+    """1ファイルの解析結果から (ideas の行, meals の行, bundle の Entry) を作る（入らないものは None）。"""
+    idea = meal = entry = None
+    page: Optional[IdeasMeals] = parsed.get("ideas_meals")
+    if page is not None and page.date and in_range(page.date, rng):
+        if want_ideas and page.ideas and not (skip_nashi and is_nashi(page.ideas)):
+            idea = (page.date, page.ideas)
+        if want_meals and page.meals:
+            meal = (page.date, page.meals)
+    e: Optional[Entry] = parsed.get("entry")
+    if e is not None and e.date and in_range(e.date, rng):
+        entry = e
+    return idea, meal, entry
+
+def _fingerprint(skip_nashi: bool, ideas: IdeaRows, meals: IdeaRows, entries: Entries) -> str:
+    # memo なし（fast）で pickle する: 解析直後とキャッシュ復元後で、同じ見出し文字列や
+    # 参照先を共有しているかどうかが違っても同じバイト列になるように
+    buf = io.BytesIO()
+    p = pickle.Pickler(buf, protocol=4)
+    p.fast = True
+    p.dump((skip_nashi, ideas, meals, entries))
+    return hashlib.blake2b(buf.getvalue(), digest_size=16).hexdigest()
+
+def _remove_week(d: Path) -> None:
+    """前回書いた週の出力を消す（ほかのファイルが置いてあればフォルダは残す）。"""
+    for name in OUTPUT_NAMES:
+        (d / name).unlink(missing_ok=True)
+    try:
+        d.rmdir()
+    except OSError:
+        pass
+
+def write_all_weeks(out_dir: Path, rows_ideas: IdeaRows, rows_meals: IdeaRows, entries: Entries,
+                    skip_nashi: bool, jobs: int) -> Tuple[int, int, int]:
+    """
+    日付昇順の行を週ごとに分けて書き出す。戻り値は (書いた週, スキップした週, 消した週)。
+    入力の指紋が前回と同じで、出力もそろっている週は書き直さない。
+    前回の manifest にあって今回の入力に無い週は出力を消す。
+    """
+    weeks: Dict[str, Tuple[IdeaRows, IdeaRows, Entries]] = {}
+    for i, rows in enumerate((rows_ideas, rows_meals)):
+        for row in rows:
+            weeks.setdefault(week_label(row[0]), ([], [], []))[i].append(row)
+    for entry in entries:
+        weeks.setdefault(week_label(entry.date), ([], [], []))[2].append(entry)
+
+    manifest_path = out_dir / MANIFEST
+    try:
+        old = json.loads(manifest_path.read_text(encoding="utf-8")).get("weeks", {})
+    except (OSError, ValueError):
+        old = {}
+
+    prints = {label: _fingerprint(skip_nashi, *rows) for label, rows in weeks.items()}
+    todo = [label for label in sorted(weeks)
+            if old.get(label) != prints[label]
+            or not all((out_dir / label / name).exists() for name in OUTPUT_NAMES)]
+
+    def write_week(label: str) -> None:
+        ideas, meals, week_entries = weeks[label]
+        d = out_dir / label
+        write_dated_chunks(d / "ideas.md", ideas)
+        write_dated_chunks(d / "meals.md", meals, with_head=True)
+        write_bundle(d / "bundle.md", week_entries)
+
+    # 週ごとに独立したファイルなので並列に書く（失敗は result() で再送出）
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as ex:
+        for fut in [ex.submit(write_week, label) for label in todo]:
+            fut.result()
+
+    # manifest の名前だけを信じて消すので、out_dir 直下の名前に限る
+    stale = [label for label in sorted(old) if label not in prints and label == Path(label).name
+             and label not in ("", ".", "..")]
+    for label in stale:
+        _remove_week(out_dir / label)
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    tmp = manifest_path.with_name(f".{MANIFEST}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps({"version": 1, "weeks": prints}, ensure_ascii=False, indent=1), encoding="utf-8")
+    os.replace(tmp, manifest_path)
+    return len(todo), len(weeks) - len(todo), len(stale)
+
+def write_outputs(args: argparse.Namespace, rows_ideas: IdeaRows, rows_meals: IdeaRows, entries: Entries,
+                  toggl: Optional[Dict[date, "DayRows"]], only: Optional[Collection[str]] = None) -> None:
+    """
+    指定された出力を書き出す。only を渡せばその出力（"ideas" / "meals" / "bundle" / "dashboard"）だけ
+    （--all-weeks は週ごとの指紋で書き直す週を決めるので only を見ない）。
+    """
+    if args.all_weeks:
+        out_dir = Path(args.all_weeks).expanduser()
+        written, skipped, removed = write_all_weeks(out_dir, rows_ideas, rows_meals, entries, args.skip_nashi,
+                                                    args.jobs)
+        print(f"✅ Wrote: {out_dir}/YYYY-Www/  ({written} weeks written, {skipped} unchanged, {removed} removed)")
+        return
+
+    if args.ideas_out and (only is None or "ideas" in only):
+        out = Path(args.ideas_out).expanduser()
+        write_dated_chunks(out, rows_ideas)
+        print(f"[OK] wrote: {out}")
+    if args.meals_out and (only is None or "meals" in only):
+        out = Path(args.meals_out).expanduser()
+        write_dated_chunks(out, rows_meals, with_head=True)
+        print(f"[OK] wrote: {out}")
+    if args.bundle_out and (only is None or "bundle" in only):
+        out_path = Path(args.bundle_out).expanduser()
+        write_bundle(out_path, entries)
+        print(f"✅ Wrote: {out_path}  ({len(entries)} entries)")
+    if args.dashboard_out and (only is None or "dashboard" in only):
+        from .make_dashboard import write_dashboard
+        out_path = Path(args.dashboard_out).expanduser()
+        write_dashboard(out_path, entries, toggl)
+        print(f"✅ Wrote: {out_path}  ({len(entries)} entries, {len(toggl)} tracked days)")
+
+def main(argv: Optional[List[str]] = None, prog: Optional[str] = None):
+    ap = argparse.ArgumentParser(prog=prog, description="Notion日記(.md)から ideas / meals / bundle を1パスで生成")
+    ap.add_argument("--src", required=True, help="Notionエクスポートのフォルダ / .mdファイル / エクスポート.zip")
+    ap.add_argument("--ideas-out", help="✨ひらめきを書き出すパス（指定時のみ出力）")
+    ap.add_argument("--meals-out", help="🧪習慣ログ/【食事】を書き出すパス（指定時のみ出力）")
+    ap.add_argument("--bundle-out", help="まとめMarkdownの出力先（指定時のみ出力）")
+    ap.add_argument("--dashboard-out", help="日記と Toggl を日付で突き合わせたダッシュボードの出力先（指定時のみ出力）")
+    ap.add_argument("--toggl-out", help="Toggl の週次集計（make_toggl_report と同じ）の出力先（指定時のみ出力）")
+    ap.add_argument("--toggl-src", default="data/toggl", help="ダッシュボード / --toggl-out 用の Toggl Detailed CSV（既定: data/toggl）")
+    ap.add_argument("--toggl-store", help="Toggl のストアのフォルダ（指定時のみ。toggl_db で新しい行だけ取り込む）")
+    ap.add_argument("--skip-nashi", action="store_true", help="『なし』だけのひらめきは出力しない")
+    ap.add_argument("--all-weeks", metavar="OUT_DIR",
+                    help="全期間を週(土→金)ごとに OUT_DIR/YYYY-Www/{ideas,meals,bundle}.md へ書き出す")
+    add_range_args(ap)
+    ap.add_argument("--cache-dir", help="解析キャッシュの保存先（指定時のみ。未変更ファイルは再解析しない）")
+    ap.add_argument("--jobs", type=int, default=default_jobs(), help="並列解析のプロセス数（既定: CPU数、1で直列）")
+    ap.add_argument("--watch", action="store_true",
+                    help="書き出した後も src の変更を待ち、変わったファイルの分だけ出力を更新し続ける（Ctrl-C で終了）")
+    ap.add_argument("--debounce", type=float, default=0.2,
+                    help="--watch: 最後の変更からこれだけ（秒）待ってまとめて更新する（既定: 0.2）")
+    ap.add_argument("--poll", type=float, metavar="SEC",
+                    help="--watch: inotify を使わず SEC 秒ごとに stat して変更を探す（ネットワークドライブなど）")
+    instrument.add_stats_args(ap)
+    args = ap.parse_args(argv)
+    instrument.start(args, ap.prog)
+
+    if args.all_weeks and (args.ideas_out or args.meals_out or args.bundle_out or args.dashboard_out):
+        ap.error("--all-weeks と --ideas-out / --meals-out / --bundle-out / --dashboard-out は同時に指定できません")
+    if not (args.all_weeks or args.ideas_out or args.meals_out or args.bundle_out or args.dashboard_out or args.toggl_out):
+        ap.error("--ideas-out / --meals-out / --bundle-out / --dashboard-out / --toggl-out / --all-weeks のいずれかを指定してください")
+    if args.watch and args.all_weeks:
+        ap.error("--watch と --all-weeks は同時に指定できません")
+    # 期間の外の週を「消えた週」として消し、境目の週を途中の日だけで書き直してしまうので併用させない
+    if args.all_weeks and (args.week or args.date_from or args.date_to):
+        ap.error("--all-weeks と --week / --from / --to は同時に指定できません")
+    want_ideas = bool(args.ideas_out or args.all_weeks)
+    want_meals = bool(args.meals_out or args.all_weeks)
+    want_bundle = bool(args.bundle_out or args.all_weeks or args.dashboard_out)
+
+    src = Path(args.src).expanduser()
+    index = DirIndex.open(Path(args.cache_dir)) if args.cache_dir else None
+    rng = resolve_range(ap, args)
+
+    # Toggl は先に1回だけ集計し、toggl.md はここで書き出す。ダッシュボード用には日付のハッシュ表にしておく
+    # （Toggl 側のモジュールは Toggl を読むときだけ import する）
+    toggl = None
+    if args.dashboard_out or args.toggl_out:
+        from .make_dashboard import day_table, load_toggl
+        from .make_toggl_report import write_report
+        toggl_src = Path(args.toggl_src).expanduser()
+        if not toggl_src.exists():
+            ap.error(f"--toggl-src が見つかりません: {toggl_src}")
+        store = Path(args.toggl_store).expanduser() if args.toggl_store else None
+        try:
+            with instrument.phase("toggl"):
+                stats = load_toggl(toggl_src, rng, args.jobs, store)
+        except ValueError as e:
+            ap.error(str(e))
+        if args.toggl_out:
+            out_path = Path(args.toggl_out).expanduser()
+            with instrument.phase("write"):
+                write_report(out_path, stats)
+            print(f"✅ Wrote: {out_path}  ({stats.entries} entries, {len(stats.weeks())} weeks)")
+        if args.dashboard_out:
+            toggl = day_table(stats)
+        if not (args.all_weeks or args.ideas_out or args.meals_out or args.bundle_out or args.dashboard_out):
+            instrument.finish(args)
+            return
+
+    # 1ファイル1回だけ読む（各出力の解析関数は同じバイト列を共有）
+    parsers = {}
+    if want_ideas or want_meals:
+        parsers["ideas_meals"] = extract_ideas_and_meals
+    if want_bundle:
+        parsers["entry"] = extract_entry
+    rows_of = partial(page_rows, rng=rng, want_ideas=want_ideas, want_meals=want_meals, skip_nashi=args.skip_nashi)
+
+    if args.watch:
+        from .watch_weekly import watch
+        cache = ParseCache.open(Path(args.cache_dir)) if args.cache_dir else None
+        watch(args, src, rng, index, cache, parsers, rows_of, toggl)
+        instrument.finish(args)
+        return
+
+    with instrument.phase("walk"):
+        found = walk_md_files(src, index)
+        files = select_in_range(found, rng)
+    instrument.count("files_scanned", len(found))
+    instrument.count("files_out_of_range", len(found) - len(files))
+    with instrument.phase("cache"):
+        cache = ParseCache.open(Path(args.cache_dir)) if args.cache_dir else None
+
+    rows_ideas: IdeaRows = []
+    rows_meals: IdeaRows = []
+    entries: Entries = []
+
+    for fp, parsed in load_pages(files, parsers, cache, args.jobs):
+        if not any(r.date for r in parsed.values()):
+            instrument.count("files_no_date")
+        idea, meal, entry = rows_of(parsed)
+        if idea:
+            rows_ideas.append(idea)
+        if meal:
+            rows_meals.append(meal)
+        if entry:
+            entries.append(entry)
+
+    if cache:
+        with instrument.phase("cache"):
+            index.save()
+            cache.save()
+        print(cache.summary())
+
+    # 日付昇順（安定ソートなので同日内はファイル順のまま＝個別スクリプトと同じ）
+    with instrument.phase("sort"):
+        rows_ideas.sort(key=lambda x: x[0])
+        rows_meals.sort(key=lambda x: x[0])
+        entries.sort(key=lambda x: x.date)
+
+    with instrument.phase("write"):
+        write_outputs(args, rows_ideas, rows_meals, entries, toggl)
+    instrument.finish(args)
+
+if __name__ == "__main__":
+    main()
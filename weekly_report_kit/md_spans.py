@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+
+"""
+日記ページの解析結果を「ファイルのバイト列への範囲」で持つためのレコードと、
+バイト列のまま行を扱う小さなヘルパ（行の分類は md_tokens）。
+
+- Section: 見出し1つ分。本文は buf（ファイル全体の memoryview）上の
+  (start, end) 範囲の並び。各範囲は行単位（改行込み）で、除外した「日付:」行の
+  ところで分かれる。本文行を str にコピーしない
+- Entry / IdeasMeals: 1ファイル分の解析結果（make_notion_report / extract_notion_diary_multi 用）
+
+行の区切りは \\n のみ（\\r\\n / \\r は読み込み時に \\n へ正規化済みの前提。
+str.splitlines() が行末とみなすほかの文字（\\x0b・\\x0c・\\x1c〜\\x1e・U+0085・U+2028・U+2029）は
+その直後に \\n を足してあるので、従来の splitlines() と同じ行に分かれる）。
+buf は bytes か mmap（大きいファイル）で、どちらも find / スライスだけで扱う。
+
+解析が終わったら detach() でファイル全体の buf を手放す:
+- 読んだバイト列がディスク上のファイルそのもの（\\r なし・zip 外）なら、範囲は
+  そのままファイルのオフセットなので Origin（パス・サイズ・digest）だけを持つ。
+  本文は書き出し時に元ファイルから直接コピーする（ReportWriter.body）
+- それ以外は参照している範囲だけを詰めた bytes に置き換える
+- UTF-8 として不正なバイトを含むファイルも詰めた bytes にし、従来の `errors="ignore"` の
+  デコードと同じくそのバイトを除く（元ファイルからそのままコピーはしない）
+pickle（キャッシュ保存・ワーカーからの返却）もこの形のまま運ぶ。
+"""
+
+import codecs
+import os
+import re
+from datetime import date
+from typing import BinaryIO, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+NBSP = "\u00A0"
+RE_H1_DATE = re.compile(r"^\s*#\s*(\d{4})年(\d{1,2})月(\d{1,2})日")
+RE_LINE_DATE = re.compile(r"^\s*日付\s*[:：]\s*(\d{4})年(\d{1,2})月(\d{1,2})日")
+DATE_WORD = "日付".encode("utf-8")
+# str.splitlines() が \r / \n 以外に行末とみなす文字の UTF-8（どれも UTF-8 の文字の途中には現れない）
+LINE_SEPARATORS = (b"\x0b", b"\x0c", b"\x1c", b"\x1d", b"\x1e", b"\xc2\x85", b"\xe2\x80\xa8", b"\xe2\x80\xa9")
+RE_LINE_SEPARATOR = re.compile(b"|".join(re.escape(sep) for sep in LINE_SEPARATORS))
+CHECK_BLOCK = 1 << 16  # is_utf8 で一度に str にする大きさ
+
+Span = Tuple[int, int]
+
+class Origin(NamedTuple):
+    """範囲の参照先ファイル。digest は中身が変わったら別物になるよう pickle に含める。"""
+    path: str
+    size: int
+    digest: bytes
+
+def open_origin(origin: Origin) -> BinaryIO:
+    """参照先を開く（解析後にサイズが変わっていたら範囲は使えないのでエラー）。"""
+    f = open(origin.path, "rb")
+    if os.fstat(f.fileno()).st_size != origin.size:
+        f.close()
+        raise RuntimeError(f"{origin.path} が実行中に変更されました。もう一度実行してください")
+    return f
+
+class Section:
+    """
+    見出し1つ分。head はデコード済みの見出し行（改行なし）。
+    本文は buf 上の範囲、buf が None なら origin のファイル上の範囲。
+    """
+    __slots__ = ("head", "buf", "spans", "origin")
+
+    def __init__(self, head: str, buf: Optional[memoryview], spans: List[Span], origin: Optional[Origin] = None):
+        self.head = head
+        self.buf = buf
+        self.spans = spans
+        self.origin = origin
+
+    def chunks(self) -> Iterator[Union[memoryview, bytes]]:
+        buf = self.buf
+        if buf is None:
+            with open_origin(self.origin) as f:
+                for s, e in self.spans:
+                    f.seek(s)
+                    yield f.read(e - s)
+            return
+        for s, e in self.spans:
+            yield buf[s:e]
+
+    def body_bytes(self) -> bytes:
+        return b"".join(self.chunks())
+
+    def lines(self) -> List[str]:
+        """本文を従来どおりの「改行を除いた行のリスト」で返す（小さい判定用）。"""
+        text = self.body_bytes().decode("utf-8", errors="ignore")
+        if not text:
+            return []
+        return (text[:-1] if text.endswith("\n") else text).split("\n")
+
+    def line_count(self) -> int:
+        body = self.body_bytes()
+        return body.count(b"\n") + (0 if body.endswith(b"\n") or not body else 1)
+
+    def detach(self, origin: Optional[Origin]) -> None:
+        """
+        ファイル全体の buf を手放す（origin があれば範囲だけ、無ければ本文を詰めて持つ）。
+        origin は正しい UTF-8 のファイルにだけ渡す（詰めるときは不正なバイトを除く）。
+        """
+        if self.buf is None:
+            return
+        if origin is not None:
+            self.buf = None
+            self.origin = origin
+        else:
+            body = clean_utf8(self.body_bytes())
+            self.buf = memoryview(body)
+            self.spans = [(0, len(body))] if body else []
+
+    def load(self) -> None:
+        """origin の範囲を読み込んで本文を詰めて持つ（長く持ち続けるとき。元ファイルが書き換わっても使える）。"""
+        if self.buf is None:
+            body = self.body_bytes()
+            self.buf = memoryview(body)
+            self.spans = [(0, len(body))] if body else []
+            self.origin = None
+
+    def __reduce__(self):
+        if self.buf is None:
+            return (_file_section, (self.head, self.spans, self.origin))
+        # 参照範囲だけを詰めて運ぶ（ファイル全体の buf は pickle しない）
+        return (_compact_section, (self.head, self.body_bytes()))
+
+    def __repr__(self) -> str:
+        return f"Section({self.head!r}, spans={self.spans!r})"
+
+def section_from_bytes(head: str, body: bytes) -> Section:
+    """本文を詰めた bytes から Section を作る（DB から読み戻すとき等）。"""
+    return Section(head, memoryview(body), [(0, len(body))] if body else [])
+
+def _compact_section(head: str, body: bytes) -> Section:
+    return section_from_bytes(head, body)
+
+def _file_section(head: str, spans: List[Span], origin: Origin) -> Section:
+    return Section(head, None, spans, Origin(*origin))
+
+class Entry:
+    """bundle 用: 元のH1行・日付・対象H2セクション（出現順）。"""
+    __slots__ = ("title_h1", "date", "sections")
+
+    def __init__(self, title_h1: Optional[str], d: Optional[date], sections: List[Section]):
+        self.title_h1 = title_h1
+        self.date = d
+        self.sections = sections
+
+    def detach(self, origin: Optional[Origin]) -> None:
+        for sec in self.sections:
+            sec.detach(origin)
+
+    def __reduce__(self):
+        return (Entry, (self.title_h1, self.date, self.sections))
+
+class IdeasMeals:
+    """ideas/meals 用: 日付・✨ひらめき本文・【食事】ブロック（無ければ None）。"""
+    __slots__ = ("date", "ideas", "meals")
+
+    def __init__(self, d: Optional[date], ideas: Optional[Section], meals: Optional[Section]):
+        self.date = d
+        self.ideas = ideas
+        self.meals = meals
+
+    def detach(self, origin: Optional[Origin]) -> None:
+        for sec in (self.ideas, self.meals):
+            if sec is not None:
+                sec.detach(origin)
+
+    def __reduce__(self):
+        return (IdeasMeals, (self.date, self.ideas, self.meals))
+
+def normalize_newlines(data: bytes) -> bytes:
+    """
+    テキストモード読み込みと同じく \\r\\n / \\r を \\n にそろえ、LINE_SEPARATORS の直後には \\n を足す
+    （従来の read_text().splitlines() と同じ行に分かれる。どちらも無ければコピーしない）。
+    """
+    if data.find(b"\r") >= 0:  # mmap の `in` は1バイトずつ比較するので find で探す
+        data = bytes(data).replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+    if any(data.find(sep) >= 0 for sep in LINE_SEPARATORS):
+        data = RE_LINE_SEPARATOR.sub(b"\\g<0>\n", bytes(data))
+    return data
+
+def line_end(buf: bytes, pos: int, n: int) -> int:
+    """pos から始まる行の終わり（改行の次の位置）。"""
+    nl = buf.find(b"\n", pos, n)
+    return n if nl < 0 else nl + 1
+
+def decode_line(buf: bytes, s: int, e: int) -> str:
+    return bytes(buf[s:e]).decode("utf-8", errors="ignore")
+
+def is_utf8(b: Union[bytes, memoryview]) -> bool:
+    """正しい UTF-8 か（mmap の大きいファイルも全体を str にしないよう CHECK_BLOCK ごとにデコードする）。"""
+    try:
+        if len(b) <= CHECK_BLOCK:
+            codecs.utf_8_decode(b, "strict", True)
+            return True
+        dec = codecs.getincrementaldecoder("utf-8")()
+        with memoryview(b) as mv:
+            for i in range(0, len(mv), CHECK_BLOCK):
+                dec.decode(mv[i:i + CHECK_BLOCK])
+        dec.decode(b"", True)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+def clean_utf8(b: bytes) -> bytes:
+    """UTF-8 として不正なバイトを除く（`decode("utf-8", errors="ignore")` と同じ。正しければコピーしない）。"""
+    return b if is_utf8(b) else b.decode("utf-8", errors="ignore").encode("utf-8")
+
+def norm(s: str) -> str:
+    """NBSPを通常のスペースに置換。"""
+    return s.replace(NBSP, " ")
+
+def parse_date(line: str) -> Optional[date]:
+    """`# 2024年1月6日` / `日付: 2024年1月6日` の行から日付を取る（それ以外は None）。"""
+    s = norm(line).strip()
+    m = RE_H1_DATE.match(s) or RE_LINE_DATE.match(s)
+    if not m:
+        return None
+    y, mo, d = map(int, m.groups())
+    return date(y, mo, d)
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+"""
+日記ページ（\\n 正規化済みのバイト列。bytes か mmap）の行トークナイザ。
+make_notion_report / extract_notion_diary_multi の共通処理。
+
+各行を次のどれかに分類する:
+- H1   : 「# 」で始まる行（セクションの終わり）
+- H2   : 「## 」で始まる行。対象見出しなら sid にその id、対象外なら None
+- DATE : 「日付: YYYY年M月D日」行（date_ids のセクション内だけ。ほかでは本文扱い）
+- BODY : それ以外（連続する本文行は1つの範囲にまとめる）
+
+本文行は1行ずつ見ない:
+- 見出しの候補は bytes.find(b"\\n#") で次の「#」始まりの行へ飛ぶ
+- 「日付:」行は、それを除く必要があるセクションの中だけ bytes.find("日付") で探す
+なので走査の手間は行数ではなく見出し（と「日付」）の数に比例する。
+デコードと正規化（NBSP→空白・空白の連続を1つに）は見出し行と「日付」で始まる行だけ、1回だけ。
+対象見出しの判定は、呼び出し側が渡した (id, パターン) をまとめた1つの正規表現で行う。
+"""
+
+import re
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from . import instrument
+from .md_spans import DATE_WORD, NBSP, RE_LINE_DATE, Span, decode_line, line_end
+
+H1, H2, DATE, BODY = range(4)
+
+# (種別, 対象見出しの id, 行の開始, 行の終わり（改行の次）)
+Token = Tuple[int, Optional[str], int, int]
+
+# 「## 」「# 」（NBSP 区切りも見出し扱い＝従来の norm() 後の判定と同じ）
+H2_PREFIXES = (b"## ", b"##\xc2\xa0")
+H1_PREFIXES = (b"# ", b"#\xc2\xa0")
+HEADING_MARK = b"\n#"
+
+# 「日付」の前に置ける空白（str の \s に当たる改行以外の文字の UTF-8。RE_LINE_DATE の行頭 \s*）
+RE_DATE_LEAD = re.compile(rb"(?:[\t\x0b\x0c\x1c-\x1f ]|\xc2[\x85\xa0]|\xe1\x9a\x80"
+                          rb"|\xe2\x80[\x80-\x8a\xa8\xa9\xaf]|\xe2\x81\x9f|\xe3\x80\x80)*")
+# 上の空白の最終バイト。「日付」の直前がこれ以外なら行の途中なので行頭まで戻らない
+_DATE_LEAD_LAST = frozenset(b"\n\t\x0b\x0c\x1c\x1d\x1e\x1f \x85\xa0\x9f\xa8\xa9\xaf" + bytes(range(0x80, 0x8b)))
+RE_SPACES = re.compile(r"\s+")
+
+def normalize_heading(line: str) -> str:
+    """見出し行の正規化（NBSP→空白・空白の連続を1つに・前後の空白を除く）。"""
+    return RE_SPACES.sub(" ", line.replace(NBSP, " ")).strip()
+
+def heading_starts(buf: bytes, start: int, n: int) -> Iterator[int]:
+    """[start, n) で「#」から始まる行の先頭位置（本文行は find で飛ばす）。"""
+    if start < n and buf[start] == HEADING_MARK[1]:
+        yield start
+    p = buf.find(HEADING_MARK, start, n)
+    while p >= 0:
+        yield p + 1
+        p = buf.find(HEADING_MARK, p + 1, n)
+
+class Tokenizer:
+    """
+    targets: (id, 見出しテキストに対する正規表現) の並び。先に書いたものが優先。
+    パターンは normalize_heading 済みの見出し行（先頭の「## 」込み）に search で当てる。
+    date_ids: 「日付:」行を DATE として切り出すセクションの id（省略時は targets すべて）。
+    """
+
+    def __init__(self, targets: Sequence[Tuple[str, str]], date_ids: Optional[Sequence[str]] = None):
+        self.ids = [sid for sid, _ in targets]
+        self.date_ids = frozenset(self.ids if date_ids is None else date_ids)
+        self._targets = re.compile("|".join(f"(?P<t{i}>{pat})" for i, (_, pat) in enumerate(targets)))
+
+    def heading_id(self, line: str) -> Optional[str]:
+        """H2 行が対象見出しならその id。"""
+        m = self._targets.search(normalize_heading(line))
+        return self.ids[m.lastindex - 1] if m else None
+
+    def tokens(self, buf: bytes, start: int = 0, end: Optional[int] = None) -> Iterator[Token]:
+        """
+        [start, end) を順にトークンにして返す。見出し・「日付:」行は1行ずつ、
+        その間の本文行はまとめて1つの BODY（複数行の範囲）になる。
+        """
+        n = len(buf) if end is None else end
+        body = start  # まだ返していない本文の開始位置
+        sid: Optional[str] = None
+        headings = 0
+        for s in heading_starts(buf, start, n):
+            head = buf[s:s + 4]  # bytes でも mmap でも同じように切り出せる
+            if head.startswith(H2_PREFIXES):
+                kind = H2
+            elif head.startswith(H1_PREFIXES):
+                kind = H1
+            else:
+                continue  # 「#タグ」「### 小見出し」などは本文
+            if sid in self.date_ids:
+                body = yield from self._dated_body(buf, body, s)
+            if body < s:
+                yield BODY, None, body, s
+            e = line_end(buf, s, n)
+            sid = self.heading_id(decode_line(buf, s, e)) if kind == H2 else None
+            headings += 1
+            yield kind, sid, s, e
+            body = e
+        if sid in self.date_ids:
+            body = yield from self._dated_body(buf, body, n)
+        if body < n:
+            yield BODY, None, body, n
+        instrument.count("headings_classified", headings)
+
+    def _dated_body(self, buf: bytes, body: int, stop: int) -> Iterator[Token]:
+        """本文 [body, stop) の「日付:」行を DATE で返す（戻り値はまだ返していない本文の開始位置）。"""
+        q = buf.find(DATE_WORD, body, stop)
+        while q >= 0:
+            if q > body and buf[q - 1] not in _DATE_LEAD_LAST:
+                q = buf.find(DATE_WORD, q + 1, stop)
+                continue
+            s = buf.rfind(b"\n", body, q) + 1 or body
+            e = line_end(buf, q, stop)
+            if (RE_DATE_LEAD.fullmatch(buf, s, q)
+                    and RE_LINE_DATE.match(decode_line(buf, s, e).replace(NBSP, " "))):
+                if body < s:
+                    yield BODY, None, body, s
+                yield DATE, None, s, e
+                body = e
+            q = buf.find(DATE_WORD, e, stop)
+        return body
+
+def add_span(spans: List[Span], s: int, e: int) -> None:
+    """範囲を追加（直前の範囲と連続していればつなげる）。"""
+    if spans and spans[-1][1] == s:
+        spans[-1] = (spans[-1][0], e)
+    else:
+        spans.append((s, e))
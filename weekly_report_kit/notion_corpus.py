@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+"""
+Notionエクスポート(.md群)の読み込みと解析の共通処理。
+
+- 1ファイル1回だけ読み、指定された解析関数(kind → parser)すべてに同じバイト列
+  （改行を \n に正規化したもの）を渡す。解析結果は md_spans のレコード。
+  解析後は detach() でファイル全体のバイト列を手放す（ディスク上のファイルを
+  そのまま読めた場合は範囲だけを持ち、本文は書き出し時に元ファイルからコピー）
+- MMAP_MIN_BYTES 以上のファイルは mmap で読む（巨大な貼り付けログのページでも
+  ファイル全体を bytes にコピーしない。見出しの検索は find で飛ぶので本文は触らない）
+- ParseCache を渡すと、未変更ファイルは読み込み・解析ともにスキップする
+- jobs > 1 のときは、キャッシュに無いファイルをチャンクに分けて
+  ProcessPoolExecutor で並列に読み込み・解析する（結果は files の順で返す）
+- instrument が有効なら read / parse / cache の時間と bytes_read / lines_scanned を数える
+  （ワーカーの分はチャンクの結果と一緒に返して合流する）。トレース中はファイルごとの
+  read / parse / cache の区間と cache_hit / cache_miss も出す
+"""
+
+import mmap
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from . import instrument
+from .md_spans import Origin, is_utf8, normalize_newlines
+from .notion_sources import Source, close_archives, source_key
+from .parse_cache import ParseCache, file_digest
+
+Parser = Callable[[bytes], Any]
+
+# これより少ない件数ならプロセス起動のほうが高くつくので直列で処理
+PARALLEL_MIN_FILES = 32
+MAX_CHUNK_FILES = 64
+# これ以上のファイルは読み込まずに mmap する
+MMAP_MIN_BYTES = 1 << 20
+
+Data = Union[bytes, mmap.mmap]
+
+def read_source(fp: Source) -> Data:
+    """中身を返す（MMAP_MIN_BYTES 以上のファイルは読み取り専用の mmap）。"""
+    if isinstance(fp, Path):
+        with open(fp, "rb") as f:
+            if os.fstat(f.fileno()).st_size >= MMAP_MIN_BYTES:
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return f.read()
+    return fp.read_bytes()
+
+def release(data: Optional[Data]) -> None:
+    """mmap なら閉じる（解析結果は detach 済みで参照していない）。"""
+    if isinstance(data, mmap.mmap):
+        try:
+            data.close()
+        except BufferError:
+            pass  # まだ参照が残っていれば GC に任せる
+
+def parse_file(fp: Source, parsers: Dict[str, Parser], data: Optional[Data] = None) -> Tuple[bytes, Dict[str, Any]]:
+    """1ファイルを読み、(中身のdigest, {kind: 解析結果}) を返す。"""
+    if data is None:
+        with instrument.phase("read", fp):
+            data = read_source(fp)
+    try:
+        if instrument.active() is not None:
+            instrument.count("bytes_read", len(data))
+            instrument.count("lines_scanned", instrument.count_lines(data))
+        with instrument.phase("parse", fp):
+            buf = normalize_newlines(data)
+            digest = file_digest(data)
+            results = {k: parse(buf) for k, parse in parsers.items()}
+            # \r の正規化が無ければ範囲＝ファイルのオフセット（zip のメンバーと不正な UTF-8 を含むものは除く）
+            origin = None
+            if buf is data and isinstance(fp, Path) and is_utf8(buf):
+                origin = Origin(os.path.abspath(fp), len(data), digest)
+            for r in results.values():
+                if hasattr(r, "detach"):
+                    r.detach(origin)
+            del buf
+        return digest, results
+    finally:
+        release(data)
+
+def _parse_chunk(items: List[Tuple[Source, List[str]]], parsers: Dict[str, Parser],
+                 flags: Optional[Tuple[bool, bool]] = None
+                 ) -> Tuple[List[Tuple[bytes, Dict[str, Any]]], Optional[Dict[str, Any]]]:
+    """ワーカープロセス側: チャンク内の各ファイルを、必要な kind だけ解析する（flags なら計測結果も返す）。"""
+    instrument.enable_worker(flags)
+    try:
+        results = [parse_file(fp, {k: parsers[k] for k in kinds}) for fp, kinds in items]
+        return results, instrument.snapshot()
+    finally:
+        instrument.disable()
+
+def load_pages(files: List[Source], parsers: Dict[str, Parser], cache: Optional[ParseCache] = None,
+               jobs: int = 1) -> Iterator[Tuple[Source, Dict[str, Any]]]:
+    """files の順に (パス, {kind: 解析結果}) を返す。"""
+    kinds = list(parsers)
+
+    # 1) キャッシュ確認（メインプロセス）。足りない kind があるものだけ解析待ちにする
+    slots: List[Dict[str, Any]] = []
+    pending: List[Tuple[int, List[str], Optional[Data]]] = []
+    stats: List[Optional[os.stat_result]] = []
+    for i, fp in enumerate(files):
+        results: Dict[str, Any] = {}
+        data: Optional[bytes] = None
+        st = None
+        if cache is not None:
+            with instrument.phase("cache", fp):
+                st = fp.stat()
+                results, data = cache.lookup(source_key(fp), st, kinds, lambda: read_source(fp))
+        slots.append(results)
+        stats.append(st)
+        missing = [k for k in kinds if k not in results]
+        if cache is not None:
+            instrument.mark("cache_miss" if missing else "cache_hit", fp)
+        if missing:
+            pending.append((i, missing, data))
+        else:
+            release(data)
+
+    def finish(i: int, digest: bytes, fresh: Dict[str, Any]) -> None:
+        if cache is not None:
+            with instrument.phase("cache", files[i]):
+                cache.store(source_key(files[i]), stats[i], digest, fresh)
+        slots[i].update(fresh)
+
+    # 2) 少なければ直列（files の順にそのまま返す）
+    if jobs <= 1 or len(pending) < PARALLEL_MIN_FILES:
+        todo = {i: (missing, data) for i, missing, data in pending}
+        for i, fp in enumerate(files):
+            if i in todo:
+                missing, data = todo[i]
+                finish(i, *parse_file(fp, {k: parsers[k] for k in missing}, data))
+            yield fp, slots[i]
+        return
+
+    # 3) 並列: チャンク単位でワーカーへ。返す順序は files の順（直列版と同一）
+    #    ワーカーは自分で読み直すので、キャッシュ確認で読んだ中身は手放す
+    for _, _, data in pending:
+        release(data)
+    size = max(1, min(MAX_CHUNK_FILES, len(pending) // (jobs * 4)))
+    chunks = [pending[n:n + size] for n in range(0, len(pending), size)]
+    flags = instrument.worker_flags()
+    # fork で親が開いた zip を引き継ぐとファイル位置を共有して読み違えるので、ワーカーでは開き直させる
+    with ProcessPoolExecutor(max_workers=jobs, initializer=close_archives) as ex:
+        futures: Dict[int, Tuple[Future, int]] = {}
+        for chunk in chunks:
+            fut = ex.submit(_parse_chunk, [(files[i], missing) for i, missing, _ in chunk], parsers, flags)
+            for pos, (i, _, _) in enumerate(chunk):
+                futures[i] = (fut, pos)
+        for i, fp in enumerate(files):
+            if i in futures:
+                fut, pos = futures.pop(i)
+                results, snap = fut.result()
+                if pos == 0:
+                    instrument.merge(snap)  # チャンクの計測はチャンクの先頭のファイルで1回だけ
+                finish(i, *results[pos])
+            yield fp, slots[i]
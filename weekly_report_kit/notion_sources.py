@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+
+"""
+--src で指定された Notion エクスポートから .md を列挙する。
+
+- .md ファイル 1つ
+- 解凍済みフォルダ（再帰的に *.md）
+    - os.scandir の DirEntry の種別情報だけで判定し、ファイルごとの stat はしない
+    - DirIndex（ディレクトリ mtime → 中身の一覧）があれば、前回から変わっていない
+      ディレクトリは読み直さない。.md もサブフォルダも無い添付フォルダ（画像だけ等）は
+      mtime の確認1回で丸ごとスキップする
+- エクスポートの .zip そのもの（解凍しない）
+    - 大きいワークスペースで Notion が作る「zip の中の Export-*.zip」にも対応
+    - 画像・添付は central directory の名前だけで除外（中身は読まない）
+    - 入れ子 zip が無圧縮(STORED)なら外側ファイルの該当範囲を直接読む。
+      圧縮されている場合だけメモリ上に展開する（ディスクには書かない）
+
+列挙結果は Path か ZipMember のリスト。どちらも stat() / read_bytes() を持つ。
+"""
+
+import io
+import os
+import pickle
+import struct
+import time
+import zipfile
+from datetime import datetime
+from pathlib import Path, PurePosixPath
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+from ._util import RACY_WINDOW_NS
+
+# 中身を見る必要がないフォルダ（macOS の zip 展開で付くリソースフォーク等）
+PRUNE_DIRS = {"__MACOSX", ".git"}
+DIR_INDEX_VERSION = 1
+DIR_INDEX_FILE = "dir-index.pickle"
+
+# ローカルファイルヘッダ: 固定30バイト + ファイル名長(26) + extra長(28)
+LOCAL_HEADER_SIZE = 30
+
+class MemberStat(NamedTuple):
+    """ParseCache が参照する stat 相当（サイズと更新時刻）。"""
+    st_size: int
+    st_mtime_ns: int
+
+class ZipMember:
+    """zip（入れ子 zip 含む）の中の .md 1つ。chain は外側からのメンバー名の並び。"""
+    __slots__ = ("archive", "chain", "size", "mtime_ns", "crc")
+
+    def __init__(self, archive: Path, chain: Tuple[str, ...], info: zipfile.ZipInfo):
+        self.archive = archive
+        self.chain = chain
+        self.size = info.file_size
+        try:
+            self.mtime_ns = int(datetime(*info.date_time).timestamp()) * 1_000_000_000
+        except (ValueError, OverflowError):
+            self.mtime_ns = 0  # 日時が壊れているメンバー（CRC で判別する）
+        self.crc = info.CRC
+
+    @property
+    def name(self) -> str:
+        return PurePosixPath(self.chain[-1]).name
+
+    @property
+    def cache_key(self) -> str:
+        # CRC をキーに含める（同サイズ・同時刻の書き換えも別物として扱う）
+        return f"{os.path.abspath(self.archive)}!{'!'.join(self.chain)}#{self.crc:08x}"
+
+    def stat(self) -> MemberStat:
+        return MemberStat(self.size, self.mtime_ns)
+
+    def read_bytes(self) -> bytes:
+        zf, _ = _open_archive(self.archive, self.chain[:-1])
+        return zf.read(self.chain[-1])
+
+    def read_head(self, n: int) -> bytes:
+        """先頭 n バイトだけ（必要な分しか展開しない）。"""
+        zf, _ = _open_archive(self.archive, self.chain[:-1])
+        with zf.open(self.chain[-1]) as f:
+            return f.read(n)
+
+    def __repr__(self) -> str:
+        return f"ZipMember({str(self.archive)!r}, {self.chain!r})"
+
+Source = Union[Path, ZipMember]
+
+def source_key(src: Source) -> str:
+    """キャッシュ用の一意キー。"""
+    return src.cache_key if isinstance(src, ZipMember) else os.path.abspath(src)
+
+class _FileSlice(io.RawIOBase):
+    """ファイルの [offset, offset+length) だけを見せる読み取り専用ビュー。"""
+
+    def __init__(self, path: Path, offset: int, length: int):
+        self._f = open(path, "rb")
+        self._offset = offset
+        self._length = length
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, pos: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: self._length}[whence]
+        self._pos = max(0, base + pos)
+        return self._pos
+
+    def readinto(self, b) -> int:
+        n = max(0, min(len(b), self._length - self._pos))
+        if n == 0:
+            return 0
+        self._f.seek(self._offset + self._pos)
+        got = self._f.readinto(memoryview(b)[:n])
+        self._pos += got
+        return got
+
+    def close(self) -> None:
+        self._f.close()
+        super().close()
+
+# プロセス内で開いた zip を再利用（ワーカーごとに central directory を1回だけ読む）
+_ARCHIVES: Dict[Tuple[str, Tuple[str, ...]], Tuple[zipfile.ZipFile, Optional[int]]] = {}
+
+def _open_archive(archive: Path, inner: Tuple[str, ...]) -> Tuple[zipfile.ZipFile, Optional[int]]:
+    """
+    archive（とその中の inner で辿る入れ子 zip）を開く。
+    戻り値の2つ目は、その zip がディスク上のファイルのどこから始まるか
+    （途中に圧縮された層があれば None）。
+    """
+    k = (str(archive), inner)
+    if k in _ARCHIVES:
+        return _ARCHIVES[k]
+    if not inner:
+        opened = (zipfile.ZipFile(archive), 0)
+    else:
+        parent, base = _open_archive(archive, inner[:-1])
+        info = parent.getinfo(inner[-1])
+        if base is not None and info.compress_type == zipfile.ZIP_STORED:
+            parent.fp.seek(info.header_offset)
+            header = parent.fp.read(LOCAL_HEADER_SIZE)
+            name_len, extra_len = struct.unpack("<HH", header[26:30])
+            start = base + info.header_offset + LOCAL_HEADER_SIZE + name_len + extra_len
+            opened = (zipfile.ZipFile(_FileSlice(archive, start, info.file_size)), start)
+        else:
+            # 圧縮された入れ子 zip はランダムアクセスできないのでメモリ上に展開
+            opened = (zipfile.ZipFile(io.BytesIO(parent.read(info))), None)
+    _ARCHIVES[k] = opened
+    return opened
+
+def close_archives() -> None:
+    """開いている zip を閉じて忘れる（zip が置き換わったあとに読み直すとき）。"""
+    for zf, _ in _ARCHIVES.values():
+        zf.close()
+    _ARCHIVES.clear()
+
+def _sort_key(chain: Tuple[str, ...]) -> Tuple[Tuple[str, ...], ...]:
+    return tuple(PurePosixPath(name).parts for name in chain)
+
+def list_zip_members(archive: Path, inner: Tuple[str, ...] = ()) -> List[ZipMember]:
+    """zip 内の .md を central directory だけから列挙（入れ子 zip は再帰）。"""
+    zf, _ = _open_archive(archive, inner)
+    out: List[ZipMember] = []
+    for info in zf.infolist():
+        if info.is_dir():
+            continue
+        suffix = PurePosixPath(info.filename).suffix.lower()
+        if suffix == ".md":
+            out.append(ZipMember(archive, inner + (info.filename,), info))
+        elif suffix == ".zip":
+            out.extend(list_zip_members(archive, inner + (info.filename,)))
+    out.sort(key=lambda m: _sort_key(m.chain))
+    return out
+
+class DirIndex:
+    """ディレクトリごとの (mtime_ns, .md 名, サブフォルダ名) を保存しておく索引。"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.dirs: Dict[str, Tuple[int, Tuple[str, ...], Tuple[str, ...]]] = {}
+        self.seen: Dict[str, Tuple[int, Tuple[str, ...], Tuple[str, ...]]] = {}
+        self.roots: List[str] = []
+        self.scanned = 0
+        self.reused = 0
+        self.started_ns = time.time_ns()
+        try:
+            with open(path, "rb") as f:
+                obj = pickle.load(f)
+            if obj.get("version") == DIR_INDEX_VERSION:
+                self.dirs = obj["dirs"]
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, KeyError, TypeError, ValueError):
+            self.dirs = {}
+
+    @classmethod
+    def open(cls, cache_dir: Path) -> "DirIndex":
+        return cls(Path(cache_dir).expanduser() / DIR_INDEX_FILE)
+
+    def listing(self, d: str, mtime_ns: int) -> Optional[Tuple[Tuple[str, ...], Tuple[str, ...]]]:
+        e = self.dirs.get(d)
+        if e is None or e[0] != mtime_ns or mtime_ns >= self.started_ns - RACY_WINDOW_NS:
+            return None
+        self.seen[d] = e
+        self.reused += 1
+        return e[1], e[2]
+
+    def record(self, d: str, mtime_ns: int, md: Tuple[str, ...], subdirs: Tuple[str, ...]) -> None:
+        self.seen[d] = (mtime_ns, md, subdirs)
+        self.scanned += 1
+
+    def _walked(self, d: str) -> bool:
+        return any(d == r or d.startswith(os.path.join(r, "")) for r in self.roots)
+
+    def save(self) -> None:
+        """
+        今回たどった root の下は今回のディレクトリだけを書き戻す（消えたフォルダは自然に落ちる）。
+        別の root の分（同じ cache-dir を別の --src で使うコマンド）はそのまま残す。
+        """
+        dirs = {d: e for d, e in self.dirs.items() if not self._walked(d)}
+        dirs.update(self.seen)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump({"version": DIR_INDEX_VERSION, "dirs": dirs}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path)
+
+def _scan_dir(d: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """1フォルダ分の (.md 名, サブフォルダ名)。DirEntry の種別だけで判定（stat しない）。"""
+    md: List[str] = []
+    subdirs: List[str] = []
+    with os.scandir(d) as it:
+        for entry in it:
+            name = entry.name
+            if name.endswith(".md"):
+                if entry.is_file():
+                    md.append(name)
+            elif entry.is_dir(follow_symlinks=False) and name not in PRUNE_DIRS:
+                subdirs.append(name)
+    return tuple(md), tuple(subdirs)
+
+def scan_md_files(root: Path, index: Optional[DirIndex] = None) -> List[Path]:
+    """root 以下の .md を列挙（rglob("*.md") と同じ並び）。"""
+    found: List[Path] = []
+    stack = [os.fspath(root)]
+    if index is not None:
+        index.roots.append(stack[0])
+    while stack:
+        d = stack.pop()
+        try:
+            mtime_ns = os.stat(d).st_mtime_ns if index is not None else 0
+            cached = index.listing(d, mtime_ns) if index is not None else None
+            if cached is None:
+                md, subdirs = _scan_dir(d)
+                if index is not None:
+                    index.record(d, mtime_ns, md, subdirs)
+            else:
+                md, subdirs = cached
+        except OSError:
+            continue  # 走査中に消えた／読めないフォルダ
+        found.extend(Path(d, name) for name in md)
+        stack.extend(os.path.join(d, name) for name in subdirs)
+    return sorted(found)
+
+def walk_md_files(src: Path, index: Optional[DirIndex] = None) -> List[Source]:
+    if src.is_file() and src.suffix.lower() == ".md":
+        return [src]
+    if src.is_file() and src.suffix.lower() == ".zip":
+        return list_zip_members(src)
+    return scan_md_files(src, index)
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+
+"""
+.md ごとの解析結果をディスクに保存するインクリメンタルキャッシュ。
+
+検証ルール:
+- サイズが違う → 変更あり（再解析）
+- (size, mtime_ns) が一致し、保存時に「際どく」なかった → そのまま再利用
+- mtime が違う／保存直前に更新されていた（racy）→ blake2b で中身を比較し、
+  一致すれば再利用（解凍し直しで mtime だけ変わった場合など）
+
+容量制限:
+- 解析結果は種類(kind)ごとに pickle したバイト列で保持
+- 合計が max_bytes を超えたら、最後に使われた実行が古いものから捨てる（LRU）
+
+キャッシュファイルが壊れている／バージョン違いの場合は空から作り直す。
+"""
+
+import hashlib
+import os
+import pickle
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ._util import RACY_WINDOW_NS
+
+# 解析結果の形式（やクラスのモジュールの場所）を変えたら上げる（古いキャッシュは読み捨て）
+CACHE_VERSION = 4
+CACHE_FILE = "parse-cache.pickle"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# entries[key] = [size, mtime_ns, digest, racy, used, {kind: blob}]
+SIZE, MTIME, DIGEST, RACY, USED, BLOBS = range(6)
+
+def file_digest(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+class ParseCache:
+    """パス → 解析結果(kind別) の永続キャッシュ。"""
+
+    def __init__(self, path: Path, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.run = 0
+        self.entries: Dict[str, list] = {}
+        self.hits = 0
+        self.misses = 0
+        self.dirty = False
+        self.started_ns = time.time_ns()
+        self._load()
+
+    @classmethod
+    def open(cls, cache_dir: Path, max_bytes: int = DEFAULT_MAX_BYTES) -> "ParseCache":
+        return cls(Path(cache_dir).expanduser() / CACHE_FILE, max_bytes)
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "rb") as f:
+                obj = pickle.load(f)
+            if obj.get("version") != CACHE_VERSION:
+                return
+            self.run = obj["run"] + 1
+            self.entries = obj["entries"]
+        except (OSError, EOFError, ImportError, pickle.UnpicklingError, AttributeError, KeyError, TypeError,
+                ValueError):
+            self.entries = {}
+
+    def lookup(self, key: str, st: os.stat_result, kinds: List[str],
+               read: Callable[[], Any]) -> Tuple[Dict[str, Any], Optional[Any]]:
+        """
+        キャッシュ済みの解析結果を返す: (kind→結果, 検証のために読んだ中身 or None)
+        検証に失敗した場合は空dictを返し、エントリを破棄する。
+        """
+        e = self.entries.get(key)
+        data = None  # read() の戻り値（bytes か mmap）
+        if e is None or e[SIZE] != st.st_size:
+            return self._miss(key)
+        if e[MTIME] != st.st_mtime_ns or e[RACY]:
+            # (size, mtime) だけでは判断できない → 中身のハッシュで確認
+            data = read()
+            if file_digest(data) != e[DIGEST]:
+                self._miss(key)
+                return {}, data
+            e[MTIME] = st.st_mtime_ns
+            e[RACY] = self._is_racy(st)
+            self.dirty = True
+        if e[USED] != self.run:
+            e[USED] = self.run
+            self.dirty = True
+        results = {k: pickle.loads(e[BLOBS][k]) for k in kinds if k in e[BLOBS]}
+        if len(results) == len(kinds):
+            self.hits += 1
+        else:
+            self.misses += 1
+        return results, data
+
+    def _miss(self, key: str) -> Tuple[Dict[str, Any], None]:
+        if self.entries.pop(key, None) is not None:
+            self.dirty = True
+        self.misses += 1
+        return {}, None
+
+    def _is_racy(self, st: os.stat_result) -> bool:
+        return st.st_mtime_ns >= self.started_ns - RACY_WINDOW_NS
+
+    def store(self, key: str, st: os.stat_result, digest: bytes, results: Dict[str, Any]) -> None:
+        """解析結果を保存（同じ中身(digest)の既存エントリには kind を追記）。"""
+        e = self.entries.get(key)
+        if e is None or e[DIGEST] != digest:
+            e = [st.st_size, st.st_mtime_ns, digest, False, self.run, {}]
+            self.entries[key] = e
+        e[SIZE], e[MTIME], e[USED] = st.st_size, st.st_mtime_ns, self.run
+        e[RACY] = self._is_racy(st)
+        for kind, value in results.items():
+            e[BLOBS][kind] = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self.dirty = True
+
+    def _evict(self) -> None:
+        total = sum(len(b) for e in self.entries.values() for b in e[BLOBS].values())
+        if total <= self.max_bytes:
+            return
+        for key in sorted(self.entries, key=lambda k: self.entries[k][USED]):
+            total -= sum(len(b) for b in self.entries.pop(key)[BLOBS].values())
+            if total <= self.max_bytes:
+                break
+
+    def save(self) -> None:
+        """変更があればアトミックに書き戻す。"""
+        if not self.dirty:
+            return
+        self._evict()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump({"version": CACHE_VERSION, "run": self.run, "entries": self.entries},
+                        f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path)
+        self.dirty = False
+
+    def summary(self) -> str:
+        return f"[cache] reused: {self.hits}  parsed: {self.misses}  ({self.path})"
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+
+"""
+レポート(.md)のストリーミング書き出し。
+
+行を受け取ったそばから書き、全行をメモリに溜めない。
+本文は元ファイルのバイト範囲を block() / body() でそのまま書く:
+- 範囲だけを持つ Section（md_spans.Origin 付き）は、元ファイルから出力へ
+  カーネル内でコピーする（os.copy_file_range → os.sendfile → pread/write の順に
+  使えるものを使う）。Python を通るのは見出しなど生成した行と区切りの改行だけ
+- バイト列を持つ Section は memoryview のまま書く
+
+出力は従来の `"\\n".join(lines).rstrip() + "\\n"` と同一:
+書き終えた時点で末尾の空白（str.rstrip() と同じ判定）だけ切り詰めて "\\n" を付ける。
+
+書き込み先は同じディレクトリの一時ファイルで、close 時に os.replace で
+アトミックに差し替える（途中で失敗しても既存レポートは壊れない）。
+instrument が有効なら sections_emitted（body の回数）と bytes_written / reports_written を数える。
+トレース中は開いてから置き換えるまでを write の区間として出す。
+"""
+
+import errno
+import os
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO, Iterable, List, Optional, Tuple, Union
+
+from . import instrument
+
+# Toggl のレポートは行しか書かないので、範囲の参照先（md_spans）は body() で使うときに import する
+if TYPE_CHECKING:
+    from .md_spans import Origin, Section
+
+WRITE_BUFFER = 1 << 20
+TAIL_WINDOW = 4096
+
+# カーネル内コピーが使えないとき（別ファイルシステム・未対応OS等）の errno。
+# 一度失敗した方式はこのプロセスでは以後使わない（--all-weeks は週ごとにスレッドで書くので、
+# 外すのは失敗した方式だけ・ロックの中で）
+_UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSOCK, errno.EBADF}
+_KERNEL_COPY: List[str] = [m for m in ("copy_file_range", "sendfile") if hasattr(os, m)]
+_KERNEL_COPY_LOCK = threading.Lock()
+
+def _kernel_copy(method: str, src: int, dst: int, offset: int, count: int) -> int:
+    if method == "copy_file_range":
+        return os.copy_file_range(src, dst, count, offset)
+    return os.sendfile(dst, src, offset, count)
+
+def _disable_kernel_copy(method: str) -> None:
+    with _KERNEL_COPY_LOCK:
+        if method in _KERNEL_COPY:
+            _KERNEL_COPY.remove(method)
+
+class ReportWriter:
+    """`with ReportWriter(path) as w: w.line(...); w.body(sec)` で使う。"""
+
+    def __init__(self, out_path: Path):
+        self.out_path = out_path
+        self.tmp_path = out_path.with_name(f".{out_path.name}.{os.getpid()}.tmp")
+        self._f = None
+        self._buf = bytearray()
+        self._first = True
+        self._src: Optional[Tuple["Origin", BinaryIO]] = None
+        self._span = instrument.span("write", out_path)
+
+    def __enter__(self) -> "ReportWriter":
+        self._span.__enter__()
+        self.out_path.parent.mkdir(parents=True, exist_ok=True)
+        # カーネル側のコピーと混ぜるので、バッファは自前で持ち fd へ直接書く
+        self._f = open(self.tmp_path, "wb+", buffering=0)
+        return self
+
+    def _write(self, b: Union[bytes, memoryview]) -> None:
+        self._buf += b
+        if len(self._buf) >= WRITE_BUFFER:
+            self._flush()
+
+    def _flush(self) -> None:
+        view = memoryview(self._buf)
+        while view:
+            view = view[self._f.write(view):]
+        view.release()
+        self._buf.clear()
+
+    def _separate(self) -> None:
+        if not self._first:
+            self._write(b"\n")
+        self._first = False
+
+    def line(self, s: str) -> None:
+        """1行追加（行間の改行は join と同じく次の行の前に入れる）。"""
+        self._separate()
+        self._write(s.encode("utf-8"))
+
+    def lines(self, rows: Iterable[str]) -> None:
+        for s in rows:
+            self.line(s)
+
+    def block(self, chunks: Iterable[Union[memoryview, bytes]]) -> None:
+        """
+        改行込みの行の並び（元ファイルの範囲）を、各行を line() したのと同じ形で書く。
+        最後の行の改行だけは次の行の区切りになるので落とす。
+        """
+        last = None
+        for c in chunks:
+            if not len(c):
+                continue
+            if last is None:
+                self._separate()
+            else:
+                self._write(last)
+            last = c
+        if last is not None:
+            self._write(last[:-1] if last[-1:] == b"\n" else last)
+
+    def body(self, sec: "Section") -> None:
+        """Section の本文を block(sec.chunks()) と同じ形で書く（範囲だけなら元ファイルから直接コピー）。"""
+        instrument.count("sections_emitted")
+        spans = [(s, e) for s, e in sec.spans if s < e]
+        if sec.buf is not None or not spans:
+            self.block(sec.chunks())
+            return
+        fd = self._source(sec.origin)
+        s, e = spans[-1]
+        if os.pread(fd, 1, e - 1) == b"\n":
+            spans[-1] = (s, e - 1)
+        self._separate()
+        self._flush()
+        for s, e in spans:
+            self._copy(fd, s, e - s)
+
+    def _source(self, origin: "Origin") -> int:
+        """参照先を開く（同じファイルの Section が続くので直前の1つだけ開いておく）。"""
+        if self._src is None or self._src[0] != origin:
+            from .md_spans import open_origin
+            self._close_source()
+            self._src = (origin, open_origin(origin))
+        return self._src[1].fileno()
+
+    def _close_source(self) -> None:
+        if self._src is not None:
+            self._src[1].close()
+            self._src = None
+
+    def _copy(self, src: int, offset: int, count: int) -> None:
+        dst = self._f.fileno()
+        kernel = True
+        while count > 0:
+            n = None
+            while kernel and n is None:
+                methods = _KERNEL_COPY[:1]  # 他のスレッドが外しても、試す方式はこの1つに固定
+                if not methods:
+                    break
+                try:
+                    n = _kernel_copy(methods[0], src, dst, offset, count)
+                except OSError as e:
+                    if e.errno not in _UNSUPPORTED:
+                        raise
+                    _disable_kernel_copy(methods[0])
+            if n == 0:
+                # 別ファイルシステム間などで、エラーにせず 0 を返すカーネルがある。
+                # 元ファイルの変更とは限らないので、この範囲の残りは pread/write で確かめる
+                kernel = False
+                n = None
+            if n is None:
+                data = os.pread(src, min(count, WRITE_BUFFER), offset)
+                if not data:
+                    raise RuntimeError(f"{self._src[0].path} が実行中に変更されました。もう一度実行してください")
+                self._buf += data
+                self._flush()
+                n = len(data)
+            offset += n
+            count -= n
+
+    def _content_end(self) -> int:
+        """書いた内容を rstrip() した場合の終端位置（末尾だけ読み戻して判定）。"""
+        f = self._f
+        size = f.seek(0, os.SEEK_END)
+        window = TAIL_WINDOW
+        while True:
+            start = max(0, size - window)
+            text = os.pread(f.fileno(), size - start, start).decode("utf-8", errors="ignore")
+            stripped = text.rstrip()
+            if stripped or start == 0:
+                return size - len(text[len(stripped):].encode("utf-8"))
+            window *= 4
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        try:
+            self._close_source()
+            if exc_type is None:
+                self._flush()
+                end = self._content_end()
+                self._f.truncate(end)
+                self._f.seek(end)
+                self._f.write(b"\n")  # rstrip() + "\n" と同じ終端
+                instrument.count("bytes_written", end + 1)
+                instrument.count("reports_written")
+            self._f.close()
+            if exc_type is None:
+                os.replace(self.tmp_path, self.out_path)
+        finally:
+            if self.tmp_path.exists():
+                self.tmp_path.unlink()
+            self._span.__exit__(exc_type, exc, tb)
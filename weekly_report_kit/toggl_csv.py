@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+
+"""
+Toggl Track の Detailed CSV（エクスポート）を1行ずつ読んで集計する。
+
+- csv.reader で1行ずつ読み、集計結果（日・週ごとの時間）だけを持つ。
+  行数が何百万あってもメモリは集計のキーの数（日数・プロジェクト数・タグ数）で決まる
+- 列は見出し名で引く（列の並び・Amount 列の有無などエクスポート設定の違いに寛容）
+- 日付は「Start date」（Toggl はプロフィールのタイムゾーンで書き出す。Asia/Tokyo の前提）。
+  日をまたぐエントリは開始日に数える（Toggl のレポートと同じ）
+- 時間は「Duration」（H:MM:SS。24時間を超える値も可）
+- タグが複数のエントリは、それぞれのタグに全時間を数える（タグ別の合計は全体を超えうる）
+- 時間が空（計測中のまま書き出されたもの）や日付が壊れた行は数えずに skipped に数える
+
+大きい CSV（チームのエクスポートなど数GB）は load_stats(jobs > 1) で並列に集計する:
+1) ヘッダ行の後ろを同じ大きさの範囲に仮に区切り、各範囲の「"」の数をワーカーで数える
+2) 区切り位置より前の「"」の数の偶奇で、そこが引用符の中かどうかが分かる
+   （RFC 4180 の CSV では「""」のエスケープも含めて「"」は必ず対で現れる）。
+   区切り位置から、引用符の外にある最初の改行の次へずらす → 必ずレコードの先頭になる
+3) 各範囲をワーカーが csv.reader で1行ずつ読み（範囲外は読まない）、部分的な結果を返す
+   （map_ranges。集計なら TogglStats、列ストアなら toggl_store.TogglStore）
+4) TogglStats は Counter の和なので、どの順に合流しても直列で読んだ結果と同じ
+"""
+
+import csv
+import io
+from collections import Counter
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import date
+from functools import lru_cache, partial
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Type
+
+from .weeks import DateRange, in_range, week_start
+
+NO_PROJECT = "(プロジェクトなし)"
+NO_CLIENT = "(クライアントなし)"
+NO_TAG = "(タグなし)"
+NO_DESCRIPTION = "(説明なし)"  # toggl_db summary の説明の上位
+
+# これより小さいファイルは分割しない（1ファイルを丸ごと1つのワーカーで読む）
+PARALLEL_MIN_BYTES = 16 << 20
+# 範囲の大きさ（ワーカー数 x 4 個くらいに分ける。範囲は1行ずつ読むので大きくてもメモリは増えない）
+MIN_RANGE_BYTES = 4 << 20
+MAX_RANGE_BYTES = 64 << 20
+BLOCK = 1 << 20
+QUOTE = b'"'
+NEWLINE = b"\n"
+
+# 列の位置。フィールド名の「_」を空白にしたものが見出し（小文字にして比較）
+class Columns(NamedTuple):
+    """集計（TogglStats）に使う列。"""
+    client: int
+    project: int
+    start_date: int
+    duration: int
+    tags: int
+
+class EntryColumns(NamedTuple):
+    """列ストア（toggl_store）に取り込む列。"""
+    user: int
+    client: int
+    project: int
+    description: int
+    start_date: int
+    start_time: int
+    end_date: int
+    end_time: int
+    duration: int
+    tags: int
+
+def find_columns(header: List[str], path: Path, fields: Type[NamedTuple] = Columns) -> Any:
+    names = [h.strip().lower() for h in header]
+    wanted = [f.replace("_", " ") for f in fields._fields]
+    missing = [c for c in wanted if c not in names]
+    if missing:
+        raise ValueError(f"{path}: Toggl Detailed CSV の列が見つかりません: {', '.join(missing)}")
+    return fields(*(names.index(c) for c in wanted))
+
+def parse_duration(s: str) -> int:
+    """「H:MM:SS」→ 秒。"""
+    h, m, sec = s.split(":")
+    return int(h) * 3600 + int(m) * 60 + int(sec)
+
+def fmt_hm(sec: int) -> str:
+    """秒を「時:分」に（分は四捨五入。レポート・toggl_db summary 共通）。"""
+    m = (sec + 30) // 60
+    return f"{m // 60}:{m % 60:02d}"
+
+@lru_cache(maxsize=8192)
+def _bucket(start_date: str) -> Tuple[date, date]:
+    """開始日の文字列 → (日, 週の土曜)。同じ日付の行が続くので文字列ごとに1回だけ解析する。"""
+    d = date.fromisoformat(start_date.strip())
+    return d, week_start(d)
+
+def parse_tags(s: str) -> List[str]:
+    """「a, b」→ ["a", "b"]。"""
+    return [t for t in (x.strip() for x in s.split(",")) if t]
+
+def split_tags(s: str) -> List[str]:
+    """集計用のタグ（タグなしは NO_TAG 1つ）。"""
+    return parse_tags(s) or [NO_TAG]
+
+class TogglStats:
+    """
+    集計結果（秒）。Counter の和で合流できる（ファイル・チャンクごとに集計して足してよい）。
+    - days    : 日 → 時間
+    - day_projects: (日, クライアント, プロジェクト) → 時間（日記と日付で突き合わせる用）
+    - projects: (週の土曜, クライアント, プロジェクト) → 時間
+    - clients : (週の土曜, クライアント) → 時間
+    - tags    : (週の土曜, タグ) → 時間
+    """
+
+    __slots__ = ("days", "day_projects", "projects", "clients", "tags", "entries", "skipped")
+
+    def __init__(self):
+        self.days: Counter = Counter()
+        self.day_projects: Counter = Counter()
+        self.projects: Counter = Counter()
+        self.clients: Counter = Counter()
+        self.tags: Counter = Counter()
+        self.entries = 0
+        self.skipped = 0
+
+    def add_rows(self, rows: Iterable[List[str]], col: Columns, rng: Optional[DateRange] = None) -> None:
+        days, day_projects, projects, clients, tags = self.days, self.day_projects, self.projects, self.clients, self.tags
+        for row in rows:
+            if not row:
+                continue  # 空行
+            try:
+                d, sat = _bucket(row[col.start_date])
+                sec = parse_duration(row[col.duration])
+            except (IndexError, ValueError):
+                self.skipped += 1
+                continue
+            if not in_range(d, rng):
+                continue
+            client = row[col.client] or NO_CLIENT
+            project = row[col.project] or NO_PROJECT
+            self.entries += 1
+            days[d] += sec
+            day_projects[d, client, project] += sec
+            projects[sat, client, project] += sec
+            clients[sat, client] += sec
+            for tag in split_tags(row[col.tags]):
+                tags[sat, tag] += sec
+
+    def merge(self, other: "TogglStats") -> "TogglStats":
+        self.days.update(other.days)
+        self.day_projects.update(other.day_projects)
+        self.projects.update(other.projects)
+        self.clients.update(other.clients)
+        self.tags.update(other.tags)
+        self.entries += other.entries
+        self.skipped += other.skipped
+        return self
+
+    def weeks(self) -> List[date]:
+        """記録のある週の土曜日（昇順）。"""
+        return sorted({week_start(d) for d in self.days})
+
+def read_header(path: Path, fields: Type[NamedTuple] = Columns) -> Tuple[Any, int]:
+    """(列の位置, ヘッダ行の終わり)。空ファイルなら (None, 0)。"""
+    with open(path, "rb") as f:
+        line = f.readline()
+    header = next(csv.reader([line.decode("utf-8-sig")]), None)
+    return (find_columns(header, path, fields) if header else None), len(line)
+
+class _RangeReader(io.RawIOBase):
+    """ファイルの [start, end) だけを読むストリーム（csv.reader に TextIOWrapper 越しに渡す）。"""
+
+    def __init__(self, path: Path, start: int, end: int):
+        self._f = open(path, "rb", buffering=0)
+        self._f.seek(start)
+        self._left = end - start
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        n = self._f.readinto(memoryview(b)[:min(len(b), self._left)]) if self._left > 0 else 0
+        self._left -= n
+        return n
+
+    def close(self) -> None:
+        self._f.close()
+        super().close()
+
+def open_range(path: Path, start: int, end: int) -> io.TextIOWrapper:
+    """[start, end)（レコードの先頭から始まる範囲）を csv.reader に渡せるテキストとして開く。"""
+    return io.TextIOWrapper(io.BufferedReader(_RangeReader(path, start, end), BLOCK), encoding="utf-8", newline="")
+
+def _stats_range(path: Path, start: int, end: int, col: Columns, rng: Optional[DateRange]) -> TogglStats:
+    """ワーカープロセス側: 範囲を集計する。"""
+    stats = TogglStats()
+    with open_range(path, start, end) as f:
+        stats.add_rows(csv.reader(f), col, rng)
+    return stats
+
+def _count_quotes(path: Path, start: int, end: int) -> int:
+    n = 0
+    with open(path, "rb", buffering=0) as f:
+        f.seek(start)
+        while start < end:
+            block = f.read(min(BLOCK, end - start))
+            if not block:
+                break
+            n += block.count(QUOTE)
+            start += len(block)
+    return n
+
+def _record_start(path: Path, pos: int, inside: bool) -> int:
+    """pos 以降で、引用符の外にある最初の改行の次（＝次のレコードの先頭）。無ければファイル末尾。"""
+    with open(path, "rb", buffering=0) as f:
+        f.seek(pos)
+        while True:
+            block = f.read(BLOCK)
+            if not block:
+                return pos
+            i = 0
+            nl = block.find(NEWLINE)
+            while nl >= 0:
+                inside ^= block.count(QUOTE, i, nl) & 1 == 1
+                if not inside:
+                    return pos + nl + 1
+                i = nl
+                nl = block.find(NEWLINE, nl + 1)
+            inside ^= block.count(QUOTE, i) & 1 == 1
+            pos += len(block)
+
+def split_ranges(ex: ProcessPoolExecutor, path: Path, start: int, size: int, jobs: int) -> List[Tuple[int, int]]:
+    """[start, size) をレコードの境界でおおよそ等分した範囲の並び。"""
+    step = max(MIN_RANGE_BYTES, min(MAX_RANGE_BYTES, (size - start) // (jobs * 4)))
+    cuts = list(range(start, size, step))
+    # 各仮区切りの前にある「"」の数の偶奇（範囲ごとにワーカーで数えて足す）
+    counts = ex.map(_count_quotes, [path] * len(cuts), cuts, cuts[1:] + [size])
+    bounds = [start]
+    quotes = 0
+    for cut, n in zip(cuts, counts):
+        if cut > start:
+            bounds.append(max(bounds[-1], _record_start(path, cut, quotes & 1 == 1)))
+        quotes += n
+    bounds.append(size)
+    return [(s, e) for s, e in zip(bounds, bounds[1:]) if s < e]
+
+# parse(path, start, end, 列の位置) → 部分的な結果（ワーカーへ送るので pickle できる関数）
+RangeParser = Callable[[Path, int, int, Any], Any]
+
+def map_ranges(files: List[Path], parse: RangeParser, fields: Type[NamedTuple] = Columns, jobs: int = 1) -> Iterator[Any]:
+    """
+    files の各 CSV（ヘッダ行の後ろ）を parse し、結果を files・範囲の順に返す。
+    jobs > 1 なら PARALLEL_MIN_BYTES 以上のファイルはレコードの境界で範囲に分け、プロセスで並列に。
+    """
+    heads = [(fp, *read_header(fp, fields), fp.stat().st_size) for fp in files]
+    heads = [(fp, col, start, size) for fp, col, start, size in heads if col is not None]  # 空ファイルは飛ばす
+    if jobs <= 1 or sum(size for *_, size in heads) < PARALLEL_MIN_BYTES:
+        for fp, col, start, size in heads:
+            yield parse(fp, start, size, col)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as ex:
+        parts: List[Future] = []
+        for fp, col, start, size in heads:
+            ranges = split_ranges(ex, fp, start, size, jobs) if size >= PARALLEL_MIN_BYTES else [(start, size)]
+            parts.extend(ex.submit(parse, fp, s, e, col) for s, e in ranges)
+        for fut in parts:
+            yield fut.result()
+
+def load_stats(files: List[Path], rng: Optional[DateRange] = None, jobs: int = 1) -> TogglStats:
+    """files をすべて集計する（jobs > 1 なら大きいファイルを範囲に分けてプロセスで並列に）。"""
+    stats = TogglStats()
+    for part in map_ranges(files, partial(_stats_range, rng=rng), Columns, jobs):
+        stats.merge(part)
+    return stats
+
+def find_csv_files(src: Path) -> List[Path]:
+    """--src（.csv 1つ or フォルダ）から CSV を列挙（名前順）。"""
+    if src.is_file():
+        return [src]
+    return sorted(p for p in src.rglob("*") if p.is_file() and p.suffix.lower() == ".csv")
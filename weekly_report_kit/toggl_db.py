@@ -0,0 +1,424 @@
+# -*- coding: utf-8 -*-
+
+"""
+Toggl のタイムエントリを少しずつ溜めていく永続ストア（列ストア toggl_store のセグメント＋重複索引）。
+
+  weekly-report-kit toggl-db ingest  --src data/toggl [--store .cache/toggl] [--jobs N]
+  weekly-report-kit toggl-db summary [--store .cache/toggl] [--top 10]
+
+ストアのフォルダ:
+- manifest.json : セグメントの一覧・取り込んだ CSV（パス・サイズ・mtime・digest）・索引の世代
+- seg-NNNNNN.store : 1回の取り込みで増えたエントリ（toggl_store の保存形式。mmap で開く）
+- keys.idx : 取り込み済みエントリのキー（toggl_store.entry_key）のハッシュ表（開番地法・線形探索）。
+  mmap して、引いたスロットのページだけ読み書きする
+
+ingest:
+- (サイズ, mtime) が前回と同じ CSV は開かない（取り込み直前に更新されていたものは次回 digest で確かめる）
+- 変わった CSV は blake2b で中身を確かめ、取り込み済みの中身（名前を変えただけ・別の場所のコピー）なら飛ばす
+- 前回の中身の後ろに行が足されただけなら、足された範囲だけを読む
+- 新しい CSV は toggl_csv.map_ranges で（大きければ範囲に分けて並列に）読む
+- 読んだ行は (user, start, end, description, project) のキーで索引を引き、初めてのものだけ
+  新しいセグメントに足す（期間の重なるエクスポートを何度置いても二重に数えない）
+- 書く順番は セグメント → 索引 → manifest（一時ファイル → os.replace）。途中で落ちたら、
+  manifest の世代と合わない索引はセグメントのキーから作り直し、manifest に無いセグメントは消す
+- セグメントが MAX_SEGMENTS を超えたら1つにまとめる
+- CSV を消してもエントリは残る（ストアのフォルダを消すと CSV から作り直し）
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from ._util import RACY_WINDOW_NS, default_jobs
+from .toggl_csv import (BLOCK, NEWLINE, NO_DESCRIPTION, NO_PROJECT, QUOTE, EntryColumns, TogglStats, find_csv_files,
+                        fmt_hm, map_ranges, read_header)
+from .toggl_store import TogglStore, histogram, parse_range, pivot, to_stats, top_n
+from .weeks import DateRange
+
+DEFAULT_STORE = Path(".cache") / "toggl"
+MANIFEST = "manifest.json"
+MANIFEST_VERSION = 1
+KEYS_FILE = "keys.idx"
+MAX_SEGMENTS = 16
+
+# --- 重複判定の索引 ---
+
+INDEX_MAGIC = b"WRKTGKI1"
+INDEX_HEADER = struct.Struct("<8sQQQ")  # MAGIC, スロット数, キー数, 世代（更新中は 0）
+MIN_CAPACITY = 1 << 12
+
+class KeyIndex:
+    """
+    0 以外の int64 キーの集合（ファイル上のハッシュ表）。
+    スロット数は 2 の冪で、キー数の2倍以上に保つ（超えそうなら reserve で作り直す）。
+    """
+
+    def __init__(self, path: Path, mm: mmap.mmap):
+        self.path = path
+        self._mm = mm
+        _, self.capacity, self.count, self.gen = INDEX_HEADER.unpack_from(mm, 0)
+        self._slots = memoryview(mm)[INDEX_HEADER.size:].cast("q")
+
+    @classmethod
+    def open(cls, path: Path, gen: int) -> Optional["KeyIndex"]:
+        """path を開く。無い・壊れている・世代が gen と違う（更新の途中で落ちた）なら None。"""
+        try:
+            with open(path, "r+b") as f:
+                mm = mmap.mmap(f.fileno(), 0)
+        except (OSError, ValueError):
+            return None
+        try:
+            magic, capacity, _, file_gen = INDEX_HEADER.unpack_from(mm, 0)
+        except struct.error:
+            magic = None
+        if (magic != INDEX_MAGIC or file_gen != gen or capacity & (capacity - 1)
+                or len(mm) != INDEX_HEADER.size + capacity * 8):
+            mm.close()
+            return None
+        return cls(path, mm)
+
+    @classmethod
+    def create(cls, path: Path, keys: int = 0, gen: int = 0) -> "KeyIndex":
+        """keys 個入る空の索引を path に作る（既存のものは置き換える）。"""
+        capacity = MIN_CAPACITY
+        while capacity < keys * 2:
+            capacity <<= 1
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, capacity, 0, gen))
+            f.truncate(INDEX_HEADER.size + capacity * 8)  # スロットは 0（空き）
+        os.replace(tmp, path)
+        index = cls.open(path, gen)
+        assert index is not None
+        return index
+
+    def __len__(self) -> int:
+        return self.count
+
+    def add(self, key: int) -> bool:
+        """key を加える。初めてのキーなら True。"""
+        slots, mask = self._slots, self.capacity - 1
+        i = key & mask
+        while True:
+            k = slots[i]
+            if k == key:
+                return False
+            if k == 0:
+                slots[i] = key
+                self.count += 1
+                return True
+            i = (i + 1) & mask
+
+    def keys(self) -> Iterator[int]:
+        return (k for k in self._slots if k)
+
+    def reserve(self, n: int) -> "KeyIndex":
+        """あと n 個加えても半分を超えないようにする（足りなければ大きい表に移した新しい索引を返す）。"""
+        if (self.count + n) * 2 <= self.capacity:
+            return self
+        bigger = KeyIndex.create(self.path.with_name(self.path.name + ".new"), self.count + n, self.gen)
+        for k in self.keys():
+            bigger.add(k)
+        self.close()
+        os.replace(bigger.path, self.path)
+        bigger.path = self.path
+        return bigger
+
+    def begin(self) -> None:
+        """更新を始める（世代を 0 にして書き出す。ここから commit までに落ちたら次回作り直し）。"""
+        self.gen = 0
+        self._write_header()
+
+    def commit(self, gen: int) -> None:
+        self.gen = gen
+        self._write_header()
+
+    def _write_header(self) -> None:
+        INDEX_HEADER.pack_into(self._mm, 0, INDEX_MAGIC, self.capacity, self.count, self.gen)
+        self._mm.flush()
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._slots.release()
+            self._mm.close()
+            self._mm = None
+
+# --- manifest ---
+
+def _empty_manifest() -> Dict[str, Any]:
+    return {"version": MANIFEST_VERSION, "gen": 0, "next_segment": 1, "entries": 0,
+            "segments": [], "files": {}}
+
+def load_manifest(root: Path) -> Dict[str, Any]:
+    """manifest を読む。無い・壊れている・バージョン違いなら空。"""
+    try:
+        m = json.loads((root / MANIFEST).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return _empty_manifest()
+    if not isinstance(m, dict) or m.get("version") != MANIFEST_VERSION:
+        return _empty_manifest()
+    return m
+
+def save_manifest(root: Path, m: Dict[str, Any]) -> None:
+    tmp = root / f".{MANIFEST}.{os.getpid()}.tmp"
+    tmp.write_text(json.dumps(m, ensure_ascii=False, indent=1), encoding="utf-8")
+    os.replace(tmp, root / MANIFEST)
+
+def open_segments(root: Path, m: Dict[str, Any]) -> Optional[List[TogglStore]]:
+    """manifest のセグメントをすべて開く。1つでも開けない・件数が合わなければ None。"""
+    stores: List[TogglStore] = []
+    for name, count in m["segments"]:
+        store = TogglStore.open(root / name)
+        if store is None or len(store) != count:
+            if store is not None:
+                store.close()
+            for s in stores:
+                s.close()
+            return None
+        stores.append(store)
+    return stores
+
+def _remove_orphans(root: Path, m: Dict[str, Any]) -> None:
+    """manifest に無いセグメント（落ちた取り込み・まとめる前のもの）を消す。"""
+    keep = {name for name, _ in m["segments"]}
+    for p in root.glob("seg-*.store"):
+        if p.name not in keep:
+            p.unlink()
+
+def _rebuild_index(root: Path, segments: List[TogglStore], gen: int) -> KeyIndex:
+    index = KeyIndex.create(root / KEYS_FILE, sum(len(s) for s in segments))
+    for s in segments:
+        for k in s.key:
+            index.add(k)
+    index.commit(gen)
+    return index
+
+# --- 取り込み ---
+
+class IngestResult(NamedTuple):
+    new_files: int      # 読んだ CSV（新しい・変わったもの）
+    appended: int       # うち、後ろに足された行だけ読んだもの
+    unchanged: int      # (サイズ, mtime) が同じ、または中身が前回と同じ
+    same_content: int   # 取り込み済みの別の CSV と同じ中身
+    added: int          # 増えたエントリ
+    duplicates: int     # 取り込み済みのキーと同じで捨てたエントリ
+    entries: int        # 取り込み後の全エントリ
+
+def _hash_file(path: Path, prefix: int) -> Tuple[str, Optional[str], bool]:
+    """(中身の digest, 先頭 prefix バイトの digest, 先頭 prefix バイトの「"」が偶数個か)。"""
+    h = hashlib.blake2b(digest_size=16)
+    head: Optional[str] = None
+    quotes = 0
+    pos = 0
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            block = f.read(BLOCK)
+            if not block:
+                break
+            if pos < prefix <= pos + len(block):
+                cut = prefix - pos
+                h.update(block[:cut])
+                head = h.hexdigest()
+                quotes += block.count(QUOTE, 0, cut)
+                h.update(block[cut:])
+            else:
+                h.update(block)
+                if pos + len(block) < prefix:
+                    quotes += block.count(QUOTE)
+            pos += len(block)
+    return h.hexdigest(), head, quotes & 1 == 0
+
+def _ends_with_newline(path: Path, size: int) -> bool:
+    with open(path, "rb") as f:
+        f.seek(size - 1)
+        return f.read(1) == NEWLINE
+
+def ingest(root: Path, files: List[Path], jobs: int = 1) -> IngestResult:
+    """files の新しい行を root のストアに取り込む。"""
+    started_ns = time.time_ns()
+    root.mkdir(parents=True, exist_ok=True)
+    m = load_manifest(root)
+    segments = open_segments(root, m)
+    if segments is None:
+        print(f"[toggl_db] ストアが壊れているので空から作り直します: {root}", file=sys.stderr)
+        m = _empty_manifest()
+        segments = []
+    _remove_orphans(root, m)
+    index = KeyIndex.open(root / KEYS_FILE, m["gen"])
+    if index is None or len(index) != m["entries"]:
+        if index is not None:
+            index.close()
+        index = _rebuild_index(root, segments, m["gen"])
+    for s in segments:
+        s.close()
+
+    known: Dict[str, Dict[str, Any]] = m["files"]
+    digests = {rec["digest"] for rec in known.values()}
+    whole: List[Path] = []
+    tails: List[Tuple[Path, int, int]] = []  # (path, 読み始め, ファイル末尾)
+    unchanged = same_content = 0
+    for fp in files:
+        key = os.path.abspath(fp)
+        st = fp.stat()
+        rec = known.get(key)
+        if rec is not None and rec["size"] == st.st_size and rec["mtime_ns"] == st.st_mtime_ns and not rec["racy"]:
+            unchanged += 1
+            continue
+        digest, head, even = _hash_file(fp, rec["size"] if rec is not None else 0)
+        racy = st.st_mtime_ns >= started_ns - RACY_WINDOW_NS
+        new_rec = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "racy": racy, "digest": digest}
+        if rec is not None and rec["digest"] == digest:
+            unchanged += 1
+        elif digest in digests:
+            same_content += 1
+        elif (rec is not None and head == rec["digest"] and even and rec["size"] > 0
+              and _ends_with_newline(fp, rec["size"])):
+            # 前回の中身の後ろに行が足されただけ（前回の末尾はレコードの境界）
+            tails.append((fp, rec["size"], st.st_size))
+        else:
+            whole.append(fp)
+        known[key] = new_rec
+        digests.add(digest)
+
+    def parts() -> Iterator[TogglStore]:
+        for fp, start, end in tails:
+            col, _ = read_header(fp, EntryColumns)
+            if col is not None:
+                yield parse_range(fp, start, end, col)
+        yield from map_ranges(whole, parse_range, EntryColumns, jobs)
+
+    seg = TogglStore()
+    duplicates = 0
+    index.begin()
+    for part in parts():
+        index = index.reserve(len(part))
+        rows = [i for i, k in enumerate(part.key) if index.add(k)]
+        duplicates += len(part) - len(rows)
+        seg.extend(part, rows)
+
+    gen = m["gen"] + 1
+    if len(seg) or seg.skipped:
+        name = f"seg-{m['next_segment']:06d}.store"
+        seg.sources = [os.path.abspath(fp) for fp in whole] + [os.path.abspath(fp) for fp, _, _ in tails]
+        seg.save(root / name)
+        m["segments"].append([name, len(seg)])
+        m["next_segment"] += 1
+        m["entries"] += len(seg)
+    index.commit(gen)
+    index.close()
+    m["gen"] = gen
+    save_manifest(root, m)
+    if len(m["segments"]) > MAX_SEGMENTS:
+        compact(root)
+    return IngestResult(len(whole) + len(tails), len(tails), unchanged, same_content,
+                        len(seg), duplicates, m["entries"])
+
+def compact(root: Path) -> None:
+    """セグメントを1つにまとめる（キーは変わらないので索引はそのまま）。"""
+    m = load_manifest(root)
+    segments = open_segments(root, m)
+    if segments is None or len(segments) < 2:
+        return
+    merged = TogglStore()
+    for s in segments:
+        merged.extend(s)
+        merged.sources += s.sources
+        s.close()
+    name = f"seg-{m['next_segment']:06d}.store"
+    merged.save(root / name)
+    m["segments"] = [[name, len(merged)]]
+    m["next_segment"] += 1
+    save_manifest(root, m)
+    _remove_orphans(root, m)
+
+# --- 読み出し ---
+
+def load_segments(root: Path) -> List[TogglStore]:
+    """取り込み済みのセグメント（mmap で開いたもの。使い終わったら close）。"""
+    m = load_manifest(root)
+    segments = open_segments(root, m)
+    if segments is None:
+        raise ValueError(f"ストアが壊れています（ingest で作り直してください）: {root}")
+    return segments
+
+def db_stats(root: Path, rng: Optional[DateRange] = None) -> TogglStats:
+    """全セグメントの集計（make_toggl_report 用）。"""
+    stats = TogglStats()
+    for s in load_segments(root):
+        stats.merge(to_stats(s, rng))
+        s.close()
+    return stats
+
+# エントリの長さの分布の区切り（秒）
+HISTOGRAM_EDGES = (5 * 60, 15 * 60, 30 * 60, 60 * 60, 2 * 3600, 4 * 3600)
+
+def main(argv: Optional[List[str]] = None, prog: Optional[str] = None):
+    ap = argparse.ArgumentParser(prog=prog, description="Toggl Detailed CSV をストアに少しずつ取り込み、概要（上位・分布）を表示する")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    ap_ingest = sub.add_parser("ingest", help="CSV の新しい行をストアに取り込む（取り込み済みの CSV・エントリは飛ばす）")
+    ap_ingest.add_argument("--src", default="data/toggl", help="Toggl Detailed CSV のフォルダ / .csv ファイル（既定: data/toggl）")
+    ap_ingest.add_argument("--store", default=str(DEFAULT_STORE), help=f"ストアのフォルダ（既定: {DEFAULT_STORE}）")
+    ap_ingest.add_argument("--jobs", type=int, default=default_jobs(), help="並列で読むプロセス数（既定: CPU数、1で直列）")
+
+    ap_summary = sub.add_parser("summary", help="プロジェクト・説明の上位とエントリの長さの分布を表示する")
+    ap_summary.add_argument("--store", default=str(DEFAULT_STORE), help=f"ストアのフォルダ（既定: {DEFAULT_STORE}）")
+    ap_summary.add_argument("--top", type=int, default=10, help="上位を何件表示するか（既定: 10）")
+    args = ap.parse_args(argv)
+
+    root = Path(args.store).expanduser()
+
+    if args.command == "ingest":
+        src = Path(args.src).expanduser()
+        if not src.exists():
+            ap_ingest.error(f"--src が見つかりません: {src}")
+        try:
+            r = ingest(root, find_csv_files(src), args.jobs)
+        except ValueError as e:
+            ap_ingest.error(str(e))
+        print(f"[ingest] read: {r.new_files} (appended: {r.appended})  unchanged: {r.unchanged}  "
+              f"same content: {r.same_content}  added: {r.added}  duplicates: {r.duplicates}  "
+              f"total: {r.entries}  ({root})")
+        return
+
+    if not (root / MANIFEST).exists():
+        ap_summary.error(f"ストアが見つかりません: {root}（先に ingest を実行してください）")
+    try:
+        segments = load_segments(root)
+    except ValueError as e:
+        ap_summary.error(str(e))
+    print(f"[store] {sum(len(s) for s in segments)} entries  ({len(segments)} segments: {root})")
+
+    # セグメントごとに id で集計し、名前で足し合わせる（辞書の id はセグメントごとに違う）
+    # 空の名前はレポートと同じラベルで出す（toggl_csv の NO_PROJECT など）
+    for title, column, table, empty in (("プロジェクト", "project", "projects", NO_PROJECT),
+                                        ("説明", "description", "descriptions", NO_DESCRIPTION)):
+        totals: Counter = Counter()
+        for s in segments:
+            names = getattr(s, table)
+            for (i,), sec in pivot([getattr(s, column)], s.duration).items():
+                totals[' '.join(names[i].split()) or empty] += sec
+        print(f"\n## {title}（上位{args.top}）")
+        for name, sec in top_n(totals, args.top):
+            print(f"{fmt_hm(sec):>9}  {name}")
+
+    print("\n## エントリの長さ")
+    labels = ["〜5分", "5〜15分", "15〜30分", "30分〜1時間", "1〜2時間", "2〜4時間", "4時間〜"]
+    counts = [0] * len(labels)
+    for s in segments:
+        counts = [a + b for a, b in zip(counts, histogram(s.duration, HISTOGRAM_EDGES))]
+        s.close()
+    for label, n in zip(labels, counts):
+        print(f"{n:>9}  {label}")
+
+if __name__ == "__main__":
+    main()
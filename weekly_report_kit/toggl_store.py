@@ -0,0 +1,473 @@
+# -*- coding: utf-8 -*-
+
+"""
+Toggl のタイムエントリの列ストア（1列 = 1つの型付き配列）。永続化と取り込みは toggl_db。
+
+1行を dict / tuple で持つと1件あたり数百バイトになるので、列ごとに array に詰める:
+- start / end / duration : array('q')（エポック秒。開始・終了は Asia/Tokyo の日時として解釈）
+- user / client / project / description : array('i')（辞書の id。文字列は辞書に1回だけ）
+- タグ（複数）: tag_ends（各エントリのタグの終わり位置）と tag_ids の CSR 形式
+- key : array('q')（重複判定用。(user, start, end, description, project) の 64bit ハッシュ）
+1件あたり 8*4 + 4*4 + 8 + 4*タグ数 バイト程度。
+
+保存形式（save / TogglStore.open）:
+- 先頭に MAGIC・メタデータ（JSON: 各列の型・位置・件数、取り込んだファイル）
+- 続けて各列の生のバイト列を 8 バイト境界に並べる（辞書も UTF-8 の連結＋終端位置の列）
+- open は mmap して memoryview.cast で列を見るだけ（コピーもデコードもしない）。
+  辞書の文字列は引かれたときだけデコードする
+- 壊れている／形式が違う（バージョン・バイト順・型の大きさ）ファイルは無いものとして作り直す
+
+集計（to_stats / pivot / histogram / top_n）は型付き配列を回す素直なループ。
+NumPy があれば同じ列をコピーせずに ndarray として見て、bincount 等でまとめて計算する。
+"""
+
+import csv
+import hashlib
+import heapq
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+from collections import Counter
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from .toggl_csv import EntryColumns, NO_CLIENT, NO_PROJECT, NO_TAG, TogglStats, open_range, parse_duration, parse_tags
+from .weeks import JST, DateRange
+
+try:
+    import numpy as np
+except ImportError:  # 無ければ純 Python のループで計算する
+    np = None
+
+MAGIC = b"WRKTGST1"
+STORE_VERSION = 2
+HEADER = struct.Struct("<8sQ")  # MAGIC, メタデータ(JSON)の長さ
+DAY = 86400
+JST_OFFSET = 9 * 3600
+EPOCH = date(1970, 1, 1)  # 日番号 0（木曜）。土曜は日番号 % 7 == 2
+
+# (列名, 型)。tag_ends[i] は i 番目のエントリのタグが tag_ids のどこまでか
+COLUMNS = (("start", "q"), ("end", "q"), ("duration", "q"),
+           ("user", "i"), ("client", "i"), ("project", "i"), ("description", "i"),
+           ("tag_ends", "q"), ("tag_ids", "i"), ("key", "q"))
+DICTS = ("users", "clients", "projects", "descriptions", "tags")
+
+Column = Union[array, memoryview]
+def _align(n: int) -> int:
+    return (n + 7) & ~7
+
+@lru_cache(maxsize=8192)
+def _midnight(day: str) -> int:
+    """「YYYY-MM-DD」の 0:00 (Asia/Tokyo) のエポック秒。"""
+    return int(datetime.combine(date.fromisoformat(day.strip()), datetime.min.time(), JST).timestamp())
+
+def entry_key(user: str, start: int, end: int, description: str, project: str) -> int:
+    """重複判定のキー（0 以外の符号付き 64bit。0 は索引の空きスロットに使う）。"""
+    raw = "\x1f".join((user, str(start), str(end), description, project)).encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(raw, digest_size=8).digest(), "little", signed=True) or 1
+
+def day_number(d: date) -> int:
+    return (d - EPOCH).days
+
+def day_date(n: int) -> date:
+    return EPOCH + timedelta(days=int(n))
+
+class StringTable:
+    """
+    辞書（id → 文字列）。
+    構築中は list と逆引き dict、ファイルから開いたものは UTF-8 の連結と終端位置の列を持ち、
+    引かれた文字列だけデコードする（追加するときに初めて list に展開する）。
+    """
+
+    __slots__ = ("_names", "_index", "_ends", "_blob")
+
+    def __init__(self, names: Optional[List[str]] = None):
+        self._names: Optional[List[str]] = names if names is not None else []
+        self._index: Optional[Dict[str, int]] = None
+        self._ends: Optional[Column] = None
+        self._blob: Optional[memoryview] = None
+
+    @classmethod
+    def view(cls, ends: Column, blob: memoryview) -> "StringTable":
+        t = cls(None)
+        t._names = None
+        t._ends, t._blob = ends, blob
+        return t
+
+    def __len__(self) -> int:
+        return len(self._names) if self._names is not None else len(self._ends)
+
+    def __getitem__(self, i: int) -> str:
+        if self._names is not None:
+            return self._names[i]
+        s = self._ends[i - 1] if i else 0
+        return str(self._blob[s:self._ends[i]], "utf-8")
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def materialize(self) -> None:
+        """ファイル上の文字列をすべて list に展開する（以後ファイルを参照しない）。"""
+        if self._names is None:
+            self._names = list(self)
+            self._ends = self._blob = None
+
+    def intern(self, s: str) -> int:
+        """s の id（無ければ追加）。"""
+        self.materialize()
+        if self._index is None:
+            self._index = {name: i for i, name in enumerate(self._names)}
+        i = self._index.get(s)
+        if i is None:
+            i = self._index[s] = len(self._names)
+            self._names.append(s)
+        return i
+
+    def release(self) -> None:
+        """ファイル上の列を手放す（展開していなければ空になる）。"""
+        for v in (self._ends, self._blob):
+            if isinstance(v, memoryview):
+                v.release()
+        if self._names is None:
+            self._names = []
+        self._ends = self._blob = None
+
+    def encode(self) -> Tuple[array, bytes]:
+        """(終端位置の列, UTF-8 の連結)。"""
+        parts = [s.encode("utf-8") for s in self]
+        ends = array("q")
+        n = 0
+        for b in parts:
+            n += len(b)
+            ends.append(n)
+        return ends, b"".join(parts)
+
+class TogglStore:
+    """タイムエントリの列ストア（列は array か、open したファイルの memoryview）。"""
+
+    def __init__(self):
+        for name, typecode in COLUMNS:
+            setattr(self, name, array(typecode))
+        for name in DICTS:
+            setattr(self, name, StringTable())
+        self.sources: List[Any] = []  # 取り込んだファイル（toggl_db が記録する）
+        self.skipped = 0
+        self._mm: Optional[mmap.mmap] = None
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    def _writable(self) -> None:
+        """open した列（読み取り専用の memoryview）を array に写す（追加する前に）。"""
+        if self._mm is None:
+            return
+        for name, typecode in COLUMNS:
+            a = array(typecode)
+            a.frombytes(getattr(self, name).cast("B"))
+            setattr(self, name, a)
+        for name in DICTS:
+            getattr(self, name).materialize()
+        self.close()
+
+    def add_rows(self, rows: Iterable[List[str]], col: EntryColumns) -> None:
+        """CSV の行を追加（日時・時間が読めない行は skipped に数える）。"""
+        self._writable()
+        start, end, duration = self.start, self.end, self.duration
+        user, client, project, description = self.user, self.client, self.project, self.description
+        tag_ends, tag_ids, key = self.tag_ends, self.tag_ids, self.key
+        users, clients, projects, descriptions, tags = (getattr(self, name) for name in DICTS)
+        for row in rows:
+            if not row:
+                continue
+            try:
+                s = _midnight(row[col.start_date]) + parse_duration(row[col.start_time])
+                e = _midnight(row[col.end_date]) + parse_duration(row[col.end_time])
+                sec = parse_duration(row[col.duration])
+            except (IndexError, ValueError):
+                self.skipped += 1
+                continue
+            start.append(s)
+            end.append(e)
+            duration.append(sec)
+            user.append(users.intern(row[col.user]))
+            client.append(clients.intern(row[col.client]))
+            project.append(projects.intern(row[col.project]))
+            description.append(descriptions.intern(row[col.description]))
+            key.append(entry_key(row[col.user], s, e, row[col.description], row[col.project]))
+            tag_ids.extend(tags.intern(t) for t in parse_tags(row[col.tags]))
+            tag_ends.append(len(tag_ids))
+
+    def extend(self, other: "TogglStore", rows: Optional[Sequence[int]] = None) -> "TogglStore":
+        """other のエントリ（rows 指定時はその番号のものだけ）を後ろに足す（辞書の id は付け直す）。"""
+        self._writable()
+        maps = {name: [getattr(self, name).intern(s) for s in getattr(other, name)] for name in DICTS}
+        if rows is None:
+            rows = range(len(other))
+        for column in ("start", "end", "duration", "key"):
+            src = getattr(other, column)
+            getattr(self, column).extend(src[i] for i in rows)
+        for column, table in (("user", "users"), ("client", "clients"), ("project", "projects"),
+                              ("description", "descriptions")):
+            src, m = getattr(other, column), maps[table]
+            getattr(self, column).extend(m[src[i]] for i in rows)
+        tag_map, tag_ends, tag_ids = maps["tags"], other.tag_ends, other.tag_ids
+        for i in rows:
+            self.tag_ids.extend(tag_map[t] for t in tag_ids[tag_ends[i - 1] if i else 0:tag_ends[i]])
+            self.tag_ends.append(len(self.tag_ids))
+        self.skipped += other.skipped
+        return self
+
+    # --- 保存・読み込み ---
+
+    def save(self, path: Path) -> None:
+        """path へ書き出す（一時ファイル → os.replace）。"""
+        # 列はバッファのまま書く（bytes にコピーしない）
+        blobs: List[Tuple[str, str, Any]] = [(name, typecode, getattr(self, name)) for name, typecode in COLUMNS]
+        for name in DICTS:
+            ends, blob = getattr(self, name).encode()
+            blobs += [(f"{name}.ends", "q", ends), (f"{name}.blob", "B", blob)]
+        layout: Dict[str, List[Any]] = {}
+        offset = 0
+        for name, typecode, data in blobs:
+            layout[name] = [typecode, offset, len(data)]
+            offset = _align(offset + len(data) * array(typecode).itemsize)
+        meta = json.dumps({
+            "version": STORE_VERSION, "byteorder": sys.byteorder,
+            "itemsize": {t: array(t).itemsize for t in "qiB"},
+            "count": len(self), "skipped": self.skipped, "sources": self.sources, "columns": layout,
+        }).encode("utf-8")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp, "wb") as f:
+                f.write(HEADER.pack(MAGIC, len(meta)) + meta)
+                f.write(b"\0" * (_align(f.tell()) - f.tell()))
+                for name, typecode, data in blobs:
+                    size = len(data) * array(typecode).itemsize
+                    f.write(data)
+                    f.write(b"\0" * (_align(size) - size))
+            os.replace(tmp, path)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+
+    @classmethod
+    def open(cls, path: Path) -> Optional["TogglStore"]:
+        """path を mmap して開く。無い・壊れている・形式が違うなら None。"""
+        try:
+            with open(path, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        views: Dict[str, memoryview] = {}
+        try:
+            magic, meta_len = HEADER.unpack_from(mm, 0)
+            meta = json.loads(mm[HEADER.size:HEADER.size + meta_len]) if magic == MAGIC else {}
+            if (meta.get("version") != STORE_VERSION or meta.get("byteorder") != sys.byteorder
+                    or meta.get("itemsize") != {t: array(t).itemsize for t in "qiB"}):
+                raise ValueError("形式が違う")
+            base = _align(HEADER.size + meta_len)
+            with memoryview(mm) as whole:
+                for name, (typecode, offset, count) in meta["columns"].items():
+                    size = count * array(typecode).itemsize
+                    if base + offset + size > len(mm):
+                        raise ValueError(f"{name} が途中で切れている")
+                    views[name] = whole[base + offset:base + offset + size].cast(typecode)
+            needed = [n for n, _ in COLUMNS] + [f"{n}.{part}" for n in DICTS for part in ("ends", "blob")]
+            if any(n not in views for n in needed):
+                raise ValueError("列が足りない")
+        except (struct.error, ValueError, KeyError, TypeError, AttributeError):
+            for v in views.values():
+                v.release()
+            mm.close()
+            return None
+        store = cls()
+        for name, _ in COLUMNS:
+            setattr(store, name, views[name])
+        for name in DICTS:
+            setattr(store, name, StringTable.view(views[f"{name}.ends"], views[f"{name}.blob"]))
+        store.sources = list(meta["sources"])
+        store.skipped = meta["skipped"]
+        store._mm = mm
+        return store
+
+    def close(self) -> None:
+        """open した mmap を閉じる（列の memoryview を手放してから）。"""
+        if self._mm is None:
+            return
+        for name, _ in COLUMNS:
+            v = getattr(self, name)
+            if isinstance(v, memoryview):
+                v.release()
+        for name in DICTS:
+            getattr(self, name).release()
+        try:
+            self._mm.close()
+        except BufferError:
+            pass  # NumPy の配列などがまだ参照していれば GC に任せる
+        self._mm = None
+
+# --- CSV からの構築 ---
+
+def parse_range(path: Path, start: int, end: int, col: EntryColumns) -> TogglStore:
+    """ワーカープロセス側: CSV の範囲（toggl_csv.map_ranges）を列ストアにする。"""
+    store = TogglStore()
+    with open_range(path, start, end) as f:
+        store.add_rows(csv.reader(f), col)
+    return store
+
+# --- 集計 ---
+
+def _np(col: Column) -> Any:
+    """列をコピーせずに ndarray として見る。"""
+    return np.frombuffer(col, dtype=np.int64 if col.itemsize == 8 else np.int32)
+
+# キーの組の種類数がこれ以下なら、並べ替えずに bincount の添字として直接使う
+DENSE_PIVOT_MAX = 1 << 22
+
+def _pivot_np(keys: List[Any], weights: Any) -> Dict[Tuple[int, ...], int]:
+    """キーの組を1つの整数に詰め、bincount で合計する。"""
+    if not len(weights):
+        return {}
+    combined = np.zeros(len(weights), dtype=np.int64)
+    radix = []
+    for k in keys:
+        lo = int(k.min())
+        span = int(k.max()) - lo + 1
+        radix.append((lo, span))
+        combined *= span
+        combined += k
+        combined -= lo
+    total_span = 1
+    for _, span in radix:
+        total_span *= span
+    if total_span <= DENSE_PIVOT_MAX:
+        present = np.bincount(combined, minlength=total_span)
+        uniq = np.flatnonzero(present)
+        sums = np.bincount(combined, weights=weights, minlength=total_span)[uniq]
+    else:
+        uniq, inv = np.unique(combined, return_inverse=True)
+        sums = np.bincount(inv, weights=weights)
+    # 合計は float64（秒の合計は 2**53 まで正確）
+    out: Dict[Tuple[int, ...], int] = {}
+    for u, total in zip(uniq.tolist(), sums.tolist()):
+        key = []
+        for lo, span in reversed(radix):
+            u, r = divmod(u, span)
+            key.append(r + lo)
+        out[tuple(reversed(key))] = int(total)
+    return out
+
+def pivot(keys: Sequence[Column], weights: Column) -> Dict[Tuple[int, ...], int]:
+    """キー列の組ごとの weights の合計。"""
+    if np is not None:
+        return _pivot_np([_np(k) for k in keys], _np(weights))
+    c: Counter = Counter()
+    for *key, w in zip(*keys, weights):
+        c[tuple(key)] += w
+    return dict(c)
+
+def histogram(values: Column, edges: Sequence[int]) -> List[int]:
+    """件数の分布。i 番目は edges[i-1] <= v < edges[i]（先頭と末尾は範囲外の件数）。"""
+    if np is not None:
+        idx = np.searchsorted(np.asarray(edges, dtype=np.int64), _np(values), side="right")
+        return np.bincount(idx, minlength=len(edges) + 1).tolist()
+    counts = [0] * (len(edges) + 1)
+    for v in values:
+        counts[bisect_right(edges, v)] += 1
+    return counts
+
+def top_n(totals: Dict[Any, int], n: int) -> List[Tuple[Any, int]]:
+    """値の大きい順に n 件（同じ値ならキー順）。"""
+    return heapq.nsmallest(n, totals.items(), key=lambda kv: (-kv[1], kv[0]))
+
+def _day_bounds(rng: Optional[DateRange]) -> Tuple[Optional[int], Optional[int]]:
+    lo, hi = rng if rng is not None else (None, None)
+    return (day_number(lo) if lo else None), (day_number(hi) if hi else None)
+
+def _pivots_py(store: TogglStore, lo: Optional[int], hi: Optional[int]):
+    days: Counter = Counter()
+    day_projects: Counter = Counter()
+    projects: Counter = Counter()
+    clients: Counter = Counter()
+    tags: Counter = Counter()
+    entries = 0
+    tag_ids = store.tag_ids
+    t0 = 0
+    for s, sec, c, p, t1 in zip(store.start, store.duration, store.client, store.project, store.tag_ends):
+        d = (s + JST_OFFSET) // DAY
+        if (lo is None or lo <= d) and (hi is None or d <= hi):
+            w = d - (d - 2) % 7
+            entries += 1
+            days[d] += sec
+            day_projects[d, c, p] += sec
+            projects[w, c, p] += sec
+            clients[w, c] += sec
+            if t0 == t1:
+                tags[w, -1] += sec
+            for i in range(t0, t1):
+                tags[w, tag_ids[i]] += sec
+        t0 = t1
+    return days, day_projects, projects, clients, tags, entries
+
+def _pivots_np(store: TogglStore, lo: Optional[int], hi: Optional[int]):
+    day = (_np(store.start) + JST_OFFSET) // DAY
+    keep = None  # 期間指定なしなら絞り込みのコピーを作らない
+    if lo is not None or hi is not None:
+        keep = np.ones(len(day), dtype=bool)
+        if lo is not None:
+            keep &= day >= lo
+        if hi is not None:
+            keep &= day <= hi
+    sel = (lambda a: a) if keep is None else (lambda a: a[keep])
+    week = day - (day - 2) % 7
+    sec = _np(store.duration)
+    # タグ: tag_ids の各位置がどのエントリのものか（タグなしのエントリは -1 として足す）
+    counts = np.diff(_np(store.tag_ends), prepend=0)
+    owner = np.repeat(np.arange(len(day)), counts)
+    untagged = counts == 0
+    tag_ids = _np(store.tag_ids)
+    if keep is not None:
+        tagged = keep[owner]
+        owner, tag_ids = owner[tagged], tag_ids[tagged]
+        untagged &= keep
+    tag_week = np.concatenate([week[owner], week[untagged]])
+    tag_id = np.concatenate([tag_ids, np.full(int(untagged.sum()), -1, dtype=tag_ids.dtype)])
+    tag_sec = np.concatenate([sec[owner], sec[untagged]])
+    del owner, untagged
+    day, week, sec = sel(day), sel(week), sel(sec)
+    client, project = sel(_np(store.client)), sel(_np(store.project))
+    days = {d: total for (d,), total in _pivot_np([day], sec).items()}
+    return (days,
+            _pivot_np([day, client, project], sec),
+            _pivot_np([week, client, project], sec),
+            _pivot_np([week, client], sec),
+            _pivot_np([tag_week, tag_id], tag_sec),
+            len(sec))
+
+def to_stats(store: TogglStore, rng: Optional[DateRange] = None) -> TogglStats:
+    """make_toggl_report 用の集計（TogglStats）を列から計算する（開始日で期間を絞る）。"""
+    pivots = _pivots_np if np is not None else _pivots_py
+    days, day_projects, projects, clients, tags, entries = pivots(store, *_day_bounds(rng))
+    client_name = [s or NO_CLIENT for s in store.clients]
+    project_name = [s or NO_PROJECT for s in store.projects]
+    stats = TogglStats()
+    for d, sec in days.items():
+        stats.days[day_date(d)] += sec
+    for (d, c, p), sec in day_projects.items():
+        stats.day_projects[day_date(d), client_name[c], project_name[p]] += sec
+    for (w, c, p), sec in projects.items():
+        stats.projects[day_date(w), client_name[c], project_name[p]] += sec
+    for (w, c), sec in clients.items():
+        stats.clients[day_date(w), client_name[c]] += sec
+    for (w, t), sec in tags.items():
+        stats.tags[day_date(w), store.tags[t] if t >= 0 else NO_TAG] += sec
+    stats.entries = entries
+    stats.skipped = store.skipped
+    return stats
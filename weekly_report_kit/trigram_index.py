@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+"""
+文字 trigram の転置インデックス（diary_db の search 用）。
+
+日本語は単語の区切りが無いので、正規化した本文の連続3文字をすべて索引にする。
+- 正規化: NFKC（全角英数→半角・半角カナ→全角）＋小文字化＋空白の連続を1つに
+- trigram は3文字のコードポイントを1つの整数に詰めて postings(gram, doc) の主キーにする
+- 正規化したテキストは呼び出し側が文書と一緒に保存しておく（検索時に本文を正規化し直さない）
+- 文書を消すときは、保存してある正規化テキストから trigram を計算し直して主キーで消す
+  （doc 側の索引を持たない）
+- 検索は全 trigram の postings の積集合を候補にし、正規化テキストに実際に含まれるかを確かめる
+  （trigram ごとの件数を先に数え、いちばん少ない postings だけを全部読む。残りは候補の文書に絞って引く）
+  （2文字以下の語は trigram が無いので、全文書を走査する）
+"""
+
+import re
+import sqlite3
+import unicodedata
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS postings (
+    gram INTEGER NOT NULL,
+    doc  INTEGER NOT NULL,
+    PRIMARY KEY (gram, doc)
+) WITHOUT ROWID;
+"""
+
+RE_SPACES = re.compile(r"\s+")
+# 1文の ? の数（古い SQLite の SQLITE_MAX_VARIABLE_NUMBER は 999）
+SQL_VARS = 900
+
+def normalize_text(s: str) -> str:
+    return RE_SPACES.sub(" ", unicodedata.normalize("NFKC", s).lower())
+
+def trigrams(norm: str) -> Set[int]:
+    """正規化済みテキストの trigram（3文字を 21bit ずつ詰めた整数）。"""
+    codes = [ord(c) for c in norm]
+    return {(a << 42) | (b << 21) | c for a, b, c in zip(codes, codes[1:], codes[2:])}
+
+def add_doc(conn: sqlite3.Connection, doc: int, norm: str) -> None:
+    """文書を索引に加える（norm は normalize_text 済みのテキスト）。"""
+    conn.executemany("INSERT OR IGNORE INTO postings (gram, doc) VALUES (?, ?)",
+                     [(g, doc) for g in trigrams(norm)])
+
+def remove_doc(conn: sqlite3.Connection, doc: int, norm: str) -> None:
+    """add_doc したときと同じ norm で索引から外す。"""
+    conn.executemany("DELETE FROM postings WHERE gram = ? AND doc = ?",
+                     [(g, doc) for g in trigrams(norm)])
+
+def query_terms(query: str) -> List[str]:
+    """検索語（空白区切りは AND）。"""
+    return [t for t in normalize_text(query).split(" ") if t]
+
+def _chunks(xs: List[int], size: int = SQL_VARS) -> Iterator[List[int]]:
+    for n in range(0, len(xs), size):
+        yield xs[n:n + size]
+
+def candidates(conn: sqlite3.Connection, terms: Iterable[str]) -> Optional[Set[int]]:
+    """すべての語の trigram を含む文書。trigram の取れない語しか無ければ None（全件が候補）。"""
+    grams: Set[int] = set()
+    for t in terms:
+        grams |= trigrams(t)
+    if not grams:
+        return None
+    # まず件数だけ数え（主キーの範囲を数えるだけで postings は読まない）、少ない trigram から引く
+    counts: Dict[int, int] = {}
+    for part in _chunks(sorted(grams)):
+        counts.update(conn.execute(
+            f"SELECT gram, COUNT(*) FROM postings WHERE gram IN ({','.join('?' * len(part))}) GROUP BY gram",
+            part))
+    if len(counts) < len(grams):
+        return set()  # どの文書にも無い trigram がある
+    order = sorted(grams, key=counts.__getitem__)
+    docs = {d for (d,) in conn.execute("SELECT doc FROM postings WHERE gram = ?", (order[0],))}
+    # 2つ目以降は、残っている候補の中だけを引く（空になったらそこで終わり）
+    for g in order[1:]:
+        if not docs:
+            break
+        found: Set[int] = set()
+        for part in _chunks(sorted(docs), SQL_VARS - 1):
+            found.update(d for (d,) in conn.execute(
+                f"SELECT doc FROM postings WHERE gram = ? AND doc IN ({','.join('?' * len(part))})", [g, *part]))
+        docs = found
+    return docs
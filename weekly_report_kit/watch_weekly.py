@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+
+"""
+make_weekly --watch の本体: 解析結果をメモリに持ったまま src の変更を待ち、
+変わった .md だけを解析し直して、内容の変わった出力だけを書き直す。
+
+  weekly-report-kit weekly --src data --ideas-out reports/ideas.md ... --watch
+
+- 変更の検出は fs_watch（Linux は inotify、使えなければ --poll と同じ stat の比較）。
+  保存が続いても --debounce 秒静かになるまで待ち、まとめて1回だけ更新する
+- 最初に1回全体を読み（--cache-dir があれば解析キャッシュも使う）、ファイルごとに
+  各出力へ入る行（make_weekly.page_rows）を持っておく。本文は Section.load() で読み込んで持つ
+  （元ファイルが後から書き換わっても、書き出し時に古い範囲を読まないように）
+- 変わったファイルだけ解析し直し、ideas / meals / bundle・dashboard それぞれへ入る行の中身
+  （日付・見出し・本文）を前と比べる。変わった出力だけを書き直す
+- 新しいファイル・フォルダは出てきた分だけ読み、消えた・移ったものは落とす。
+  イベントを取りこぼしたとき（inotify のキューあふれ）と zip / 単体の .md を指定したときは
+  src を列挙し直し、新しいもの・stat の変わったものだけを読む
+- Toggl（dashboard）は起動時に1回だけ読む。出力先が src の中にあっても、出力自身の変更は無視する
+- 解析し直した分は解析キャッシュにも入れ、終了時（Ctrl-C / SIGTERM）に保存する
+"""
+
+import argparse
+import os
+import signal
+import sys
+import time
+from datetime import date
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Set, Tuple
+
+from .fs_watch import InotifyWatcher, Watcher, open_watcher
+from .make_weekly import Entries, IdeaRows, PageRows, write_outputs
+from .notion_corpus import Parser, load_pages, parse_file
+from .notion_sources import (PRUNE_DIRS, DirIndex, Source, close_archives, scan_md_files, source_key,
+                            walk_md_files)
+from .parse_cache import ParseCache
+from .weeks import DateRange, select_in_range
+
+if TYPE_CHECKING:
+    from .make_dashboard import DayRows
+
+EMPTY: PageRows = (None, None, None)
+# PageRows の各要素が入る出力
+ROW_OUTPUTS = (("ideas",), ("meals",), ("bundle", "dashboard"))
+
+Stamp = Tuple[int, int]  # (サイズ, mtime_ns)
+
+def _load(rows: PageRows) -> None:
+    """行の本文を読み込んで持つ（Section.load）。"""
+    idea, meal, entry = rows
+    for row in (idea, meal):
+        if row is not None:
+            row[1].load()
+    if entry is not None:
+        for sec in entry.sections:
+            sec.load()
+
+def _content(rows: PageRows) -> Tuple[Any, Any, Any]:
+    """出力ごとの中身（日付・見出し・本文）。前後で比べて書き直す出力を決める。"""
+    idea, meal, entry = rows
+    return (
+        None if idea is None else (idea[0], idea[1].head, idea[1].body_bytes()),
+        None if meal is None else (meal[0], meal[1].head, meal[1].body_bytes()),
+        None if entry is None else (entry.date, entry.title_h1,
+                                    [(sec.head, sec.body_bytes()) for sec in entry.sections]),
+    )
+
+def _stamp(fp: Source) -> Optional[Stamp]:
+    try:
+        st = fp.stat()
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+class WatchState:
+    """src の .md の並び（走査順）と、ファイルごとの各出力への行。"""
+
+    def __init__(self, src: Path, rng: Optional[DateRange], parsers: Dict[str, Parser],
+                 rows_of: Callable[[Dict[str, Any]], PageRows], cache: Optional[ParseCache], ignore: Set[str]):
+        self.src = src
+        self.rng = rng
+        self.parsers = parsers
+        self.rows_of = rows_of
+        self.cache = cache
+        self.ignore = ignore  # 出力先（abspath）。自分で書いたファイルの変更は見ない
+        self.files: List[Source] = []
+        self.pages: Dict[str, PageRows] = {}
+        self.stamps: Dict[str, Optional[Stamp]] = {}
+
+    def load(self, index: Optional[DirIndex], jobs: int) -> None:
+        """最初に全体を読む（期間外と分かるファイルは読まない）。"""
+        self.files = [fp for fp in walk_md_files(self.src, index) if source_key(fp) not in self.ignore]
+        self.pages = dict.fromkeys(map(source_key, self.files), EMPTY)
+        for fp, parsed in load_pages(select_in_range(self.files, self.rng), self.parsers, self.cache, jobs):
+            rows = self.rows_of(parsed)
+            _load(rows)
+            self.pages[source_key(fp)] = rows
+        self.stamps = {source_key(fp): _stamp(fp) for fp in self.files}
+
+    def rows(self) -> Tuple[IdeaRows, IdeaRows, Entries]:
+        """走査順に並べて日付で安定ソートした (ideas, meals, entries)（make_weekly と同じ順）。"""
+        rows_ideas: IdeaRows = []
+        rows_meals: IdeaRows = []
+        entries: Entries = []
+        for fp in self.files:
+            idea, meal, entry = self.pages[source_key(fp)]
+            if idea:
+                rows_ideas.append(idea)
+            if meal:
+                rows_meals.append(meal)
+            if entry:
+                entries.append(entry)
+        rows_ideas.sort(key=lambda x: x[0])
+        rows_meals.sort(key=lambda x: x[0])
+        entries.sort(key=lambda x: x.date)
+        return rows_ideas, rows_meals, entries
+
+    def _parse(self, fp: Source) -> Optional[PageRows]:
+        """1ファイルを読み直す（読めなければ None＝消えた扱い）。"""
+        key = source_key(fp)
+        try:
+            st = fp.stat()
+            if not select_in_range([fp], self.rng):
+                rows = EMPTY
+            else:
+                digest, results = parse_file(fp, self.parsers)
+                if self.cache is not None:
+                    self.cache.store(key, st, digest, results)
+                rows = self.rows_of(results)
+                _load(rows)
+        except OSError:
+            return None
+        self.stamps[key] = (st.st_size, st.st_mtime_ns)
+        return rows
+
+    def _changed(self, paths: Set[str], rescan: bool) -> Tuple[List[Source], List[Source]]:
+        """(新しい並び, 読み直すファイル)。"""
+        if rescan or not self.src.is_dir():
+            close_archives()  # 置き換わった zip を古い central directory のまま読まないように
+            files = [fp for fp in walk_md_files(self.src) if source_key(fp) not in self.ignore]
+            # zip のメンバーはキーに CRC を含むので、書き換わったものは新しいキーになる
+            dirty = [fp for fp in files if source_key(fp) not in self.pages
+                     or (isinstance(fp, Path) and self.stamps.get(source_key(fp)) != _stamp(fp))]
+            return files, dirty
+        known = {source_key(fp): fp for fp in self.files}
+        found: Dict[str, Source] = {}
+        gone: List[str] = []
+        for p in paths:
+            key = os.path.abspath(p)
+            if key in self.ignore:
+                continue
+            if os.path.isdir(p):
+                # 作られた・移ってきたフォルダ（watch を付ける前にできた中身も含めて読む）
+                found.update((source_key(fp), fp) for fp in scan_md_files(Path(p)))
+            elif os.path.isfile(p):
+                if p.endswith(".md"):
+                    found[key] = known.get(key, Path(p))
+            else:
+                gone.append(key)
+        files = self.files
+        if gone:
+            prefixes = tuple(key + os.sep for key in gone)
+            drop = set(gone)
+            files = [fp for fp in files if source_key(fp) not in drop and not source_key(fp).startswith(prefixes)]
+        added = [fp for key, fp in found.items() if key not in known and key not in self.ignore]
+        if added:
+            files = sorted(files + added)  # walk_md_files と同じ並び
+        return files, list(found.values())
+
+    def update(self, paths: Set[str], rescan: bool) -> Tuple[int, Set[str]]:
+        """変更を取り込む。戻り値は (読み直したファイル数, 書き直す出力)。"""
+        if not rescan and not self.src.is_dir() and os.path.abspath(self.src) not in map(os.path.abspath, paths):
+            return 0, set()  # 単体の .md / zip の隣の別ファイル
+        files, dirty = self._changed(paths, rescan)
+        fresh = {source_key(fp): self._parse(fp) for fp in dirty}
+        keep = {source_key(fp) for fp in files} - {key for key, rows in fresh.items() if rows is None}
+
+        affected: Set[str] = set()
+
+        def compare(old: PageRows, new: PageRows) -> None:
+            for before, after, outputs in zip(_content(old), _content(new), ROW_OUTPUTS):
+                if before != after:
+                    affected.update(outputs)
+
+        for key in [key for key in self.pages if key not in keep]:
+            compare(self.pages.pop(key), EMPTY)
+            self.stamps.pop(key, None)
+        for key, rows in fresh.items():
+            if rows is not None:
+                compare(self.pages.get(key, EMPTY), rows)
+                self.pages[key] = rows
+        self.files = [fp for fp in files if source_key(fp) in keep]
+        return sum(rows is not None for rows in fresh.values()), affected
+
+def open_src_watcher(src: Path, poll: Optional[float]) -> Watcher:
+    """src がフォルダならその下全体、ファイル（.md / zip）ならそのフォルダ直下を見る。"""
+    if src.is_dir():
+        return open_watcher(os.fspath(src), prune=PRUNE_DIRS, poll=poll is not None, interval=poll or 1.0)
+    return open_watcher(os.fspath(src.parent), recursive=False, poll=poll is not None, interval=poll or 1.0,
+                        suffixes=(src.name,))
+
+def watch(args: argparse.Namespace, src: Path, rng: Optional[DateRange], index: Optional[DirIndex],
+          cache: Optional[ParseCache], parsers: Dict[str, Parser],
+          rows_of: Callable[[Dict[str, Any]], PageRows], toggl: Optional[Dict[date, "DayRows"]]) -> None:
+    """最初に全部書き出し、あとは変更のたびに更新する（Ctrl-C / SIGTERM で終了）。"""
+    sys.stdout.reconfigure(line_buffering=True)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    outs = dict(zip(("ideas", "meals", "bundle", "dashboard"),
+                    (args.ideas_out, args.meals_out, args.bundle_out, args.dashboard_out)))
+    ignore = {os.path.abspath(Path(p).expanduser()) for p in outs.values() if p}
+
+    # 読んでいる間の変更も取りこぼさないよう、先に watch を付けてから読む
+    watcher = open_src_watcher(src, args.poll)
+    how = "inotify" if isinstance(watcher, InotifyWatcher) else f"{watcher.interval:g}秒ごとの stat"
+    try:
+        with watcher:
+            state = WatchState(src, rng, parsers, rows_of, cache, ignore)
+            state.load(index, args.jobs)
+            if cache:
+                index.save()
+                cache.save()
+                print(cache.summary())
+            write_outputs(args, *state.rows(), toggl)
+            print(f"[watch] {src} の変更を待っています（{how}。Ctrl-C で終了）")
+            while True:
+                paths, rescan = watcher.wait(args.debounce)
+                t = time.perf_counter()
+                parsed, affected = state.update(paths, rescan)
+                affected = {name for name in affected if outs[name]}
+                if affected:
+                    write_outputs(args, *state.rows(), toggl, only=affected)
+                if parsed or affected:
+                    print(f"[watch] {parsed} files parsed → {', '.join(sorted(affected)) or 'no change'}"
+                          f"  ({(time.perf_counter() - t) * 1000:.0f} ms)")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if cache:
+            cache.save()
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+
+"""
+週（土→金, Asia/Tokyo）と期間指定の共通処理。
+
+- --week [YYYY-MM-DD] : その日を含む土曜〜金曜（日付省略時は今日(JST)の週）
+- --from / --to        : 任意の期間（両端含む・片側だけも可）
+
+期間外のファイルは全文を読まない:
+1) 先頭 SNIFF_BYTES だけ読み、md_spans.parse_date で最初に見つかった日付
+   （解析側と同じく「最初に日付が取れた行」を採用）
+2) 先頭に日付が無ければ、ファイル名が「YYYY年M月D日…」で始まる場合はその日付
+   （Notion はページタイトル＝H1 をファイル名にする）
+3) どちらでも決まらなければ全文を読んで解析側で判定
+期間の判定は解析後の日付でもう一度行うので、出力に期間外の日付は混ざらない。
+"""
+
+import argparse
+import re
+from datetime import date, datetime, timedelta, timezone
+from pathlib import PurePath
+from typing import TYPE_CHECKING, Iterable, List, Optional, Tuple
+
+# 日付の窓だけを使う Toggl 側が Notion の読み込み・解析を import しないよう、先頭の読み取りは関数の中で import する
+if TYPE_CHECKING:
+    from .notion_sources import Source
+
+JST = timezone(timedelta(hours=9), "Asia/Tokyo")  # 夏時間なし
+SATURDAY = 5
+SNIFF_BYTES = 4096
+
+RE_NAME_DATE = re.compile(r"^(\d{4})年(\d{1,2})月(\d{1,2})日")
+
+DateRange = Tuple[Optional[date], Optional[date]]
+
+def today_jst() -> date:
+    return datetime.now(JST).date()
+
+def week_start(d: date) -> date:
+    """d を含む週の土曜日。"""
+    return d - timedelta(days=(d.weekday() - SATURDAY) % 7)
+
+def week_range(d: date) -> Tuple[date, date]:
+    """d を含む週の (土曜, 金曜)。"""
+    sat = week_start(d)
+    return sat, sat + timedelta(days=6)
+
+def week_label(d: date) -> str:
+    """d を含む土→金の週のラベル（金曜日の ISO 年・週番号）。"""
+    y, w, _ = (week_start(d) + timedelta(days=6)).isocalendar()
+    return f"{y}-W{w:02d}"
+
+def in_range(d: date, rng: Optional[DateRange]) -> bool:
+    if rng is None:
+        return True
+    lo, hi = rng
+    return (lo is None or lo <= d) and (hi is None or d <= hi)
+
+def add_range_args(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--week", nargs="?", const="today", metavar="YYYY-MM-DD",
+                    help="その日を含む土→金の週だけを対象（日付省略で今週／Asia/Tokyo）")
+    ap.add_argument("--from", dest="date_from", metavar="YYYY-MM-DD", help="この日以降だけを対象")
+    ap.add_argument("--to", dest="date_to", metavar="YYYY-MM-DD", help="この日以前だけを対象")
+
+def resolve_range(ap: argparse.ArgumentParser, args: argparse.Namespace) -> Optional[DateRange]:
+    """引数から期間を決める（指定なしなら None = フィルタなし）。"""
+    try:
+        if args.week:
+            if args.date_from or args.date_to:
+                ap.error("--week と --from/--to は同時に指定できません")
+            d = today_jst() if args.week == "today" else date.fromisoformat(args.week)
+            return week_range(d)
+        if args.date_from or args.date_to:
+            lo = date.fromisoformat(args.date_from) if args.date_from else None
+            hi = date.fromisoformat(args.date_to) if args.date_to else None
+            return lo, hi
+    except ValueError as e:
+        ap.error(f"日付は YYYY-MM-DD で指定してください: {e}")
+    return None
+
+def filename_date(src: "Source") -> Optional[date]:
+    from .md_spans import NBSP
+    from .notion_sources import ZipMember
+    name = src.name if isinstance(src, ZipMember) else PurePath(src).name
+    m = RE_NAME_DATE.match(name.replace(NBSP, " "))
+    if not m:
+        return None
+    try:
+        return date(*map(int, m.groups()))
+    except ValueError:
+        return None
+
+def read_head(src: "Source", n: int = SNIFF_BYTES) -> bytes:
+    from .notion_sources import ZipMember
+    if isinstance(src, ZipMember):
+        return src.read_head(n)
+    with open(src, "rb") as f:
+        return f.read(n)
+
+def sniff_date(src: "Source") -> Tuple[bool, Optional[date]]:
+    """
+    先頭だけ読んで日付を推定: (確定したか, 日付)
+    先頭にもファイル名にも日付が無く、ファイルがまだ続く場合は (False, None)。
+    """
+    from .md_spans import parse_date
+    head = read_head(src)
+    complete = len(head) < SNIFF_BYTES
+    text = head.decode("utf-8", errors="ignore").replace("\r\n", "\n").replace("\r", "\n")
+    lines = text.splitlines(keepends=True)
+    if not complete and lines:
+        lines = lines[:-1]  # 途中で切れている最終行は判定に使わない
+    for ln in lines:
+        try:
+            d = parse_date(ln)
+        except ValueError:
+            return False, None  # 壊れた日付は解析側に任せる
+        if d is not None:
+            return True, d
+    if complete:
+        return True, None  # 全文を見て日付なし → 解析しても対象外
+    d = filename_date(src)
+    return d is not None, d
+
+def select_in_range(files: Iterable["Source"], rng: Optional[DateRange]) -> List["Source"]:
+    """期間外と判定できたファイルを、全文を読まずに除外する。"""
+    if rng is None:
+        return list(files)
+    out: List["Source"] = []
+    for src in files:
+        known, d = sniff_date(src)
+        if known and (d is None or not in_range(d, rng)):
+            continue
+        out.append(src)
+    return out